@@ -0,0 +1,114 @@
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Add parent directory to path to import config
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import ANSWER_CACHE_MAX_DISTANCE, ANSWER_CACHE_PER_USER, ANSWER_CACHE_TTL
+
+
+class CachedAnswer:
+    __slots__ = ("query", "vector", "answer", "sources", "confidence_score", "created")
+
+    def __init__(self, query: str, vector: np.ndarray, answer: str, sources: List[str], confidence_score: float):
+        self.query = query
+        self.vector = vector
+        self.answer = answer
+        self.sources = sources
+        self.confidence_score = confidence_score
+        self.created = time.monotonic()
+
+
+class SemanticAnswerCache:
+    """Answers to standalone questions, matched by query embedding similarity.
+
+    Entries are grouped per user and tagged with the corpus version they were
+    answered against; a lookup under a newer version drops the user's entries.
+    A query hits when its cosine distance to a cached query is at most
+    max_distance. Only questions asked without conversation history are
+    stored or served, since earlier turns can change what the answer should be.
+    """
+
+    def __init__(
+        self,
+        max_distance: float = ANSWER_CACHE_MAX_DISTANCE,
+        per_user: int = ANSWER_CACHE_PER_USER,
+        ttl: float = ANSWER_CACHE_TTL
+    ):
+        self.max_distance = max_distance
+        self.per_user = per_user
+        self.ttl = ttl
+        self._users: Dict[int, Tuple[int, "OrderedDict[int, CachedAnswer]"]] = {}
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_distance >= 0
+
+    def _entries(self, user_id: int, version: int) -> "OrderedDict[int, CachedAnswer]":
+        current = self._users.get(user_id)
+        if current is None or current[0] != version:
+            current = (version, OrderedDict())
+            self._users[user_id] = current
+        return current[1]
+
+    def get(self, user_id: int, version: int, vector: np.ndarray) -> Optional[CachedAnswer]:
+        """Return the closest cached answer within max_distance, if any."""
+        with self._lock:
+            entries = self._entries(user_id, version)
+            now = time.monotonic()
+            for entry_id in [i for i, e in entries.items() if now - e.created > self.ttl]:
+                del entries[entry_id]
+            best = None
+            if entries:
+                ids = list(entries.keys())
+                similarities = np.vstack([entries[i].vector for i in ids]) @ vector
+                position = int(np.argmax(similarities))
+                if 1.0 - float(similarities[position]) <= self.max_distance:
+                    best = entries[ids[position]]
+                    entries.move_to_end(ids[position])
+            if best is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return best
+
+    def put(self, user_id: int, version: int, query: str, vector: np.ndarray, answer: str, sources: List[str], confidence_score: float):
+        vector = np.asarray(vector, dtype=np.float32)
+        vector = vector / (np.linalg.norm(vector) or 1.0)
+        with self._lock:
+            current = self._users.get(user_id)
+            if current is not None and current[0] > version:
+                return  # the corpus changed while this answer was being generated
+            entries = self._entries(user_id, version)
+            self._next_id += 1
+            entries[self._next_id] = CachedAnswer(query, vector, answer, sources, confidence_score)
+            while len(entries) > self.per_user:
+                entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "users": len(self._users),
+                "entries": sum(len(entries) for _, entries in self._users.values()),
+                "max_distance": self.max_distance,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+_answer_cache = SemanticAnswerCache()
+
+
+def get_answer_cache() -> SemanticAnswerCache:
+    return _answer_cache
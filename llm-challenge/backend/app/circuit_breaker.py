@@ -0,0 +1,151 @@
+import os
+import sys
+import time
+from collections import deque
+
+# Add parent directory to path to import config
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import (
+    LLM_BREAKER_FAILURE_RATE, LLM_BREAKER_WINDOW, LLM_BREAKER_MIN_CALLS,
+    LLM_BREAKER_COOLDOWN, LLM_BREAKER_HALF_OPEN_CALLS
+)
+from backend.app.llm_client import LLMError
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(LLMError):
+    """Raised instead of calling a provider whose circuit is open."""
+
+    def __init__(self, name: str, retry_in: float):
+        super().__init__(f"{name} circuit is open, retry in {retry_in:.0f}s", 503, retry_in)
+
+
+def is_provider_failure(error: BaseException) -> bool:
+    """Timeouts, transport errors, 429 and 5xx count against a provider; other 4xx are the request's fault."""
+    if not isinstance(error, LLMError):
+        return True
+    return error.status_code is None or error.status_code == 429 or error.status_code >= 500
+
+
+class CircuitBreaker:
+    """Closed / open / half-open breaker over a provider's recent outcomes.
+
+    While closed, the last `window` calls are kept; once at least min_calls
+    are in and the failure share reaches failure_rate, the circuit opens.
+    An open circuit rejects calls at once with CircuitOpenError, so chats
+    fail fast or move to another provider instead of waiting out a
+    degraded one, and the provider gets room to recover. After cooldown
+    seconds it goes half-open and lets half_open_calls trial calls
+    through: a success closes it, a failure opens it for another cooldown.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_rate: float = LLM_BREAKER_FAILURE_RATE,
+        window: int = LLM_BREAKER_WINDOW,
+        min_calls: int = LLM_BREAKER_MIN_CALLS,
+        cooldown: float = LLM_BREAKER_COOLDOWN,
+        half_open_calls: int = LLM_BREAKER_HALF_OPEN_CALLS
+    ):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.cooldown = cooldown
+        self.half_open_calls = half_open_calls
+        self._outcomes = deque(maxlen=window)
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probes = 0
+        self.opened = 0
+        self.rejected = 0
+
+    def _cooled_down(self) -> bool:
+        return self._state == OPEN and time.monotonic() - self._opened_at >= self.cooldown
+
+    @property
+    def state(self) -> str:
+        """The state a call made now would see; reading it changes nothing."""
+        return HALF_OPEN if self._cooled_down() else self._state
+
+    @property
+    def available(self) -> bool:
+        """Whether a call made now would be let through."""
+        if self._cooled_down():
+            return self.half_open_calls > 0
+        return self._state == CLOSED or (self._state == HALF_OPEN and self._probes < self.half_open_calls)
+
+    def _half_open(self):
+        """Move an open circuit whose cooldown is over to half-open."""
+        if self._cooled_down():
+            self._state = HALF_OPEN
+            self._probes = 0
+            print(f"[DEBUG] {self.name} circuit half-open, sending trial calls", file=sys.stderr)
+
+    def allow(self) -> bool:
+        """Admit a call made now, as a trial call when half-open; False if the circuit rejects it."""
+        self._half_open()
+        if not self.available:
+            return False
+        if self._state == HALF_OPEN:
+            self._probes += 1
+        return True
+
+    def before_call(self):
+        """Admit a call or raise CircuitOpenError; half-open admits only the trial calls."""
+        if not self.allow():
+            self.rejected += 1
+            raise CircuitOpenError(self.name, max(0.0, self._opened_at + self.cooldown - time.monotonic()))
+
+    def _open(self):
+        self._state = OPEN
+        self._opened_at = time.monotonic()
+        self._outcomes.clear()
+        self.opened += 1
+        print(f"[WARNING] {self.name} circuit opened for {self.cooldown:.0f}s", file=sys.stderr)
+
+    def record_success(self):
+        if self._state == OPEN:
+            return  # started before the circuit opened
+        if self._state == HALF_OPEN:
+            self._state = CLOSED
+            self._outcomes.clear()
+            print(f"[DEBUG] {self.name} circuit closed", file=sys.stderr)
+            return
+        self._outcomes.append(False)
+
+    def record_failure(self):
+        if self._state == OPEN:
+            return
+        if self._state == HALF_OPEN:
+            self._open()
+            return
+        self._outcomes.append(True)
+        if len(self._outcomes) >= self.min_calls and sum(self._outcomes) / len(self._outcomes) >= self.failure_rate:
+            self._open()
+
+    def record_error(self, error: BaseException):
+        """Record a failed call; errors that are the request's fault only free a trial slot."""
+        if is_provider_failure(error):
+            self.record_failure()
+        else:
+            self.record_cancelled()
+
+    def record_cancelled(self):
+        """A call ended without an outcome, e.g. a hedged loser; frees its trial slot."""
+        if self._state == HALF_OPEN:
+            self._probes = max(0, self._probes - 1)
+
+    def stats(self) -> dict:
+        state = self.state
+        return {
+            "state": state,
+            "failure_rate": round(sum(self._outcomes) / len(self._outcomes), 3) if self._outcomes else 0.0,
+            "calls_in_window": len(self._outcomes),
+            "retry_in_s": round(max(0.0, self._opened_at + self.cooldown - time.monotonic()), 1) if state == OPEN else 0.0,
+            "opened": self.opened,
+            "rejected": self.rejected
+        }
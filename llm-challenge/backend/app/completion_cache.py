@@ -0,0 +1,143 @@
+import os
+import sqlite3
+import sys
+import threading
+import time
+from typing import Dict, Optional
+
+# Add parent directory to path to import config
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import COMPLETION_CACHE_PATH, COMPLETION_CACHE_TTL, COMPLETION_CACHE_MAX_MB, COMPLETION_CACHE_SAMPLED
+
+EVICTION_BATCH = 256  # least recently used rows read per eviction pass
+
+
+def cacheable(params: Dict, opt_in: bool = False) -> bool:
+    """Deterministic requests (temperature 0) are cached; sampled ones only on opt-in."""
+    return opt_in or COMPLETION_CACHE_SAMPLED or params.get("temperature", 1.0) == 0
+
+
+class CompletionCache:
+    """SQLite-backed cache of LLM completions with a TTL and a size cap.
+
+    Entries are content-addressed by the request fingerprint (model, full
+    message list and sampling parameters), so only a byte-identical request
+    is answered from the cache. Entries older than ttl seconds are ignored
+    and purged on write; once the stored text exceeds max_mb, the least
+    recently used entries are dropped until it is back under 90% of the cap.
+    """
+
+    def __init__(self, path: str = COMPLETION_CACHE_PATH, ttl: float = COMPLETION_CACHE_TTL, max_mb: float = COMPLETION_CACHE_MAX_MB):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self._lock = threading.Lock()
+        if path != ":memory:" and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS completions ("
+            "key TEXT PRIMARY KEY, completion TEXT NOT NULL, size INTEGER NOT NULL, "
+            "created REAL NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_completions_last_used ON completions (last_used)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_completions_created ON completions (created)")
+        self._conn.commit()
+        self._entries, self._bytes = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM completions").fetchone()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached completion for key unless it is missing or expired."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT completion FROM completions WHERE key = ? AND created >= ?", (key, now - self.ttl)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE completions SET last_used = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def put(self, key: str, completion: str):
+        """Store a completion, purging expired entries and evicting past the size cap.
+
+        Entry and byte counts are kept incrementally; only expired rows and
+        the oldest rows needed to get back under the cap are read.
+        """
+        size = len(completion.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        now = time.time()
+        with self._lock:
+            replaced = self._conn.execute("SELECT size FROM completions WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO completions (key, completion, size, created, last_used) VALUES (?, ?, ?, ?, ?)",
+                (key, completion, size, now, now)
+            )
+            if replaced is None:
+                self._entries += 1
+                self._bytes += size
+            else:
+                self._bytes += size - replaced[0]
+            cutoff = now - self.ttl
+            expired, expired_bytes = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM completions WHERE created < ?", (cutoff,)
+            ).fetchone()
+            if expired:
+                self._conn.execute("DELETE FROM completions WHERE created < ?", (cutoff,))
+                self._entries -= expired
+                self._bytes -= expired_bytes
+            if self._bytes > self.max_bytes:
+                target = int(self.max_bytes * 0.9)
+                while self._bytes > target:
+                    rows = self._conn.execute(
+                        "SELECT key, size FROM completions ORDER BY last_used ASC LIMIT ?", (EVICTION_BATCH,)
+                    ).fetchall()
+                    if not rows:
+                        break
+                    evict = []
+                    for old_key, old_size in rows:
+                        if self._bytes <= target:
+                            break
+                        evict.append((old_key,))
+                        self._bytes -= old_size
+                    self._conn.executemany("DELETE FROM completions WHERE key = ?", evict)
+                    self._entries -= len(evict)
+                    self.evictions += len(evict)
+            self._conn.commit()
+
+    def stats(self) -> dict:
+        return {
+            "entries": self._entries,
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_cache: Optional[CompletionCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_completion_cache() -> Optional[CompletionCache]:
+    """Return the process-wide cache, or None when COMPLETION_CACHE_PATH is empty."""
+    global _cache
+    if _cache is None and COMPLETION_CACHE_PATH:
+        with _cache_lock:
+            if _cache is None:
+                _cache = CompletionCache()
+    return _cache
@@ -0,0 +1,204 @@
+import os
+import sys
+import threading
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+# Add parent directory to path to import config
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import PROMPT_TOKENIZER, CONTEXT_TOKEN_BUDGET, HISTORY_TOKEN_BUDGET, HISTORY_MAX_MESSAGES
+from rag.chunking import get_tokenizer
+
+MESSAGE_OVERHEAD_TOKENS = 4  # role and separators the chat format adds per message
+CONTEXT_SEPARATOR = "\n---\n"
+OVERLAP_PROBE_CHARS = 32  # prefix used to locate a chunk's overlap inside its neighbour
+
+
+@lru_cache(maxsize=4096)
+def count_tokens(text: str) -> int:
+    """Token count under PROMPT_TOKENIZER; chunks recur across requests, so counts are cached."""
+    return get_tokenizer(PROMPT_TOKENIZER).count(text)
+
+
+def overlap_length(left: str, right: str) -> int:
+    """Length of the longest suffix of left that is also a prefix of right."""
+    probe = right[:OVERLAP_PROBE_CHARS]
+    if not probe:
+        return 0
+    start = max(0, len(left) - len(right))
+    best = 0
+    position = left.find(probe, start)
+    while position != -1:
+        length = len(left) - position
+        if right.startswith(left[position:]):
+            best = length
+            break
+        position = left.find(probe, position + 1)
+    return best
+
+
+def _rank_score(doc: Dict) -> float:
+    metadata = doc.get("metadata", {})
+    for key in ("rerank_score", "rrf_score"):
+        if metadata.get(key) is not None:
+            return metadata[key]
+    return doc.get("score", 0.0)
+
+
+class _Piece:
+    """A run of consecutive chunks from one document, with overlaps removed."""
+
+    def __init__(self, document_id, chunk_index, text: str):
+        self.document_id = document_id
+        self.first = chunk_index
+        self.last = chunk_index
+        self.text = text
+
+
+def pack_context(docs: List[Dict], budget: int = CONTEXT_TOKEN_BUDGET):
+    """Greedily fill budget tokens with the best-ranked chunks.
+
+    Identical chunks are sent once, and a chunk adjacent to one already
+    selected from the same document is merged into it without the text the
+    two share, so overlap is never paid for twice. Chunks that do not fit are
+    skipped in favour of lower-ranked ones that do. Returns (context text,
+    tokens used, chunks used, chunks dropped).
+    """
+    pieces: List[_Piece] = []
+    seen = set()
+    used = 0
+    packed = 0
+    dropped = 0
+    separator_tokens = count_tokens(CONTEXT_SEPARATOR)
+    for doc in sorted(docs, key=_rank_score, reverse=True):
+        text = doc.get("content") if isinstance(doc, dict) else None
+        if not text or text in seen:
+            continue
+        metadata = doc.get("metadata", {})
+        document_id, chunk_index = metadata.get("document_id"), metadata.get("chunk_index")
+
+        neighbour, before = None, False
+        if document_id is not None and chunk_index is not None:
+            for piece in pieces:
+                if piece.document_id == document_id and chunk_index in (piece.last + 1, piece.first - 1):
+                    neighbour, before = piece, chunk_index == piece.first - 1
+                    break
+        if neighbour is not None:
+            addition = text[:len(text) - overlap_length(text, neighbour.text)] if before else text[overlap_length(neighbour.text, text):]
+            cost = count_tokens(addition)
+        else:
+            addition = text
+            cost = count_tokens(text) + (separator_tokens if pieces else 0)
+        if used + cost > budget:
+            dropped += 1
+            continue
+
+        seen.add(text)
+        used += cost
+        packed += 1
+        if neighbour is None:
+            pieces.append(_Piece(document_id, chunk_index, text))
+        elif before:
+            neighbour.text, neighbour.first = addition + neighbour.text, chunk_index
+        else:
+            neighbour.text, neighbour.last = neighbour.text + addition, chunk_index
+    return CONTEXT_SEPARATOR.join(piece.text for piece in pieces), used, packed, dropped
+
+
+def pack_history(history: List[Dict], prompt: str, budget: int = HISTORY_TOKEN_BUDGET, max_messages: int = HISTORY_MAX_MESSAGES):
+    """Keep the most recent turns that fit in budget, dropping the oldest first.
+
+    The current prompt is sent separately, so a trailing copy of it in the
+    history is left out. Returns (messages, tokens used, messages dropped).
+    """
+    turns = [
+        {"role": msg["role"], "content": msg["content"]}
+        for msg in (history or [])
+        if isinstance(msg, dict) and "role" in msg and "content" in msg
+    ]
+    if turns and turns[-1]["role"] == "user" and turns[-1]["content"] == prompt:
+        turns = turns[:-1]
+    turns = turns[-max_messages:] if max_messages > 0 else []
+
+    kept: List[Dict] = []
+    used = 0
+    for turn in reversed(turns):
+        cost = count_tokens(turn["content"]) + MESSAGE_OVERHEAD_TOKENS
+        if used + cost > budget:
+            break
+        kept.append(turn)
+        used += cost
+    kept.reverse()
+    return kept, used, len(turns) - len(kept)
+
+
+class PackingStats:
+    """Running totals of what the packer actually sent, for /api/stats."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.prompts = 0
+        self.tokens = 0
+        self.context_tokens = 0
+        self.chunks_used = 0
+        self.chunks_dropped = 0
+        self.history_dropped = 0
+
+    def record(self, report: Dict):
+        with self._lock:
+            self.prompts += 1
+            self.tokens += report["total_tokens"]
+            self.context_tokens += report["context_tokens"]
+            self.chunks_used += report["chunks_used"]
+            self.chunks_dropped += report["chunks_dropped"]
+            self.history_dropped += report["history_dropped"]
+
+    def stats(self) -> dict:
+        with self._lock:
+            prompts = self.prompts or 1
+            return {
+                "tokenizer": get_tokenizer(PROMPT_TOKENIZER).name,
+                "context_token_budget": CONTEXT_TOKEN_BUDGET,
+                "history_token_budget": HISTORY_TOKEN_BUDGET,
+                "prompts": self.prompts,
+                "avg_prompt_tokens": round(self.tokens / prompts, 1),
+                "avg_context_tokens": round(self.context_tokens / prompts, 1),
+                "avg_chunks_used": round(self.chunks_used / prompts, 2),
+                "chunks_dropped": self.chunks_dropped,
+                "history_messages_dropped": self.history_dropped,
+            }
+
+
+_packing_stats = PackingStats()
+
+
+def get_packing_stats() -> PackingStats:
+    return _packing_stats
+
+
+def pack_prompt(system_prompt: str, prompt: str, context_docs: Optional[List[Dict]], conversation_history: Optional[List[Dict]]):
+    """Build chat messages within the token budgets and report what they cost.
+
+    Returns (messages, report), where report holds the token counts of each
+    part as sent.
+    """
+    context_text, context_tokens, chunks_used, chunks_dropped = pack_context(context_docs or [])
+    history, history_tokens, history_dropped = pack_history(conversation_history, prompt)
+
+    system_content = system_prompt + ("\n\nContext:\n" + context_text if context_text else "")
+    messages = [{"role": "system", "content": system_content}] + history + [{"role": "user", "content": prompt}]
+    system_tokens = count_tokens(system_prompt) + MESSAGE_OVERHEAD_TOKENS
+    prompt_tokens = count_tokens(prompt) + MESSAGE_OVERHEAD_TOKENS
+    report = {
+        "system_tokens": system_tokens,
+        "context_tokens": context_tokens,
+        "history_tokens": history_tokens,
+        "prompt_tokens": prompt_tokens,
+        "total_tokens": system_tokens + context_tokens + history_tokens + prompt_tokens,
+        "chunks_used": chunks_used,
+        "chunks_dropped": chunks_dropped,
+        "history_messages": len(history),
+        "history_dropped": history_dropped,
+    }
+    _packing_stats.record(report)
+    return messages, report
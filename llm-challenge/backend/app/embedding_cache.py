@@ -0,0 +1,216 @@
+import hashlib
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Add parent directory to path to import config
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import (
+    EMBEDDING_MODEL, EMBEDDING_CACHE_PATH, EMBEDDING_CACHE_MAX_ENTRIES,
+    QUERY_EMBEDDING_CACHE_SIZE, QUERY_EMBEDDING_CACHE_TTL
+)
+from backend.app.embeddings import embed_texts, get_embedding_service, vector_to_bytes, bytes_to_vector
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """Canonical form used for cache keys: NFC, collapsed whitespace, stripped."""
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFC", text)).strip()
+
+
+def cache_key(text: str, model: str = EMBEDDING_MODEL) -> str:
+    """Key a chunk's vector by model name and normalized text."""
+    return hashlib.sha256(f"{model}\0{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """SQLite-backed cache of chunk vectors with an entry cap and LRU eviction.
+
+    Entries are keyed by (model, normalized text hash), so re-uploads, retried
+    jobs, index rebuilds and small chunking changes reuse vectors for every
+    chunk whose text is unchanged. last_used is refreshed on every hit and the
+    least recently used tenth of the cache is dropped once max_entries is
+    exceeded.
+    """
+
+    def __init__(self, path: str = EMBEDDING_CACHE_PATH, max_entries: int = EMBEDDING_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        if path != ":memory:" and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_embeddings_last_used ON embeddings (last_used)")
+        self._conn.commit()
+        self._size = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        """Return cached vectors for the keys that are present."""
+        found: Dict[str, np.ndarray] = {}
+        unique = list(dict.fromkeys(keys))
+        with self._lock:
+            for start in range(0, len(unique), 500):
+                part = unique[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(part))})", part
+                ).fetchall()
+                found.update((key, bytes_to_vector(vector)) for key, vector in rows)
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE key = ?", [(now, key) for key in found]
+                )
+                self._conn.commit()
+            self.hits += sum(1 for key in keys if key in found)
+            self.misses += sum(1 for key in keys if key not in found)
+        return found
+
+    def put_many(self, items: Dict[str, np.ndarray]):
+        """Store vectors, evicting least recently used entries past the cap."""
+        if not items:
+            return
+        now = time.time()
+        with self._lock:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)",
+                [(key, vector_to_bytes(vector), now) for key, vector in items.items()]
+            )
+            self._size += self._conn.total_changes - before
+            if self._size > self.max_entries:
+                excess = self._size - int(self.max_entries * 0.9)
+                self._conn.execute(
+                    "DELETE FROM embeddings WHERE key IN "
+                    "(SELECT key FROM embeddings ORDER BY last_used ASC LIMIT ?)", (excess,)
+                )
+                self._size = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            self._conn.commit()
+
+    def stats(self) -> dict:
+        return {"entries": self._size, "max_entries": self.max_entries, "hits": self.hits, "misses": self.misses}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_cache: Optional[EmbeddingCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    """Return the process-wide cache, or None when EMBEDDING_CACHE_PATH is empty."""
+    global _cache
+    if _cache is None and EMBEDDING_CACHE_PATH:
+        with _cache_lock:
+            if _cache is None:
+                _cache = EmbeddingCache()
+    return _cache
+
+
+def embed_texts_cached(texts: List[str]) -> np.ndarray:
+    """Embed chunk texts, computing only vectors missing from the cache."""
+    cache = get_embedding_cache()
+    if cache is None or not texts:
+        return embed_texts(texts)
+
+    keys = [cache_key(text) for text in texts]
+    found = cache.get_many(keys)
+    missing = {}
+    for key, text in zip(keys, texts):
+        if key not in found and key not in missing:
+            missing[key] = text
+    if missing:
+        vectors = embed_texts(list(missing.values()))
+        computed = dict(zip(missing.keys(), vectors))
+        cache.put_many(computed)
+        found.update(computed)
+    return np.vstack([found[key] for key in keys]).astype(np.float32, copy=False)
+
+
+class QueryEmbeddingCache:
+    """In-memory LRU cache of chat query vectors with a TTL.
+
+    Keys are the same (model, normalized text) hashes as the chunk cache, so
+    repeats of a question that differ only in whitespace share an entry.
+    Misses record how long the embedding took, which gives an estimate of the
+    latency saved by each hit.
+    """
+
+    def __init__(self, max_entries: int = QUERY_EMBEDDING_CACHE_SIZE, ttl: float = QUERY_EMBEDDING_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, np.ndarray]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.miss_seconds = 0.0
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() - entry[0] > self.ttl:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: str, vector: np.ndarray, seconds: float):
+        with self._lock:
+            self._entries[key] = (time.monotonic(), vector)
+            self._entries.move_to_end(key)
+            self.miss_seconds += seconds
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            avg_miss_ms = self.miss_seconds / self.misses * 1000 if self.misses else 0.0
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "avg_miss_ms": round(avg_miss_ms, 2),
+                "saved_ms_per_request": round(avg_miss_ms * self.hits / lookups, 2) if lookups else 0.0,
+            }
+
+
+_query_cache = QueryEmbeddingCache()
+
+
+def get_query_cache() -> QueryEmbeddingCache:
+    return _query_cache
+
+
+async def embed_query_cached(query: str) -> np.ndarray:
+    """Embed a chat query, reusing the vector of a recently seen identical query."""
+    key = cache_key(query)
+    vector = _query_cache.get(key)
+    if vector is None:
+        start = time.perf_counter()
+        vector = await get_embedding_service().embed_one(query)
+        _query_cache.put(key, vector, time.perf_counter() - start)
+    return vector
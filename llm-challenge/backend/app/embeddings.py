@@ -0,0 +1,193 @@
+import asyncio
+import sys
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+
+# Add parent directory to path to import config
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import EMBEDDING_MODEL, EMBEDDING_MAX_BATCH_SIZE, EMBEDDING_MAX_WAIT_MS
+
+_model = None
+_model_lock = threading.Lock()
+
+
+def get_embedding_model():
+    """Load the sentence-transformers model once per process."""
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                from sentence_transformers import SentenceTransformer
+                print(f"[DEBUG] Loading embedding model {EMBEDDING_MODEL}", file=sys.stderr)
+                _model = SentenceTransformer(EMBEDDING_MODEL)
+    return _model
+
+
+def encode_texts(texts: List[str]) -> np.ndarray:
+    """Run the model on texts and return L2-normalized float32 vectors."""
+    if not texts:
+        return np.zeros((0, 0), dtype=np.float32)
+    model = get_embedding_model()
+    vectors = model.encode(
+        list(texts),
+        batch_size=32,
+        convert_to_numpy=True,
+        normalize_embeddings=True,
+        show_progress_bar=False,
+    )
+    return np.ascontiguousarray(vectors, dtype=np.float32)
+
+
+class EmbeddingService:
+    """Collects concurrent embed requests into dynamic micro-batches.
+
+    Callers get a future per request. The batcher waits for the first request,
+    then keeps collecting for up to max_wait_ms or until max_batch_size texts
+    are queued, and runs the whole batch through the model in one call on a
+    dedicated thread, so chat queries arriving together share a forward pass
+    and the event loop is never blocked by the model.
+    """
+
+    def __init__(
+        self,
+        max_batch_size: int = EMBEDDING_MAX_BATCH_SIZE,
+        max_wait_ms: float = EMBEDDING_MAX_WAIT_MS,
+        encoder: Callable[[List[str]], np.ndarray] = encode_texts
+    ):
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.encoder = encoder
+        self._queue: Optional[asyncio.Queue] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="embedding")
+        self.batches = 0
+        self.texts = 0
+
+    async def start(self):
+        if self._task is None:
+            self._loop = asyncio.get_running_loop()
+            self._queue = asyncio.Queue()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+            self._loop = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    async def embed(self, texts: List[str]) -> np.ndarray:
+        """Embed texts as part of the next micro-batch."""
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        await self.start()
+        future = self._loop.create_future()
+        await self._queue.put((list(texts), future))
+        return await future
+
+    async def embed_one(self, text: str) -> np.ndarray:
+        """Embed a single text, e.g. a chat query."""
+        return (await self.embed([text]))[0]
+
+    def embed_from_thread(self, texts: List[str]) -> np.ndarray:
+        """Embed from a worker thread through the running service's loop."""
+        return asyncio.run_coroutine_threadsafe(self.embed(texts), self._loop).result()
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch: List[Tuple[List[str], asyncio.Future]] = [await self._queue.get()]
+            size = len(batch[0][0])
+            deadline = loop.time() + self.max_wait
+            while size < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                batch.append(item)
+                size += len(item[0])
+
+            texts = [text for item_texts, _ in batch for text in item_texts]
+            try:
+                vectors = await loop.run_in_executor(self._executor, self.encoder, texts)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            self.batches += 1
+            self.texts += len(texts)
+            offset = 0
+            for item_texts, future in batch:
+                if not future.done():
+                    future.set_result(vectors[offset:offset + len(item_texts)])
+                offset += len(item_texts)
+
+
+_service: Optional[EmbeddingService] = None
+
+
+def get_embedding_service() -> EmbeddingService:
+    """Return the process-wide embedding service."""
+    global _service
+    if _service is None:
+        _service = EmbeddingService()
+    return _service
+
+
+async def start_embedding_service():
+    """Start the batcher on the server's event loop."""
+    await get_embedding_service().start()
+
+
+async def stop_embedding_service():
+    """Stop the batcher."""
+    if _service is not None:
+        await _service.stop()
+
+
+def embed_texts(texts: List[str]) -> np.ndarray:
+    """Embed texts from synchronous code, such as ingestion worker threads.
+
+    Requests join the running service's micro-batches; without a running
+    service (scripts, tests) the model is called directly.
+    """
+    service = _service
+    if service is not None and service.running and not _on_loop_thread(service):
+        return service.embed_from_thread(texts)
+    return encode_texts(texts)
+
+
+def _on_loop_thread(service: EmbeddingService) -> bool:
+    try:
+        return asyncio.get_running_loop() is service._loop
+    except RuntimeError:
+        return False
+
+
+def embed_query(text: str) -> np.ndarray:
+    """Embed a single query string."""
+    return embed_texts([text])[0]
+
+
+def vector_to_bytes(vector: np.ndarray) -> bytes:
+    """Serialize a vector for DocumentChunk.embedding."""
+    return np.asarray(vector, dtype=np.float32).tobytes()
+
+
+def bytes_to_vector(data: bytes) -> np.ndarray:
+    """Deserialize a DocumentChunk.embedding blob."""
+    return np.frombuffer(data, dtype=np.float32)
@@ -0,0 +1,301 @@
+import asyncio
+import os
+import sys
+import threading
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import insert, update
+
+# Add parent directory to path to import config
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import (
+    INGESTION_WORKERS, INGESTION_MAX_ATTEMPTS, INGESTION_RETRY_DELAY,
+    INGESTION_POLL_INTERVAL, INGESTION_BATCH_SIZE
+)
+from backend.app.db import SessionLocal
+from backend.app.models import Document, DocumentChunk, IngestionJob
+from backend.app.embeddings import vector_to_bytes, bytes_to_vector
+from backend.app.embedding_cache import embed_texts_cached
+from backend.app.vector_store import get_vector_store
+from backend.app.lexical import index_document_chunks, unindex_chunks
+from backend.app.retrieval_cache import bump_corpus_version
+from rag.ingest import get_extraction_engine, shutdown_extraction_engine
+from rag.chunking import iter_chunks, batched
+
+PREVIEW_CHARS = 2000  # characters of extracted text kept in Document.content
+
+_hash_locks: Dict[str, threading.Lock] = {}
+_hash_locks_guard = threading.Lock()
+
+
+def _hash_lock(content_hash: str) -> threading.Lock:
+    """Serialize ingestion of identical content within this process."""
+    with _hash_locks_guard:
+        return _hash_locks.setdefault(content_hash, threading.Lock())
+
+
+def attach_existing_chunks(db, document: Document) -> bool:
+    """Point a document at chunks already produced for the same content hash.
+
+    Returns False when the content has not been processed before. On success
+    the document is marked processed without extracting or embedding anything,
+    and the shared chunk vectors are added to the owner's index.
+    """
+    if not document.content_hash:
+        return False
+    source = db.query(Document).filter(
+        Document.content_hash == document.content_hash,
+        Document.is_processed == True,
+        Document.id != document.id
+    ).order_by(Document.id.asc()).first()
+    if source is None:
+        return False
+
+    rows = db.query(DocumentChunk.id, DocumentChunk.embedding).filter(
+        DocumentChunk.content_hash == document.content_hash
+    ).order_by(DocumentChunk.chunk_index.asc()).all()
+    document.content = source.content
+    document.chunk_count = source.chunk_count
+    document.vector_id = source.vector_id
+    document.is_processed = True
+    db.commit()
+
+    rows = [row for row in rows if row[1] is not None]
+    if rows:
+        get_vector_store().add(
+            document.user_id,
+            [row[0] for row in rows],
+            np.vstack([bytes_to_vector(row[1]) for row in rows])
+        )
+    bump_corpus_version(db, document.user_id)
+    print(f"[DEBUG] Document {document.id} reuses {len(rows)} chunks of {document.content_hash[:12]}", file=sys.stderr)
+    return True
+
+
+def process_document(document_id: int) -> int:
+    """Extract, chunk, embed and index one document. Returns its chunk count."""
+    db = SessionLocal()
+    try:
+        document = db.get(Document, document_id)
+        if document is None:
+            raise ValueError(f"Document {document_id} not found")
+        if not document.content_hash:
+            return _ingest(db, document)
+        with _hash_lock(document.content_hash):
+            if attach_existing_chunks(db, document):
+                return document.chunk_count
+            return _ingest(db, document)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def _ingest(db, document: Document) -> int:
+    """Run the full extract, chunk, embed and index pipeline for a document."""
+    store = get_vector_store()
+
+    # A retried job starts from a clean slate
+    old_ids = [row[0] for row in db.query(DocumentChunk.id).filter(
+        DocumentChunk.document_id == document.id
+    ).all()]
+    if old_ids:
+        unindex_chunks(db, "document_id", document.id)
+        db.query(DocumentChunk).filter(
+            DocumentChunk.document_id == document.id
+        ).delete(synchronize_session=False)
+        store.remove(document.user_id, old_ids)
+
+    document.vector_id = document.vector_id or str(uuid.uuid4())
+    namespace = uuid.UUID(document.vector_id)
+
+    # Stream pages -> token chunks -> batched embed (cache first) + bulk insert
+    pages = get_extraction_engine().iter_pages(document.file_path, document.file_type)
+    chunk_count = 0
+    preview = ""
+    vectors = []
+    for batch in batched(iter_chunks(pages), INGESTION_BATCH_SIZE):
+        batch_vectors = embed_texts_cached(batch)
+        db.execute(insert(DocumentChunk), [
+            {
+                "document_id": document.id,
+                "content_hash": document.content_hash,
+                "chunk_index": chunk_count + offset,
+                "content": text,
+                "vector_id": str(uuid.uuid5(namespace, str(chunk_count + offset))),
+                "embedding": vector_to_bytes(batch_vectors[offset])
+            }
+            for offset, text in enumerate(batch)
+        ])
+        vectors.append(batch_vectors)
+        preview = preview or batch[0][:PREVIEW_CHARS]
+        chunk_count += len(batch)
+
+    chunk_ids = [row[0] for row in db.query(DocumentChunk.id).filter(
+        DocumentChunk.document_id == document.id
+    ).order_by(DocumentChunk.chunk_index.asc()).all()]
+    index_document_chunks(db, document.id)
+
+    document.content = preview
+    document.chunk_count = chunk_count
+    document.is_processed = True
+    db.commit()
+
+    if vectors:
+        store.add(document.user_id, chunk_ids, np.vstack(vectors))
+    bump_corpus_version(db, document.user_id)
+    print(f"[DEBUG] Indexed document {document.id} into {chunk_count} chunks", file=sys.stderr)
+    return chunk_count
+
+
+def enqueue_document(db, document: Document) -> IngestionJob:
+    """Persist an ingestion job for a document and wake the workers."""
+    job = IngestionJob(document_id=document.id, status="pending")
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    if _pool is not None:
+        _pool.notify()
+    return job
+
+
+class IngestionWorkerPool:
+    """Asyncio workers that drain the ingestion_jobs table.
+
+    Jobs live in the database, so a restart only has to put interrupted
+    "running" jobs back to "pending". Claiming is a conditional UPDATE, which
+    keeps several workers (or several server processes) from taking the same
+    job. Failed jobs are retried with exponential backoff up to
+    INGESTION_MAX_ATTEMPTS.
+    """
+
+    def __init__(self, workers: int = INGESTION_WORKERS):
+        self.workers = workers
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        await self._loop.run_in_executor(None, self._recover)
+        self._tasks = [asyncio.create_task(self._run(n)) for n in range(self.workers)]
+        print(f"[DEBUG] Started {self.workers} ingestion workers", file=sys.stderr)
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def notify(self):
+        """Wake idle workers; safe to call from any thread."""
+        if self._loop is not None and self._wakeup is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def _recover(self):
+        db = SessionLocal()
+        try:
+            result = db.execute(
+                update(IngestionJob)
+                .where(IngestionJob.status == "running")
+                .values(status="pending", next_attempt_at=datetime.utcnow())
+            )
+            db.commit()
+            if result.rowcount:
+                print(f"[DEBUG] Requeued {result.rowcount} interrupted ingestion jobs", file=sys.stderr)
+        finally:
+            db.close()
+
+    def _claim(self) -> Optional[Tuple[int, int]]:
+        db = SessionLocal()
+        try:
+            candidates = db.query(IngestionJob.id, IngestionJob.document_id).filter(
+                IngestionJob.status == "pending",
+                IngestionJob.next_attempt_at <= datetime.utcnow()
+            ).order_by(IngestionJob.id.asc()).limit(5).all()
+            for job_id, document_id in candidates:
+                result = db.execute(
+                    update(IngestionJob)
+                    .where(IngestionJob.id == job_id, IngestionJob.status == "pending")
+                    .values(status="running", attempts=IngestionJob.attempts + 1, updated_at=datetime.utcnow())
+                )
+                db.commit()
+                if result.rowcount == 1:
+                    return job_id, document_id
+            return None
+        finally:
+            db.close()
+
+    def _finish(self, job_id: int, error: Optional[str] = None):
+        db = SessionLocal()
+        try:
+            job = db.get(IngestionJob, job_id)
+            if job is None:
+                return  # the document was deleted meanwhile
+            if error is None:
+                job.status = "done"
+                job.last_error = None
+            elif job.attempts >= INGESTION_MAX_ATTEMPTS:
+                job.status = "failed"
+                job.last_error = error
+            else:
+                job.status = "pending"
+                job.last_error = error
+                delay = INGESTION_RETRY_DELAY * (2 ** (job.attempts - 1))
+                job.next_attempt_at = datetime.utcnow() + timedelta(seconds=delay)
+            db.commit()
+        finally:
+            db.close()
+
+    async def _run(self, worker_id: int):
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                claimed = await loop.run_in_executor(None, self._claim)
+                if claimed is None:
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), timeout=INGESTION_POLL_INTERVAL)
+                    except asyncio.TimeoutError:
+                        pass
+                    self._wakeup.clear()
+                    continue
+
+                job_id, document_id = claimed
+                print(f"[DEBUG] Worker {worker_id} processing job {job_id} (document {document_id})", file=sys.stderr)
+                try:
+                    await loop.run_in_executor(None, process_document, document_id)
+                    error = None
+                except Exception as e:
+                    print(f"[ERROR] Ingestion job {job_id} failed: {str(e)}", file=sys.stderr)
+                    error = str(e)
+                await loop.run_in_executor(None, self._finish, job_id, error)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"[ERROR] Ingestion worker {worker_id}: {str(e)}", file=sys.stderr)
+                await asyncio.sleep(INGESTION_POLL_INTERVAL)
+
+
+_pool: Optional[IngestionWorkerPool] = None
+
+
+async def start_workers():
+    """Start the process-wide ingestion worker pool."""
+    global _pool
+    if _pool is None:
+        _pool = IngestionWorkerPool()
+        await _pool.start()
+
+
+async def stop_workers():
+    """Stop the ingestion worker pool."""
+    global _pool
+    if _pool is not None:
+        await _pool.stop()
+        _pool = None
+    shutdown_extraction_engine()
@@ -0,0 +1,104 @@
+import re
+import sys
+from typing import List, Tuple
+
+from sqlalchemy import text
+
+from backend.app.db import SessionLocal, engine
+
+FTS_TABLE = "document_chunks_fts"
+_TERM = re.compile(r"\w+(?:[-./:]\w+)*", re.UNICODE)
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+
+def fts_enabled() -> bool:
+    """FTS5 is a SQLite feature; other databases fall back to vector-only search."""
+    return engine.dialect.name == "sqlite"
+
+
+def create_fts_table():
+    """Create the BM25 index over document_chunks.content if it is missing.
+
+    It is an external-content FTS5 table keyed by document_chunks.id, so chunk
+    text is not stored twice. A newly created table is filled from the
+    existing chunks.
+    """
+    if not fts_enabled():
+        return
+    with engine.begin() as conn:
+        exists = conn.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": FTS_TABLE}
+        ).first()
+        if exists:
+            return
+        conn.execute(text(
+            f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+            "content, content='document_chunks', content_rowid='id', tokenize='unicode61')"
+        ))
+        conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+    print(f"[DEBUG] Created {FTS_TABLE}", file=sys.stderr)
+
+
+def index_document_chunks(db, document_id: int):
+    """Add a document's freshly inserted chunks to the FTS index (same transaction)."""
+    if not fts_enabled():
+        return
+    db.execute(text(
+        f"INSERT INTO {FTS_TABLE}(rowid, content) "
+        "SELECT id, content FROM document_chunks WHERE document_id = :document_id"
+    ), {"document_id": document_id})
+
+
+def unindex_chunks(db, column: str, value):
+    """Remove chunks from the FTS index before their rows are deleted.
+
+    column is "document_id" or "content_hash". External-content tables need
+    the original text to delete, so this must run while the rows still exist.
+    """
+    if not fts_enabled():
+        return
+    if column not in ("document_id", "content_hash"):
+        raise ValueError(f"Unsupported column {column}")
+    db.execute(text(
+        f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, content) "
+        f"SELECT 'delete', id, content FROM document_chunks WHERE {column} = :value"
+    ), {"value": value})
+
+
+def to_match_query(query: str) -> str:
+    """Turn free text into an FTS5 OR-query, keeping identifiers as phrases.
+
+    "ERR_503 on SKU-4411?" becomes "ERR_503" OR "SKU 4411" OR ..., so an
+    identifier the tokenizer splits still has to match as a whole.
+    """
+    phrases = []
+    for term in _TERM.findall(query):
+        tokens = _TOKEN.findall(term)
+        phrase = '"' + " ".join(tokens) + '"'
+        if tokens and phrase not in phrases:
+            phrases.append(phrase)
+    return " OR ".join(phrases)
+
+
+def search_lexical(user_id: int, query: str, top_k: int) -> List[Tuple[int, float]]:
+    """Return up to top_k (chunk_id, bm25) pairs from the user's chunks, best first.
+
+    SQLite's bm25() is lower-is-better; it is negated so higher is better.
+    """
+    if not fts_enabled():
+        return []
+    match = to_match_query(query)
+    if not match:
+        return []
+    db = SessionLocal()
+    try:
+        rows = db.execute(text(
+            f"SELECT rowid, bm25({FTS_TABLE}) AS rank FROM {FTS_TABLE} "
+            f"WHERE {FTS_TABLE} MATCH :match AND rowid IN ("
+            "  SELECT document_chunks.id FROM document_chunks WHERE document_chunks.content_hash IN ("
+            "    SELECT documents.content_hash FROM documents WHERE documents.user_id = :user_id))"
+            " ORDER BY rank LIMIT :limit"
+        ), {"match": match, "user_id": user_id, "limit": top_k}).all()
+    finally:
+        db.close()
+    return [(int(row[0]), -float(row[1])) for row in rows]
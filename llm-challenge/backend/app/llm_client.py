@@ -0,0 +1,371 @@
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from typing import AsyncIterator, Dict, List, Optional
+
+import httpx
+
+# Add parent directory to path to import config
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import (
+    GROQ_API_KEY, GROQ_API_URL, GROQ_MODEL,
+    OPENAI_API_KEY, OPENAI_API_URL, OPENAI_MODEL,
+    ANTHROPIC_API_KEY, ANTHROPIC_API_URL, ANTHROPIC_MODEL, ANTHROPIC_VERSION,
+    GEMINI_API_KEY, GEMINI_API_URL, GEMINI_MODEL,
+    OLLAMA_URL, OLLAMA_MODEL, LLM_PROVIDERS,
+    LLM_CONNECT_TIMEOUT, LLM_READ_TIMEOUT, LLM_MAX_CONNECTIONS,
+    LLM_MAX_KEEPALIVE, LLM_KEEPALIVE_EXPIRY, LLM_RATE_LIMITS
+)
+from backend.app.context_packer import count_tokens, MESSAGE_OVERHEAD_TOKENS
+
+
+class LLMError(Exception):
+    """A chat completion failed; status_code is set for HTTP error responses.
+
+    retry_after holds the seconds from a Retry-After header, when one was sent.
+    """
+
+    def __init__(self, message: str, status_code: Optional[int] = None, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a Retry-After header, given as seconds or an HTTP date."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class LatencyTracker:
+    """Percentiles over a window of recent latency samples."""
+
+    def __init__(self, window: int = 1000):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.count = 0
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+            self.count += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return {"count": self.count, "p50_ms": 0.0, "p95_ms": 0.0, "mean_ms": 0.0}
+        def percentile(p):
+            return round(samples[min(len(samples) - 1, int(p * len(samples)))] * 1000, 1)
+        return {
+            "count": self.count,
+            "p50_ms": percentile(0.5),
+            "p95_ms": percentile(0.95),
+            "mean_ms": round(sum(samples) / len(samples) * 1000, 1)
+        }
+
+
+class LLMClient:
+    """OpenAI-compatible chat completions over one pooled httpx.AsyncClient.
+
+    The client is shared by every request in the worker, so connections to
+    the provider are kept alive and reused instead of paying a TCP and TLS
+    handshake per chat, and calls are awaited rather than blocking the event
+    loop. Connect and read timeouts bound how long a stalled provider can
+    hold a request. With a limiter, calls wait for the provider's rate
+    limits and 429 / 5xx responses are retried; with a breaker, calls fail
+    fast while the provider's circuit is open.
+    """
+
+    path = "/chat/completions"
+
+    def __init__(
+        self,
+        base_url: str = GROQ_API_URL,
+        api_key: str = GROQ_API_KEY,
+        model: str = GROQ_MODEL,
+        connect_timeout: float = LLM_CONNECT_TIMEOUT,
+        read_timeout: float = LLM_READ_TIMEOUT,
+        max_connections: int = LLM_MAX_CONNECTIONS,
+        max_keepalive: int = LLM_MAX_KEEPALIVE,
+        name: str = "groq",
+        requires_key: bool = True,
+        limiter=None,
+        breaker=None
+    ):
+        self.name = name
+        self.limiter = limiter
+        self.breaker = breaker
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+        self.model = model
+        self.requires_key = requires_key
+        self._client = httpx.AsyncClient(
+            base_url=self.base_url,
+            headers=self._headers(),
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive,
+                keepalive_expiry=LLM_KEEPALIVE_EXPIRY
+            )
+        )
+        self.requests = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.seconds = 0.0
+        self.first_token = LatencyTracker()
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.api_key) or (not self.requires_key and bool(self.base_url))
+
+    @property
+    def available(self) -> bool:
+        """False while the provider's circuit is open."""
+        return self.breaker is None or self.breaker.available
+
+    def _headers(self) -> Dict[str, str]:
+        headers = {"Content-Type": "application/json"}
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+        return headers
+
+    def _payload(self, messages: List[Dict], params: Dict, stream: bool) -> Dict:
+        payload = {"model": self.model, "messages": messages, **params}
+        if stream:
+            payload["stream"] = True
+        return payload
+
+    def _parse_completion(self, response_json: Dict) -> str:
+        if not response_json.get("choices"):
+            raise LLMError(f"Unexpected response structure: {response_json}")
+        return response_json["choices"][0]["message"]["content"]
+
+    def _parse_delta(self, event: Dict) -> Optional[str]:
+        choices = event.get("choices") or []
+        return (choices[0].get("delta") or {}).get("content") if choices else None
+
+    def _http_error(self, response: httpx.Response, body: str) -> LLMError:
+        return LLMError(f"{response.status_code} - {body}", response.status_code, parse_retry_after(response.headers.get("retry-after")))
+
+    def _estimate_tokens(self, payload: Dict) -> int:
+        """Prompt tokens plus the completion allowance, as counted against tokens/min."""
+        prompt = sum(count_tokens(str(m.get("content") or "")) + MESSAGE_OVERHEAD_TOKENS for m in payload["messages"])
+        return prompt + count_tokens(payload.get("system", "")) + int(payload.get("max_tokens") or 0)
+
+    async def _limited(self, payload: Dict, attempt):
+        if self.limiter is None:
+            return await attempt()
+        return await self.limiter.call(self._estimate_tokens(payload), attempt)
+
+    async def _guarded(self, payload: Dict, attempt):
+        """Run attempt through the circuit breaker, then the rate limiter."""
+        if self.breaker is None:
+            return await self._limited(payload, attempt)
+        self.breaker.before_call()
+        try:
+            result = await self._limited(payload, attempt)
+        except Exception as e:
+            self.breaker.record_error(e)
+            raise
+        except BaseException:
+            self.breaker.record_cancelled()
+            raise
+        self.breaker.record_success()
+        return result
+
+    @contextmanager
+    def _call(self):
+        """Count a request and turn transport failures into LLMError."""
+        start = time.perf_counter()
+        self.requests += 1
+        self.in_flight += 1
+        try:
+            yield
+        except httpx.TimeoutException as e:
+            self.errors += 1
+            raise LLMError(f"Timed out: {type(e).__name__}") from e
+        except httpx.HTTPError as e:
+            self.errors += 1
+            raise LLMError(f"Request failed: {str(e)}") from e
+        except LLMError:
+            self.errors += 1
+            raise
+        finally:
+            self.in_flight -= 1
+            self.seconds += time.perf_counter() - start
+
+    async def complete(self, messages: List[Dict], **params) -> str:
+        """Return the assistant message for a chat completion request."""
+        payload = self._payload(messages, params, stream=False)
+
+        async def attempt():
+            with self._call():
+                response = await self._client.post(self.path, json=payload)
+                if response.status_code != 200:
+                    raise self._http_error(response, response.text)
+                return self._parse_completion(response.json())
+
+        return await self._guarded(payload, attempt)
+
+    async def stream(self, messages: List[Dict], **params) -> AsyncIterator[str]:
+        """Yield content deltas of a streamed chat completion as they arrive.
+
+        Retries apply until the first token; a failure after it is raised.
+        The breaker records one outcome per stream, once it has ended, so a
+        stream that fails midway is not also counted as a success.
+        """
+        payload = self._payload(messages, params, stream=True)
+
+        async def attempt():
+            tokens = self._stream_once(payload)
+            try:
+                return tokens, await tokens.__anext__()
+            except StopAsyncIteration:
+                return tokens, None
+            except BaseException:
+                await tokens.aclose()
+                raise
+
+        if self.breaker is not None:
+            self.breaker.before_call()
+        finished, error = False, None
+        try:
+            tokens, first = await self._limited(payload, attempt)
+            try:
+                if first is not None:
+                    yield first
+                    async for token in tokens:
+                        yield token
+            finally:
+                await tokens.aclose()
+            finished = True
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            if self.breaker is not None:
+                if finished:
+                    self.breaker.record_success()
+                elif error is not None:
+                    self.breaker.record_error(error)
+                else:
+                    # Cancelled, or the consumer stopped reading
+                    self.breaker.record_cancelled()
+
+    async def _stream_once(self, payload: Dict) -> AsyncIterator[str]:
+        start = time.perf_counter()
+        first = True
+        with self._call():
+            async with self._client.stream("POST", self.path, json=payload) as response:
+                if response.status_code != 200:
+                    body = (await response.aread()).decode("utf-8", errors="replace")
+                    raise self._http_error(response, body)
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[len("data:"):].strip()
+                    if data == "[DONE]":
+                        break
+                    token = self._parse_delta(json.loads(data))
+                    if token:
+                        if first:
+                            self.first_token.record(time.perf_counter() - start)
+                            first = False
+                        yield token
+
+    def stats(self) -> dict:
+        return {
+            "name": self.name,
+            "base_url": self.base_url,
+            "requests": self.requests,
+            "errors": self.errors,
+            "in_flight": self.in_flight,
+            "avg_ms": round(self.seconds / self.requests * 1000, 1) if self.requests else 0.0,
+            "provider_first_token": self.first_token.stats(),
+            "rate_limit": self.limiter.stats() if self.limiter else None,
+            "circuit": self.breaker.stats() if self.breaker else None
+        }
+
+    async def close(self):
+        await self._client.aclose()
+
+
+class AnthropicClient(LLMClient):
+    """Anthropic's Messages API: system prompt apart, x-api-key auth, typed stream events."""
+
+    path = "/messages"
+
+    def __init__(self, base_url: str = ANTHROPIC_API_URL, api_key: str = ANTHROPIC_API_KEY, model: str = ANTHROPIC_MODEL, **kwargs):
+        super().__init__(base_url=base_url, api_key=api_key, model=model, name="anthropic", **kwargs)
+
+    def _headers(self) -> Dict[str, str]:
+        return {"Content-Type": "application/json", "x-api-key": self.api_key, "anthropic-version": ANTHROPIC_VERSION}
+
+    def _payload(self, messages: List[Dict], params: Dict, stream: bool) -> Dict:
+        payload = super()._payload([m for m in messages if m["role"] != "system"], params, stream)
+        system = "\n\n".join(m["content"] for m in messages if m["role"] == "system")
+        if system:
+            payload["system"] = system
+        payload.setdefault("max_tokens", 1024)  # required by the Messages API
+        return payload
+
+    def _parse_completion(self, response_json: Dict) -> str:
+        blocks = [block.get("text", "") for block in response_json.get("content") or [] if block.get("type") == "text"]
+        if not blocks:
+            raise LLMError(f"Unexpected response structure: {response_json}")
+        return "".join(blocks)
+
+    def _parse_delta(self, event: Dict) -> Optional[str]:
+        if event.get("type") == "error":
+            raise LLMError(f"Stream error: {event.get('error')}")
+        if event.get("type") == "content_block_delta":
+            return (event.get("delta") or {}).get("text")
+        return None
+
+
+def build_clients() -> List[LLMClient]:
+    """One client per provider in LLM_PROVIDERS order, skipping unconfigured ones.
+
+    Each gets a limiter with its LLM_RATE_LIMITS, which also retries 429 / 5xx,
+    and a circuit breaker.
+    """
+    # Imported here: both modules import this one
+    from backend.app.rate_limiter import ProviderLimiter
+    from backend.app.circuit_breaker import CircuitBreaker
+
+    def guards(name):
+        requests_per_minute, tokens_per_minute = LLM_RATE_LIMITS.get(name, (0, 0))
+        return {"limiter": ProviderLimiter(name, requests_per_minute, tokens_per_minute), "breaker": CircuitBreaker(name)}
+
+    # Whether each provider is configured, checked before its client (and connection pool) is built
+    factories = {
+        "groq": (bool(GROQ_API_KEY), lambda: LLMClient(GROQ_API_URL, GROQ_API_KEY, GROQ_MODEL, name="groq", **guards("groq"))),
+        "openai": (bool(OPENAI_API_KEY), lambda: LLMClient(OPENAI_API_URL, OPENAI_API_KEY, OPENAI_MODEL, name="openai", **guards("openai"))),
+        "anthropic": (bool(ANTHROPIC_API_KEY), lambda: AnthropicClient(**guards("anthropic"))),
+        "gemini": (bool(GEMINI_API_KEY), lambda: LLMClient(GEMINI_API_URL, GEMINI_API_KEY, GEMINI_MODEL, name="gemini", **guards("gemini"))),
+        "ollama": (bool(OLLAMA_URL), lambda: LLMClient(OLLAMA_URL, "", OLLAMA_MODEL, name="ollama", requires_key=False, **guards("ollama"))),
+    }
+    clients = []
+    for name in LLM_PROVIDERS:
+        if name not in factories:
+            print(f"[WARNING] Unknown LLM provider '{name}'. Choose from: {', '.join(factories)}", file=sys.stderr)
+            continue
+        configured, factory = factories[name]
+        if configured:
+            clients.append(factory())
+    return clients
@@ -0,0 +1,286 @@
+import asyncio
+import math
+import os
+import random
+import sys
+import threading
+import time
+from typing import AsyncIterator, Dict, List, Optional
+
+# Add parent directory to path to import config
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import LLM_EWMA_ALPHA, LLM_ERROR_HALF_LIFE, LLM_MAX_ERROR_RATE, LLM_HEDGE_DELAY_MS, LLM_EXPLORE_RATE
+from backend.app.llm_client import LLMClient, LLMError, build_clients
+from backend.app.circuit_breaker import CircuitOpenError
+
+
+class ProviderHealth:
+    """EWMA latency and a time-decayed error rate for one provider.
+
+    Latency is kept separately for whole completions and for time to first
+    streamed token, since the two are not comparable. The error rate halves
+    every error_half_life seconds without new samples, so a provider that
+    was marked unhealthy is tried again once its failures are old.
+    """
+
+    def __init__(self, alpha: float = LLM_EWMA_ALPHA, error_half_life: float = LLM_ERROR_HALF_LIFE):
+        self.alpha = alpha
+        self.error_half_life = error_half_life
+        self.latency: Dict[str, Optional[float]] = {"complete": None, "stream": None}
+        self._error_rate = 0.0
+        self._error_at = time.monotonic()
+        self._lock = threading.Lock()
+        self.successes = 0
+        self.failures = 0
+
+    def error_rate(self) -> float:
+        with self._lock:
+            return self._decayed(time.monotonic())
+
+    def _decayed(self, now: float) -> float:
+        if self.error_half_life <= 0:
+            return self._error_rate
+        return self._error_rate * math.pow(0.5, (now - self._error_at) / self.error_half_life)
+
+    def _record_error(self, failed: bool):
+        now = time.monotonic()
+        self._error_rate = self.alpha * (1.0 if failed else 0.0) + (1 - self.alpha) * self._decayed(now)
+        self._error_at = now
+
+    def record_latency(self, kind: str, seconds: float):
+        """A latency sample that is not an outcome, e.g. a hedged loser's elapsed time."""
+        with self._lock:
+            current = self.latency[kind]
+            self.latency[kind] = seconds if current is None else self.alpha * seconds + (1 - self.alpha) * current
+
+    def record_success(self, kind: str, seconds: float):
+        self.record_latency(kind, seconds)
+        with self._lock:
+            self.successes += 1
+            self._record_error(False)
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._record_error(True)
+
+    def expected_latency(self, kind: str) -> Optional[float]:
+        with self._lock:
+            other = "stream" if kind == "complete" else "complete"
+            return self.latency[kind] if self.latency[kind] is not None else self.latency[other]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "ewma_complete_ms": round(self.latency["complete"] * 1000, 1) if self.latency["complete"] is not None else None,
+                "ewma_first_token_ms": round(self.latency["stream"] * 1000, 1) if self.latency["stream"] is not None else None,
+                "error_rate": round(self._decayed(time.monotonic()), 4),
+                "successes": self.successes,
+                "failures": self.failures,
+            }
+
+
+class LLMRouter:
+    """Sends each chat to the fastest healthy provider, with hedging and failover.
+
+    Providers whose error rate is at most max_error_rate are healthy and are
+    ranked by EWMA latency; providers without samples yet rank first, in
+    LLM_PROVIDERS order, so each is measured once. A small share of requests
+    (explore_rate) goes to the runner-up first, so a provider whose EWMA was
+    pushed up by a slow spell gets measured again. Unhealthy providers are
+    only used after every healthy one has failed, and providers with an open
+    circuit come last, where they fail fast. With hedge_delay_ms > 0, a
+    request still unanswered after the delay is also sent to the next
+    provider, the first success wins and the other is cancelled. Failures
+    fall through to the remaining providers in rank order.
+    """
+
+    def __init__(
+        self,
+        clients: List[LLMClient],
+        hedge_delay_ms: float = LLM_HEDGE_DELAY_MS,
+        max_error_rate: float = LLM_MAX_ERROR_RATE,
+        explore_rate: float = LLM_EXPLORE_RATE
+    ):
+        self.clients = clients
+        self.health = {client.name: ProviderHealth() for client in clients}
+        self.hedge_delay = hedge_delay_ms / 1000.0
+        self.max_error_rate = max_error_rate
+        self.explore_rate = explore_rate
+        self.explorations = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.failovers = 0
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.clients)
+
+    @property
+    def model(self) -> str:
+        """The providers and models this router may answer with."""
+        return ",".join(f"{client.name}/{client.model}" for client in self.clients)
+
+    def rank(self, kind: str = "complete") -> List[LLMClient]:
+        """Providers in the order they should be tried."""
+        def key(item):
+            position, client = item
+            health = self.health[client.name]
+            latency = health.expected_latency(kind)
+            return (
+                not client.available,
+                health.error_rate() > self.max_error_rate,
+                latency is not None,
+                latency or 0.0,
+                position
+            )
+        return [client for _, client in sorted(enumerate(self.clients), key=key)]
+
+    async def _race(self, kind: str, start_attempt, discard=None):
+        """Run attempts from rank order, hedging and failing over as configured.
+
+        start_attempt(client) returns an awaitable whose result ends the race
+        when it succeeds; discard(result) releases a result that lost. Returns
+        (client, result, started_at); raises the last LLMError once every
+        provider has failed.
+        """
+        queue = self.rank(kind)
+        if not queue:
+            raise LLMError("No LLM provider is configured")
+        if len(queue) > 1 and random.random() < self.explore_rate and \
+                self.health[queue[1].name].error_rate() <= self.max_error_rate:
+            self.explorations += 1
+            queue[0], queue[1] = queue[1], queue[0]
+        attempts: Dict[asyncio.Future, tuple] = {}
+        hedged = False
+        last_error: Optional[Exception] = None
+
+        def launch(hedge: bool = False):
+            client = queue.pop(0)
+            attempts[asyncio.ensure_future(start_attempt(client))] = (client, time.perf_counter(), hedge)
+
+        launch()
+        try:
+            while attempts:
+                can_hedge = self.hedge_delay > 0 and not hedged and queue and len(attempts) == 1
+                done, _ = await asyncio.wait(
+                    list(attempts), timeout=self.hedge_delay if can_hedge else None,
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    hedged = True
+                    self.hedges += 1
+                    print(f"[DEBUG] Hedging LLM request to {queue[0].name}", file=sys.stderr)
+                    launch(hedge=True)
+                    continue
+                for task in done:
+                    client, started, hedge = attempts.pop(task)
+                    try:
+                        result = task.result()
+                    except CircuitOpenError as e:
+                        # Rejected without a call; not a new sample of the provider's health
+                        last_error = e
+                        continue
+                    except Exception as e:
+                        last_error = e
+                        self.health[client.name].record_failure()
+                        print(f"[WARNING] LLM provider {client.name} failed: {str(e)}", file=sys.stderr)
+                        continue
+                    if hedge:
+                        self.hedge_wins += 1
+                    return client, result, started
+                if not attempts and queue:
+                    self.failovers += 1
+                    launch()
+        finally:
+            # Cancel the loser; its elapsed time is a lower bound on its latency
+            for task, (client, started, _) in attempts.items():
+                task.cancel()
+                self.health[client.name].record_latency(kind, time.perf_counter() - started)
+            if attempts:
+                results = await asyncio.gather(*attempts, return_exceptions=True)
+                for result in results:
+                    if discard is not None and not isinstance(result, BaseException):
+                        await discard(result)
+        raise last_error if isinstance(last_error, LLMError) else LLMError(f"All LLM providers failed: {last_error}")
+
+    async def complete(self, messages: List[Dict], **params) -> str:
+        """Return the first successful completion across providers."""
+        client, answer, started = await self._race("complete", lambda c: c.complete(messages, **params))
+        self._record_win(client, "complete", time.perf_counter() - started)
+        return answer
+
+    async def stream(self, messages: List[Dict], **params) -> AsyncIterator[str]:
+        """Stream from the provider that produces a first token first.
+
+        Hedging and failover apply until the first token; after that the
+        winner's stream is relayed, and a failure mid-answer is raised.
+        """
+        async def first_token(client):
+            tokens = client.stream(messages, **params)
+            try:
+                return tokens, await tokens.__anext__()
+            except StopAsyncIteration:
+                return tokens, None
+            except BaseException:
+                await tokens.aclose()
+                raise
+
+        async def discard(result):
+            await result[0].aclose()
+
+        client, (tokens, first), started = await self._race("stream", first_token, discard)
+        self._record_win(client, "stream", time.perf_counter() - started)
+        try:
+            if first is not None:
+                yield first
+                async for token in tokens:
+                    yield token
+        except LLMError:
+            self.health[client.name].record_failure()
+            raise
+        finally:
+            await tokens.aclose()
+
+    def _record_win(self, client: LLMClient, kind: str, seconds: float):
+        self.health[client.name].record_success(kind, seconds)
+
+    def circuits(self) -> Dict[str, str]:
+        """Circuit state per provider, for /health."""
+        return {client.name: client.breaker.state if client.breaker else "none" for client in self.clients}
+
+    def stats(self) -> dict:
+        return {
+            "order": [client.name for client in self.rank()],
+            "hedge_delay_ms": self.hedge_delay * 1000,
+            "explorations": self.explorations,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "failovers": self.failovers,
+            "providers": {
+                client.name: {**self.health[client.name].stats(), **client.stats()}
+                for client in self.clients
+            }
+        }
+
+    async def close(self):
+        for client in self.clients:
+            await client.close()
+
+
+_llm_router: Optional[LLMRouter] = None
+
+
+def get_llm_router() -> LLMRouter:
+    """The worker's shared router over every configured provider, created on first use."""
+    global _llm_router
+    if _llm_router is None:
+        _llm_router = LLMRouter(build_clients())
+    return _llm_router
+
+
+async def close_llm_router():
+    global _llm_router
+    if _llm_router is not None:
+        await _llm_router.close()
+        _llm_router = None
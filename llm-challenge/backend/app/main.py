@@ -10,8 +10,8 @@ sys.path.insert(0, str(project_root))
 from fastapi import FastAPI, HTTPException, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime, Boolean, ForeignKey
-from sqlalchemy.orm import sessionmaker, Session, declarative_base
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker, Session
 from pydantic import BaseModel
 from typing import List, Optional
 import uuid
@@ -25,42 +25,14 @@ engine = create_engine(
     connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {}
 )
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-Base = declarative_base()
-
-class User(Base):
-    __tablename__ = "users"
-    id = Column(Integer, primary_key=True, index=True)
-    email = Column(String, unique=True, index=True, nullable=False)
-    full_name = Column(String, nullable=False)
-    hashed_password = Column(String, nullable=False)
-    is_active = Column(Boolean, default=True)
-    created_at = Column(DateTime, default=datetime.utcnow)
-
-class Conversation(Base):
-    __tablename__ = "conversations"
-    id = Column(Integer, primary_key=True, index=True)
-    title = Column(String, nullable=False)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    created_at = Column(DateTime, default=datetime.utcnow)
-
-class Message(Base):
-    __tablename__ = "messages"
-    id = Column(Integer, primary_key=True, index=True)
-    conversation_id = Column(Integer, ForeignKey("conversations.id"), nullable=False)
-    role = Column(String, nullable=False)
-    content = Column(Text, nullable=False)
-    created_at = Column(DateTime, default=datetime.utcnow)
-
-class Document(Base):
-    __tablename__ = "documents"
-    id = Column(Integer, primary_key=True, index=True)
-    title = Column(String, nullable=False)
-    content = Column(Text, nullable=False)
-    file_type = Column(String, nullable=False)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    created_at = Column(DateTime, default=datetime.utcnow)
+
+# ORM models live in backend.app.models; create their tables on this engine so
+# documents and document_chunks share one schema with routes.py and rag.py.
+from backend.app.models import Base, User, Conversation, Message, Document, DocumentChunk
+from backend.app.lexical import create_fts_table
 
 Base.metadata.create_all(bind=engine)
+create_fts_table()
 
 # ---------------- FastAPI App ----------------
 app = FastAPI(
@@ -110,18 +82,42 @@ app.include_router(auth.router, prefix="/auth", tags=["Auth"])
 app.include_router(routes.router, prefix="/api", tags=["API"])
 app.include_router(rag.router, prefix="/rag", tags=["RAG & Documents"])
 
+# ---------------- Ingestion ----------------
+from backend.app import ingestion
+from backend.app.embeddings import start_embedding_service, stop_embedding_service
+from backend.app.rerank import get_reranker
+from backend.app.llm_router import close_llm_router, get_llm_router
+
+@app.on_event("startup")
+async def start_ingestion_workers():
+    await start_embedding_service()
+    if get_reranker():
+        get_reranker().warm_up()
+    await ingestion.start_workers()
+
+@app.on_event("shutdown")
+async def stop_ingestion_workers():
+    await ingestion.stop_workers()
+    await stop_embedding_service()
+    await close_llm_router()
+
 # ---------------- Health ----------------
 @app.get("/")
 def root(): return {"message": "DocuChat AI Backend", "status": "running"}
 
 @app.get("/health")
 def health_check(): 
+    # "degraded" while some LLM provider circuits are open, "unavailable" when all are
+    circuits = get_llm_router().circuits()
+    open_circuits = sum(1 for state in circuits.values() if state == "open")
+    status = "unavailable" if circuits and open_circuits == len(circuits) else "degraded" if open_circuits else "healthy"
     return {
-        "status": "healthy",
+        "status": status,
         "timestamp": datetime.utcnow().isoformat(),
         "database": "connected" if engine else "disconnected",
         "api_keys": {
             "groq": bool(os.getenv("GROQ_API_KEY")),
             "gemini": bool(os.getenv("GEMINI_API_KEY"))
-        }
+        },
+        "llm_circuits": circuits
     }
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey, Float
+from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey, Float, LargeBinary
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -14,6 +14,7 @@ class User(Base):
     hashed_password = Column(String, nullable=False)
     is_active = Column(Boolean, default=True)
     is_verified = Column(Boolean, default=False)
+    corpus_version = Column(Integer, default=0, nullable=False)  # bumped whenever the user's searchable chunks change
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
@@ -46,6 +47,7 @@ class Message(Base):
     # RAG specific fields
     sources = Column(Text)  # JSON string of source documents
     confidence_score = Column(Float)
+    cache_hit = Column(Boolean, default=False)  # answer served from the semantic answer cache
 
     # Relationships
     conversation = relationship("Conversation", back_populates="messages")
@@ -59,6 +61,7 @@ class Document(Base):
     file_path = Column(String, nullable=False)
     file_type = Column(String, nullable=False)  # txt, pdf, docx, etc.
     file_size = Column(Integer)
+    content_hash = Column(String(64), index=True)  # SHA-256 of the uploaded bytes
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -75,11 +78,28 @@ class DocumentChunk(Base):
     __tablename__ = "document_chunks"
 
     id = Column(Integer, primary_key=True, index=True)
-    document_id = Column(Integer, ForeignKey("documents.id"), nullable=False)
+    document_id = Column(Integer, ForeignKey("documents.id"), nullable=False, index=True)  # document that produced the chunk
+    content_hash = Column(String(64), index=True)  # shared by every Document with the same bytes
     chunk_index = Column(Integer, nullable=False)
     content = Column(Text, nullable=False)
     vector_id = Column(String, nullable=False)  # Qdrant vector ID
+    embedding = Column(LargeBinary)  # float32 vector bytes, see backend.app.embeddings
     created_at = Column(DateTime, default=datetime.utcnow)
 
     # Relationships
     document = relationship("Document")
+
+class IngestionJob(Base):
+    __tablename__ = "ingestion_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    document_id = Column(Integer, ForeignKey("documents.id"), nullable=False, index=True)
+    status = Column(String, nullable=False, default="pending", index=True)  # pending, running, done, failed
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(Text)
+    next_attempt_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    # Relationships
+    document = relationship("Document")
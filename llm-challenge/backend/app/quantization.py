@@ -0,0 +1,157 @@
+import os
+import sys
+import threading
+import uuid
+from typing import List, Tuple
+
+import numpy as np
+
+# Add parent directory to path to import config
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import QUANTIZED_RESCORE_FACTOR
+
+QUANTIZATIONS = ("int8", "binary")
+
+
+class QuantizedIndex:
+    """A tenant's vectors as int8 or 1-bit codes in memory, float32 on disk.
+
+    The first pass searches compact codes: a per-dimension int8 scalar
+    quantizer scored by inner product, or sign bits scored by Hamming
+    distance. The best top_k * rescore_factor candidates are then rescored
+    exactly against the full-precision vectors, which live in an append-only
+    float32 file read through np.memmap, so only the rows being rescored are
+    paged in. Drop-in for ExactIndex in NumpyVectorStore.
+    """
+
+    def __init__(self, dimension: int, kind: str, path: str, rescore_factor: int = QUANTIZED_RESCORE_FACTOR):
+        import faiss
+        if kind not in QUANTIZATIONS:
+            raise ValueError(f"Unknown quantization '{kind}'. Choose from: {', '.join(QUANTIZATIONS)}")
+        self.faiss = faiss
+        self.dimension = dimension
+        self.kind = kind
+        self.path = path
+        self.rescore_factor = rescore_factor
+        self.size = 0
+        self._ids = np.zeros(0, dtype=np.int64)
+        self._codes = None
+        self._trained_on = 0
+        self._full = None
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        open(path, "wb").close()
+
+    @classmethod
+    def from_vectors(cls, ids: np.ndarray, matrix: np.ndarray, kind: str, path: str) -> "QuantizedIndex":
+        index = cls(matrix.shape[1], kind, path)
+        index.add(ids, matrix)
+        return index
+
+    def __len__(self) -> int:
+        return self.size
+
+    @property
+    def ids(self) -> np.ndarray:
+        return self._ids[:self.size]
+
+    @property
+    def nbytes(self) -> int:
+        """Resident bytes: codes plus ids. The float32 file is paged in on demand."""
+        code_size = self.dimension // 8 if self.kind == "binary" else self.dimension
+        return self.size * (code_size + self._ids.itemsize)
+
+    def vectors(self) -> np.ndarray:
+        """The full-precision vectors, e.g. to build an ANN index from."""
+        if not self.size:
+            return np.zeros((0, self.dimension), dtype=np.float32)
+        return np.array(self._full[:self.size])
+
+    def _encode_query(self, query: np.ndarray) -> np.ndarray:
+        if self.kind == "binary":
+            return np.packbits(query > 0).reshape(1, -1)
+        return query.reshape(1, -1)
+
+    def _build_codes(self, matrix: np.ndarray):
+        """Return a code index over matrix, training the int8 ranges on it."""
+        if self.kind == "binary":
+            codes = self.faiss.IndexBinaryFlat(self.dimension)
+            if len(matrix):
+                codes.add(np.packbits(matrix > 0, axis=1))
+            return codes
+        codes = self.faiss.IndexScalarQuantizer(
+            self.dimension, self.faiss.ScalarQuantizer.QT_8bit, self.faiss.METRIC_INNER_PRODUCT
+        )
+        if len(matrix):
+            codes.train(matrix)
+            codes.add(matrix)
+        self._trained_on = len(matrix)
+        return codes
+
+    def _open_full(self, size: int):
+        return np.memmap(self.path, dtype=np.float32, mode="r", shape=(size, self.dimension)) if size else None
+
+    def add(self, ids: np.ndarray, vectors: np.ndarray):
+        """Append rows whose ids are not already present."""
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        with self._lock:
+            fresh = ~np.isin(ids, self.ids)
+            ids, vectors = ids[fresh], vectors[fresh]
+            if not len(ids):
+                return
+            with open(self.path, "ab") as f:
+                f.write(vectors.tobytes())
+            size = self.size + len(ids)
+            full = self._open_full(size)
+            # int8 ranges are retrained from the full vectors whenever the index doubles
+            if self._codes is None or (self.kind == "int8" and size >= 2 * max(self._trained_on, 1)):
+                codes = self._build_codes(np.asarray(full))
+            else:
+                codes = self._codes
+                codes.add(np.packbits(vectors > 0, axis=1) if self.kind == "binary" else vectors)
+            self._codes, self._full = codes, full
+            self._ids = np.concatenate([self._ids[:self.size], ids])
+            self.size = size
+
+    def remove(self, ids: np.ndarray):
+        """Rewrite the vector file and codes without the given ids."""
+        with self._lock:
+            keep = np.flatnonzero(~np.isin(self.ids, ids))
+            if len(keep) == self.size:
+                return
+            matrix = np.asarray(self._full[keep]) if len(keep) else np.zeros((0, self.dimension), dtype=np.float32)
+            partial_path = f"{self.path}.{uuid.uuid4().hex}.tmp"
+            with open(partial_path, "wb") as f:
+                f.write(matrix.tobytes())
+            os.replace(partial_path, self.path)
+            self._codes = self._build_codes(matrix)
+            self._full = self._open_full(len(keep))
+            self._ids = self._ids[keep]
+            self.size = len(keep)
+
+    def search(self, query_vector: np.ndarray, top_k: int) -> List[Tuple[int, float]]:
+        query = np.asarray(query_vector, dtype=np.float32)
+        query = query / (np.linalg.norm(query) or 1.0)
+        with self._lock:
+            size, ids, full, codes = self.size, self._ids, self._full, self._codes
+            if not size:
+                return []
+            _, found = codes.search(self._encode_query(query), min(size, top_k * self.rescore_factor))
+        # Rescore candidates at full precision; sorted positions keep memmap reads sequential
+        positions = np.sort(found[0][found[0] >= 0])
+        if not len(positions):
+            return []
+        rows = full[positions]
+        norms = np.linalg.norm(rows, axis=1)
+        scores = (rows @ query) / np.where(norms > 0, norms, 1.0)
+        k = min(top_k, len(positions))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(ids[positions[i]]), float(scores[i])) for i in top]
+
+    def close(self):
+        """Delete the full-precision vector file."""
+        with self._lock:
+            self._full = None
+            if os.path.exists(self.path):
+                os.remove(self.path)
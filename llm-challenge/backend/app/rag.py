@@ -1,119 +1,230 @@
-def search_documents(query, user_id):
-    """Search for relevant documents for the given query"""
+async def search_documents(query, user_id, top_k=None):
+    """Return the top-k document chunks for the query, fusing vector and BM25 rankings"""
     import sys
-    from backend.app.main import get_db
-    from sqlalchemy.orm import Session
-    from backend.app.models import Document
+    import time
+    import asyncio
+    import numpy as np
+    from config import TOP_K_RESULTS, SIMILARITY_THRESHOLD
+    from backend.app.db import SessionLocal
+    from backend.app.models import Document, DocumentChunk
+    from backend.app.embeddings import bytes_to_vector
+    from backend.app.retrieval import hybrid_search
+    from backend.app.retrieval_cache import get_retrieval_cache, get_corpus_version
+    from backend.app.vector_store import user_content_hashes
     
+    db = None
     try:
-        # Get database session
-        db = next(get_db())
+        top_k = top_k or TOP_K_RESULTS
+        start = time.perf_counter()
         
-        # Get all documents for the user
-        documents = db.query(Document).filter(Document.user_id == user_id).all()
+        # Identical queries against an unchanged corpus reuse the last results
+        cache = get_retrieval_cache()
+        cache_key = cache.key(user_id, query, await asyncio.to_thread(get_corpus_version, user_id), top_k)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            print(f"[DEBUG] Retrieval cache hit ({len(cached)} chunks)", file=sys.stderr)
+            return cached
         
-        if not documents:
-            print("[DEBUG] No documents found for user", file=sys.stderr)
+        # Vector and lexical legs run concurrently, each within its own budget
+        query_vector, hits, cosine, complete = await hybrid_search(query, user_id, top_k)
+        
+        if not hits:
+            print("[DEBUG] No chunks matched the query", file=sys.stderr)
+            if complete:
+                cache.put(cache_key, [], time.perf_counter() - start)
             return []
-            
-        # For now, return all documents (we'll implement proper search later)
-        results = []
+        
+        # Load only the matching chunks, scoped to the user's content hashes
+        db = SessionLocal()
+        chunks = db.query(DocumentChunk).filter(
+            DocumentChunk.id.in_([chunk_id for chunk_id, _ in hits]),
+            DocumentChunk.content_hash.in_(user_content_hashes(user_id))
+        ).all()
+        documents = db.query(Document).filter(
+            Document.user_id == user_id,
+            Document.content_hash.in_(list({chunk.content_hash for chunk in chunks}))
+        ).order_by(Document.id.asc()).all()
+        doc_by_hash = {}
         for doc in documents:
+            doc_by_hash.setdefault(doc.content_hash, doc)
+        by_id = {chunk.id: (chunk, doc_by_hash[chunk.content_hash]) for chunk in chunks}
+        
+        results = []
+        for chunk_id, rrf_score in hits:
+            if chunk_id not in by_id:
+                continue
+            chunk, doc = by_id[chunk_id]
+            # Lexical-only hits are rescored against their stored embedding and
+            # held to the same threshold as vector hits; without a query vector
+            # or stored embedding they cannot be scored and are left out
+            score = cosine.get(chunk_id)
+            if score is None and query_vector is not None and chunk.embedding is not None:
+                score = float(np.dot(bytes_to_vector(chunk.embedding), query_vector))
+            if score is None or score < SIMILARITY_THRESHOLD:
+                continue
             results.append({
-                "content": doc.content,
+                "content": chunk.content,
                 "metadata": {
-                    "vector_id": str(doc.id),
+                    "vector_id": chunk.vector_id,
+                    "chunk_id": chunk.id,
+                    "chunk_index": chunk.chunk_index,
+                    "document_id": doc.id,
                     "title": doc.title,
-                    "file_type": doc.file_type
+                    "file_type": doc.file_type,
+                    "rrf_score": rrf_score
                 },
-                "score": 1.0  # Placeholder score
+                "score": score
             })
+            if len(results) == top_k:
+                break
             
-        print(f"[DEBUG] Found {len(results)} documents", file=sys.stderr)
+        print(f"[DEBUG] Found {len(results)} chunks", file=sys.stderr)
+        # Results from a leg that missed its budget are not cached
+        if complete:
+            cache.put(cache_key, results, time.perf_counter() - start)
         return results
         
     except Exception as e:
         print(f"[ERROR] Error in search_documents: {str(e)}", file=sys.stderr)
         return []  # Return empty list on error
+    finally:
+        if db is not None:
+            db.close()
 from fastapi import APIRouter, Depends, UploadFile, File, HTTPException
 from sqlalchemy.orm import Session
+import asyncio
 import uuid
 import os
 from datetime import datetime
-from backend.app.main import get_db, active_users, Document  # Import shared objects
-import requests
-from config import GROQ_API_KEY, GROQ_MODEL
-# --- Groq LLM integration ---
-def generate_response(prompt, context_docs, conversation_history):
-    """Generate a response using Groq API with fallback handling"""
-    import sys
-    
-    if not GROQ_API_KEY:
-        print("[ERROR] GROQ_API_KEY not set", file=sys.stderr)
-        return "I apologize, but I'm not configured properly. Please contact support."
-        
-    url = "https://api.groq.com/openai/v1/chat/completions"
-    headers = {
-        "Authorization": f"Bearer {GROQ_API_KEY}",
-        "Content-Type": "application/json"
-    }
-    
-    # Enhanced system prompt
-    system_prompt = """You are a helpful AI assistant specialized in analyzing documents and providing accurate information.
+from backend.app.main import get_db, active_users  # Import shared objects
+from backend.app.models import Document, DocumentChunk, IngestionJob
+from backend.app.uploads import save_upload
+from backend.app.vector_store import get_vector_store
+from backend.app.lexical import unindex_chunks
+from backend.app.ingestion import enqueue_document, attach_existing_chunks
+from backend.app.retrieval_cache import bump_corpus_version
+from backend.app.context_packer import pack_prompt
+from backend.app.llm_client import LLMError
+from backend.app.llm_router import get_llm_router
+from backend.app.single_flight import fingerprint, get_single_flight
+from backend.app.completion_cache import cacheable, get_completion_cache
+from backend.app.rate_limiter import llm_user
+from config import LLM_TEMPERATURE
+# --- LLM integration ---
+SAMPLING_PARAMS = {"max_tokens": 1000, "temperature": LLM_TEMPERATURE, "top_p": 0.9}
+
+SYSTEM_PROMPT = """You are a helpful AI assistant specialized in analyzing documents and providing accurate information.
 If you find relevant information in the context, use it to answer the question.
 If you don't find relevant information, say so clearly and provide a general response.
 Always be clear, concise, and accurate."""
 
-    # Process context documents
-    context_text = ""
-    if context_docs:
-        context_pieces = []
-        for doc in context_docs:
-            if isinstance(doc, dict) and "content" in doc:
-                context_pieces.append(doc["content"])
-        context_text = "\n\nContext:\n" + "\n---\n".join(context_pieces)
-
-    # Prepare conversation messages
-    messages = [
-        {"role": "system", "content": system_prompt + context_text},
-    ]
-    
-    # Add conversation history
-    if conversation_history:
-        for msg in conversation_history[-5:]:  # Only use last 5 messages for context
-            if isinstance(msg, dict) and "role" in msg and "content" in msg:
-                messages.append({"role": msg["role"], "content": msg["content"]})
-
-    # Add current prompt
-    messages.append({"role": "user", "content": prompt})
-
-    # Prepare API request
-    payload = {
-        "model": GROQ_MODEL,
-        "messages": messages,
-        "max_tokens": 1000,
-        "temperature": 0.7,
-        "top_p": 0.9
-    }
+NOT_CONFIGURED_MESSAGE = "I apologize, but I'm not configured properly. Please contact support."
+
+
+class AnswerUnavailable(Exception):
+    """Raised by stream_answer; the message is the fallback text to show the user."""
+
 
+def fallback_message(error: Exception) -> str:
+    """The user-facing text for a failed LLM call."""
+    if isinstance(error, LLMError):
+        if error.status_code is not None:
+            return f"I'm having trouble generating a response (Error {error.status_code}). Please try again in a moment."
+        return "I encountered an error processing your request. Please try again."
+    return "I encountered an error while processing your request. Please try again."
+
+
+def build_messages(prompt, context_docs, conversation_history):
+    """Fit the best chunks and the latest turns into the token budgets."""
+    import sys
+    messages, report = pack_prompt(SYSTEM_PROMPT, prompt, context_docs, conversation_history)
+    print(f"[DEBUG] Prompt tokens: {report}", file=sys.stderr)
+    return messages
+
+
+def _completion_cache(cache_completion):
+    """The completion cache, if this request may use it."""
+    return get_completion_cache() if cacheable(SAMPLING_PARAMS, cache_completion) else None
+
+
+async def generate_answer(prompt, context_docs, conversation_history, cache_completion=False, user_id=None):
+    """Generate a response through the LLM provider router with fallback handling.
+
+    Returns (text, ok); ok is False when text is a fallback message. Identical
+    requests are answered from the completion cache when the temperature is
+    0 or cache_completion is set, e.g. by evaluation replays. user_id keys
+    the fair queue when a provider's rate limit is reached.
+    """
+    import sys
+    
+    if user_id is not None:
+        llm_user.set(str(user_id))
+    client = get_llm_router()
+    if not client.configured:
+        print("[ERROR] No LLM provider configured (set GROQ_API_KEY or another provider key)", file=sys.stderr)
+        return NOT_CONFIGURED_MESSAGE, False
+    
+    messages = build_messages(prompt, context_docs, conversation_history)
     try:
-        print(f"[DEBUG] Sending request to Groq API with payload: {payload}", file=sys.stderr)
-        response = requests.post(url, json=payload, headers=headers)
-        
-        if response.status_code == 200:
-            response_json = response.json()
-            if "choices" in response_json and response_json["choices"]:
-                return response_json["choices"][0]["message"]["content"]
-            else:
-                print(f"[ERROR] Unexpected Groq API response structure: {response_json}", file=sys.stderr)
-                return "I encountered an error processing your request. Please try again."
-        else:
-            print(f"[ERROR] Groq API error: {response.status_code} - {response.text}", file=sys.stderr)
-            return f"I'm having trouble generating a response (Error {response.status_code}). Please try again in a moment."
-            
+        print(f"[DEBUG] Sending request to the LLM router with {len(messages)} messages", file=sys.stderr)
+        key = fingerprint(client.model, messages, SAMPLING_PARAMS)
+        cache = _completion_cache(cache_completion)
+        cached = await asyncio.to_thread(cache.get, key) if cache else None
+        if cached is not None:
+            print(f"[DEBUG] Completion cache hit for {key[:12]}", file=sys.stderr)
+            return cached, True
+        answer = await get_single_flight().do(key, lambda: client.complete(messages, **SAMPLING_PARAMS))
+        if cache:
+            await asyncio.to_thread(cache.put, key, answer)
+        return answer, True
+    except LLMError as e:
+        print(f"[ERROR] LLM error: {str(e)}", file=sys.stderr)
+        return fallback_message(e), False
     except Exception as e:
         print(f"[ERROR] Exception in generate_response: {str(e)}", file=sys.stderr)
-        return "I encountered an error while processing your request. Please try again."
+        return fallback_message(e), False
+
+async def generate_response(prompt, context_docs, conversation_history):
+    """Generate a response through the LLM provider router with fallback handling"""
+    return (await generate_answer(prompt, context_docs, conversation_history))[0]
+
+async def stream_answer(prompt, context_docs, conversation_history, cache_completion=False, user_id=None):
+    """Yield response tokens as the chosen provider streams them.
+
+    Raises AnswerUnavailable, carrying the fallback text, if the call fails.
+    A completion cache hit is yielded as a single token.
+    """
+    import sys
+    
+    if user_id is not None:
+        llm_user.set(str(user_id))
+    client = get_llm_router()
+    if not client.configured:
+        print("[ERROR] No LLM provider configured (set GROQ_API_KEY or another provider key)", file=sys.stderr)
+        raise AnswerUnavailable(NOT_CONFIGURED_MESSAGE)
+    
+    messages = build_messages(prompt, context_docs, conversation_history)
+    try:
+        print(f"[DEBUG] Streaming from the LLM router with {len(messages)} messages", file=sys.stderr)
+        key = fingerprint(client.model, messages, SAMPLING_PARAMS)
+        cache = _completion_cache(cache_completion)
+        cached = await asyncio.to_thread(cache.get, key) if cache else None
+        if cached is not None:
+            print(f"[DEBUG] Completion cache hit for {key[:12]}", file=sys.stderr)
+            yield cached
+            return
+        tokens = []
+        async for token in get_single_flight().stream(key, lambda: client.stream(messages, **SAMPLING_PARAMS)):
+            tokens.append(token)
+            yield token
+        if cache and tokens:
+            await asyncio.to_thread(cache.put, key, "".join(tokens))
+    except LLMError as e:
+        print(f"[ERROR] LLM error: {str(e)}", file=sys.stderr)
+        raise AnswerUnavailable(fallback_message(e)) from e
+    except Exception as e:
+        print(f"[ERROR] Exception in stream_answer: {str(e)}", file=sys.stderr)
+        raise AnswerUnavailable(fallback_message(e)) from e
 
 router = APIRouter()
 
@@ -124,32 +235,41 @@ async def upload_document(file: UploadFile = File(...), token: str = None, db: S
     
     user = active_users[token]
     
-    # Save file
-    if not os.path.exists("uploads"):
-        os.makedirs("uploads")
-    file_path = f"uploads/{uuid.uuid4()}_{file.filename}"
-    with open(file_path, "wb") as buffer:
-        content = await file.read()
-        buffer.write(content)
+    # Stream file to disk, enforcing size and type limits
+    saved = await save_upload(file)
     
     # Create document record
     document = Document(
-        title=file.filename,
-        content=f"Content of {file.filename}",
-        file_type=file.filename.split('.')[-1],
+        title=saved["filename"],
+        content="",
+        file_path=saved["file_path"],
+        file_type=saved["file_type"],
+        file_size=saved["file_size"],
+        content_hash=saved["content_hash"],
         user_id=user.id
     )
     db.add(document)
     db.commit()
     db.refresh(document)
     
+    # Content seen before reuses its chunks and embeddings; anything else is
+    # parsed, chunked and embedded on the ingestion workers. Either path bumps
+    # the corpus version once the chunks are searchable.
+    job = None
+    if not await asyncio.to_thread(attach_existing_chunks, db, document):
+        job = enqueue_document(db, document)
+    
     return {
         "id": document.id,
         "title": document.title,
         "file_type": document.file_type,
-        "file_size": len(content),
-        "is_processed": True,
-        "chunk_count": 1,
+        "file_size": document.file_size,
+        "content_hash": document.content_hash,
+        "is_processed": document.is_processed,
+        "chunk_count": document.chunk_count,
+        "deduplicated": saved["deduplicated"],
+        "job_id": job.id if job else None,
+        "status": job.status if job else "done",
         "created_at": document.created_at.isoformat(),
         "updated_at": document.created_at.isoformat()
     }
@@ -167,11 +287,83 @@ def get_documents(token: str = None, db: Session = Depends(get_db)):
             "id": doc.id,
             "title": doc.title,
             "file_type": doc.file_type,
-            "file_size": len(doc.content),
-            "is_processed": True,
-            "chunk_count": 1,
+            "file_size": doc.file_size or 0,
+            "is_processed": doc.is_processed,
+            "chunk_count": doc.chunk_count,
             "created_at": doc.created_at.isoformat(),
             "updated_at": doc.created_at.isoformat()
         }
         for doc in documents
     ]
+
+
+@router.delete("/documents/{document_id}")
+def delete_document(document_id: int, token: str = None, db: Session = Depends(get_db)):
+    if not token or token not in active_users:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    
+    user = active_users[token]
+    document = db.query(Document).filter(
+        Document.id == document_id,
+        Document.user_id == user.id
+    ).first()
+    if not document:
+        raise HTTPException(status_code=404, detail="Document not found")
+    
+    # Drop the document's queued jobs first: this locks them, so a worker can
+    # no longer claim them, and a job a worker already holds blocks the delete
+    db.query(IngestionJob).filter(
+        IngestionJob.document_id == document.id,
+        IngestionJob.status != "running"
+    ).delete(synchronize_session=False)
+    if db.query(IngestionJob.id).filter(
+        IngestionJob.document_id == document.id,
+        IngestionJob.status == "running"
+    ).first():
+        db.rollback()
+        raise HTTPException(status_code=409, detail="Document is still being processed; try again when it finishes")
+    
+    # Chunks are shared by content hash: they stay in this user's index if
+    # another document of theirs has the same bytes, and in the database
+    # while any document has them, re-pointed to a surviving document since
+    # document_id must reference an existing row
+    content_hash = document.content_hash
+    remove_file = True
+    if content_hash:
+        chunk_ids = [row[0] for row in db.query(DocumentChunk.id).filter(
+            DocumentChunk.content_hash == content_hash
+        ).all()]
+        survivors = db.query(Document.id, Document.user_id).filter(
+            Document.content_hash == content_hash,
+            Document.id != document.id
+        ).order_by(Document.id.asc()).all()
+        unindex_ids = chunk_ids if user.id not in {row[1] for row in survivors} else []
+        if survivors:
+            remove_file = False
+            db.query(DocumentChunk).filter(
+                DocumentChunk.document_id == document.id
+            ).update({DocumentChunk.document_id: survivors[0][0]}, synchronize_session=False)
+        else:
+            unindex_chunks(db, "content_hash", content_hash)
+            db.query(DocumentChunk).filter(
+                DocumentChunk.content_hash == content_hash
+            ).delete(synchronize_session=False)
+    else:
+        # Documents uploaded before content hashing own their chunks outright
+        unindex_ids = [row[0] for row in db.query(DocumentChunk.id).filter(
+            DocumentChunk.document_id == document.id
+        ).all()]
+        unindex_chunks(db, "document_id", document.id)
+        db.query(DocumentChunk).filter(
+            DocumentChunk.document_id == document.id
+        ).delete(synchronize_session=False)
+    db.delete(document)
+    db.commit()
+    
+    if unindex_ids:
+        get_vector_store().remove(user.id, unindex_ids)
+    if remove_file and document.file_path and os.path.exists(document.file_path):
+        os.remove(document.file_path)
+    bump_corpus_version(db, user.id)
+    
+    return {"message": "Document deleted successfully"}
@@ -0,0 +1,191 @@
+import asyncio
+import os
+import random
+import sys
+import time
+from collections import OrderedDict, deque
+from contextvars import ContextVar
+from typing import Awaitable, Callable, Deque, Optional, Tuple
+
+# Add parent directory to path to import config
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import LLM_MAX_QUEUE_WAIT, LLM_MAX_RETRIES, LLM_RETRY_BASE_DELAY, LLM_RETRY_MAX_DELAY, LLM_RATE_BURST_SECONDS
+from backend.app.llm_client import LLMError, LatencyTracker
+
+# The user an LLM call is made for; rag sets it so queues can be fair across users
+llm_user: ContextVar[str] = ContextVar("llm_user", default="anonymous")
+
+
+def retry_delay(
+    status_code: Optional[int],
+    retry_after: Optional[float],
+    attempt: int,
+    base_delay: float = LLM_RETRY_BASE_DELAY,
+    max_delay: float = LLM_RETRY_MAX_DELAY
+) -> Optional[float]:
+    """Seconds to wait before retrying a failed call, or None if it should not be retried.
+
+    Only 429 and 5xx responses are retried. Retry-After is honored as given;
+    otherwise the delay doubles per attempt with jitter over its upper half.
+    A wait longer than max_delay is not worth holding the chat for, so the
+    error is raised instead and the router can try another provider.
+    """
+    if status_code is None or not (status_code == 429 or status_code >= 500):
+        return None
+    if retry_after is not None:
+        return retry_after if retry_after <= max_delay else None
+    delay = min(max_delay, base_delay * (2 ** attempt))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+class TokenBucket:
+    """Refills at per_minute / 60 units a second, holding burst_seconds of refill.
+
+    Providers often enforce a per-minute limit over shorter windows, so the
+    bucket does not allow a whole minute's budget at once by default.
+    """
+
+    def __init__(self, per_minute: float, burst_seconds: float = LLM_RATE_BURST_SECONDS):
+        self.per_minute = per_minute
+        self.rate = per_minute / 60.0
+        self.capacity = self.rate * min(60.0, max(burst_seconds, 0.001))
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, amount: float, now: float) -> float:
+        """Seconds until amount is available; amounts over capacity wait for a full bucket."""
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+    def take(self, amount: float):
+        self.level -= min(amount, self.capacity)
+
+
+class ProviderLimiter:
+    """Requests/min and tokens/min buckets for one provider, queued fairly across users.
+
+    Waiting calls are kept in one FIFO per user and released round-robin
+    between users, so a user firing a burst of chats cannot starve everyone
+    else. A 429 pauses the whole provider for its Retry-After, since every
+    queued call would hit the same limit. A call still queued after
+    max_wait seconds fails with a 429 LLMError, so the wait stays bounded.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        requests_per_minute: float = 0,
+        tokens_per_minute: float = 0,
+        max_wait: float = LLM_MAX_QUEUE_WAIT,
+        max_retries: int = LLM_MAX_RETRIES,
+        burst_seconds: float = LLM_RATE_BURST_SECONDS
+    ):
+        self.name = name
+        self.max_retries = max_retries
+        self.requests = TokenBucket(requests_per_minute, burst_seconds) if requests_per_minute > 0 else None
+        self.tokens = TokenBucket(tokens_per_minute, burst_seconds) if tokens_per_minute > 0 else None
+        self.max_wait = max_wait
+        self._queues: "OrderedDict[str, Deque[Tuple[asyncio.Future, float]]]" = OrderedDict()
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._paused_until = 0.0
+        self.wait_time = LatencyTracker()
+        self.depth = 0
+        self.max_depth = 0
+        self.rejected = 0
+        self.retries = 0
+
+    def pause(self, seconds: float):
+        """Hold every queued call for seconds, e.g. after a 429 with Retry-After."""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def _delay(self, tokens: float) -> float:
+        now = time.monotonic()
+        delay = max(0.0, self._paused_until - now)
+        if self.requests is not None:
+            delay = max(delay, self.requests.delay(1, now))
+        if self.tokens is not None:
+            delay = max(delay, self.tokens.delay(tokens, now))
+        return delay
+
+    async def acquire(self, tokens: float, user: Optional[str] = None):
+        """Wait for a request slot and tokens, in fair order; raises a 429 LLMError past max_wait."""
+        if self.requests is None and self.tokens is None and self._paused_until <= time.monotonic():
+            return
+        user = user if user is not None else llm_user.get()
+        waiter = asyncio.get_running_loop().create_future()
+        self._queues.setdefault(user, deque()).append((waiter, tokens))
+        self.depth += 1
+        self.max_depth = max(self.max_depth, self.depth)
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.ensure_future(self._dispatch())
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(waiter, self.max_wait)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise LLMError(f"{self.name} rate limit: queued longer than {self.max_wait:.0f}s", 429)
+        finally:
+            self.depth -= 1
+            self.wait_time.record(time.perf_counter() - start)
+
+    async def call(self, tokens: float, attempt: Callable[[], Awaitable]):
+        """Run attempt() under the limits, retrying 429 and 5xx errors with backoff."""
+        retries = 0
+        while True:
+            await self.acquire(tokens)
+            try:
+                return await attempt()
+            except LLMError as e:
+                delay = retry_delay(e.status_code, e.retry_after, retries) if retries < self.max_retries else None
+                if delay is None:
+                    raise
+                if e.status_code == 429:
+                    self.pause(delay)
+                retries += 1
+                self.retries += 1
+                print(f"[WARNING] {self.name} returned {e.status_code}, retry {retries}/{self.max_retries} in {delay:.2f}s", file=sys.stderr)
+                await asyncio.sleep(delay)
+
+    async def _dispatch(self):
+        """Release queued calls round-robin across users as the buckets allow."""
+        while self._queues:
+            user, queue = next(iter(self._queues.items()))
+            waiter, tokens = queue[0]
+            if waiter.done():
+                # Cancelled or timed out while queued
+                queue.popleft()
+                if not queue:
+                    del self._queues[user]
+                continue
+            delay = self._delay(tokens)
+            if delay > 0:
+                await asyncio.sleep(delay)
+                continue
+            if self.requests is not None:
+                self.requests.take(1)
+            if self.tokens is not None:
+                self.tokens.take(tokens)
+            queue.popleft()
+            waiter.set_result(None)
+            if queue:
+                self._queues.move_to_end(user)
+            else:
+                del self._queues[user]
+
+    def stats(self) -> dict:
+        return {
+            "requests_per_minute": self.requests.per_minute if self.requests else None,
+            "tokens_per_minute": self.tokens.per_minute if self.tokens else None,
+            "queue_depth": self.depth,
+            "max_queue_depth": self.max_depth,
+            "queued_users": len(self._queues),
+            "paused_s": round(max(0.0, self._paused_until - time.monotonic()), 2),
+            "wait": self.wait_time.stats(),
+            "rejected": self.rejected,
+            "retries": self.retries
+        }
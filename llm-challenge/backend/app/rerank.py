@@ -0,0 +1,168 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+# Add parent directory to path to import config
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import (
+    RERANK_ENABLED, RERANK_MODEL, RERANK_CANDIDATES, RERANK_TOP_K,
+    RERANK_MAX_LENGTH, RERANK_BUDGET_MS, RERANK_WORKERS, TOP_K_RESULTS
+)
+
+
+class Reranker:
+    """Reorders first-stage hits with a local cross-encoder.
+
+    At most max_candidates (query, chunk) pairs are scored in a single batched
+    forward pass on one of `workers` threads. If scoring fails or overruns
+    budget_ms, the first-stage order is kept, so reranking can only ever cost
+    the budget, never an error. A forward pass cannot be interrupted, so an
+    overrunning job keeps its thread until it finishes and its scores are
+    dropped; requests that find every thread busy skip reranking instead of
+    queueing behind it.
+    """
+
+    def __init__(
+        self,
+        model_name: str = RERANK_MODEL,
+        max_candidates: int = RERANK_CANDIDATES,
+        budget_ms: float = RERANK_BUDGET_MS,
+        workers: int = RERANK_WORKERS,
+        scorer: Optional[Callable[[str, List[str]], np.ndarray]] = None
+    ):
+        self.model_name = model_name
+        self.max_candidates = max_candidates
+        self.budget = budget_ms / 1000.0
+        self.scorer = scorer
+        self._model = None
+        self._model_lock = threading.Lock()
+        self.workers = max(1, workers)
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="rerank")
+        self._busy = 0
+        self._busy_lock = threading.Lock()
+        self.calls = 0
+        self.fallbacks = 0
+        self.skipped = 0
+        self.overruns = 0
+        self.seconds = 0.0
+
+    def _load(self):
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    from sentence_transformers import CrossEncoder
+                    print(f"[DEBUG] Loading rerank model {self.model_name}", file=sys.stderr)
+                    self._model = CrossEncoder(self.model_name, max_length=RERANK_MAX_LENGTH)
+        return self._model
+
+    def score(self, query: str, passages: List[str]) -> np.ndarray:
+        """Relevance of each passage to the query, from one forward pass."""
+        if self.scorer is not None:
+            return np.asarray(self.scorer(query, passages), dtype=np.float32)
+        scores = self._load().predict(
+            [(query, passage) for passage in passages],
+            batch_size=len(passages),
+            convert_to_numpy=True,
+            show_progress_bar=False,
+        )
+        return np.asarray(scores, dtype=np.float32)
+
+    def _submit(self, fn, *args) -> Optional[Future]:
+        """Run fn on an idle rerank thread, or return None when all are busy."""
+        with self._busy_lock:
+            if self._busy >= self.workers:
+                return None
+            self._busy += 1
+        future = self._executor.submit(fn, *args)
+        future.add_done_callback(self._release)
+        return future
+
+    def _release(self, _):
+        with self._busy_lock:
+            self._busy -= 1
+
+    def warm_up(self):
+        """Load the model on a rerank thread so the first chat does not pay for it."""
+        if self.scorer is None:
+            self._submit(self._load)
+
+    async def rerank(self, query: str, docs: List[Dict], top_k: int = RERANK_TOP_K, fallback_k: int = TOP_K_RESULTS) -> List[Dict]:
+        """Return the top_k docs by cross-encoder score, or the first fallback_k on overrun."""
+        candidates = docs[:self.max_candidates]
+        if len(candidates) <= 1:
+            return candidates
+        job = self._submit(self.score, query, [doc["content"] for doc in candidates])
+        if job is None:
+            self.skipped += 1
+            self.fallbacks += 1
+            print(f"[WARNING] All {self.workers} rerank threads busy, keeping first-stage order", file=sys.stderr)
+            return docs[:fallback_k]
+        start = time.perf_counter()
+        try:
+            # On timeout the job cannot be stopped once running; it finishes and its scores are dropped
+            scores = await asyncio.wait_for(asyncio.wrap_future(job), timeout=self.budget)
+        except asyncio.TimeoutError:
+            scores = None
+            self.overruns += 1
+            print(f"[WARNING] Rerank exceeded its {self.budget * 1000:.0f} ms budget, keeping first-stage order", file=sys.stderr)
+        except Exception as e:
+            scores = None
+            print(f"[ERROR] Rerank failed, keeping first-stage order: {str(e)}", file=sys.stderr)
+        elapsed = time.perf_counter() - start
+        self.calls += 1
+        self.seconds += elapsed
+        if scores is None:
+            self.fallbacks += 1
+            return docs[:fallback_k]
+
+        order = np.argsort(-scores, kind="stable")[:top_k]
+        reranked = []
+        for i in order:
+            doc = candidates[i]
+            reranked.append({**doc, "metadata": {**doc["metadata"], "rerank_score": float(scores[i])}})
+        print(f"[DEBUG] Reranked {len(candidates)} chunks to {len(reranked)} in {elapsed * 1000:.1f} ms", file=sys.stderr)
+        return reranked
+
+    def stats(self) -> Dict:
+        return {
+            "model": self.model_name,
+            "max_candidates": self.max_candidates,
+            "budget_ms": self.budget * 1000,
+            "workers": self.workers,
+            "busy": self._busy,
+            "calls": self.calls,
+            "fallbacks": self.fallbacks,
+            "skipped_busy": self.skipped,
+            "overruns": self.overruns,
+            "avg_ms": self.seconds / self.calls * 1000 if self.calls else 0.0
+        }
+
+
+_reranker: Optional[Reranker] = None
+
+
+def get_reranker() -> Optional[Reranker]:
+    """The process-wide reranker, or None when RERANK_ENABLED is off."""
+    global _reranker
+    if RERANK_ENABLED and _reranker is None:
+        _reranker = Reranker()
+    return _reranker
+
+
+def first_stage_top_k() -> int:
+    """How many chunks retrieval should return: the rerank cap when reranking."""
+    return RERANK_CANDIDATES if RERANK_ENABLED else TOP_K_RESULTS
+
+
+async def rerank_documents(query: str, docs: List[Dict]) -> List[Dict]:
+    """Rerank retrieved chunks if enabled, otherwise return them unchanged."""
+    reranker = get_reranker()
+    if reranker is None:
+        return docs
+    return await reranker.rerank(query, docs)
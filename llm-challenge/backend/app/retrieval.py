@@ -0,0 +1,81 @@
+import asyncio
+import os
+import sys
+import time
+from typing import Awaitable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Add parent directory to path to import config
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import (
+    SIMILARITY_THRESHOLD, HYBRID_CANDIDATES, RRF_K,
+    VECTOR_SEARCH_BUDGET_MS, LEXICAL_SEARCH_BUDGET_MS
+)
+from backend.app.embedding_cache import embed_query_cached
+from backend.app.vector_store import get_vector_store
+from backend.app.lexical import search_lexical
+
+Hits = List[Tuple[int, float]]
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Hits], k: int = RRF_K) -> Hits:
+    """Fuse ranked (chunk_id, score) lists by summing 1 / (k + rank)."""
+    fused: Dict[int, float] = {}
+    for ranking in rankings:
+        for rank, (chunk_id, _) in enumerate(ranking, start=1):
+            fused[chunk_id] = fused.get(chunk_id, 0.0) + 1.0 / (k + rank)
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)
+
+
+async def within_budget(name: str, leg: Awaitable, budget_ms: float, default):
+    """Await a retrieval leg, returning default if it fails or overruns its budget."""
+    start = time.perf_counter()
+    try:
+        result = await asyncio.wait_for(leg, timeout=budget_ms / 1000.0)
+        print(f"[DEBUG] {name} leg took {(time.perf_counter() - start) * 1000:.1f} ms", file=sys.stderr)
+        return result
+    except asyncio.TimeoutError:
+        print(f"[WARNING] {name} leg exceeded its {budget_ms:.0f} ms budget", file=sys.stderr)
+    except Exception as e:
+        print(f"[ERROR] {name} leg failed: {str(e)}", file=sys.stderr)
+    return default
+
+
+async def vector_leg(query: str, user_id: int, depth: int) -> Tuple[np.ndarray, Hits]:
+    """Embed the query and search the user's vector index."""
+    query_vector = await embed_query_cached(query)
+    hits = await asyncio.to_thread(get_vector_store().search, user_id, query_vector, depth)
+    return query_vector, [(chunk_id, score) for chunk_id, score in hits if score >= SIMILARITY_THRESHOLD]
+
+
+async def lexical_leg(query: str, user_id: int, depth: int) -> Hits:
+    """BM25 search over the user's chunks."""
+    return await asyncio.to_thread(search_lexical, user_id, query, depth)
+
+
+async def hybrid_search(
+    query: str,
+    user_id: int,
+    top_k: int,
+    depth: int = HYBRID_CANDIDATES
+) -> Tuple[Optional[np.ndarray], Hits, Dict[int, float], bool]:
+    """Run the vector and lexical legs concurrently and fuse them with RRF.
+
+    Returns the query vector (None if the vector leg missed its budget), all
+    fused (chunk_id, rrf_score) pairs in rank order, the cosine scores the
+    vector leg reported, so callers only rescore lexical-only hits, and
+    whether both legs completed. The fused list is not cut to top_k: callers
+    apply SIMILARITY_THRESHOLD to lexical-only hits first, then take top_k.
+    """
+    depth = max(depth, top_k)
+    vector_default, lexical_default = (None, []), []
+    vector_result, lexical_hits = await asyncio.gather(
+        within_budget("vector", vector_leg(query, user_id, depth), VECTOR_SEARCH_BUDGET_MS, vector_default),
+        within_budget("lexical", lexical_leg(query, user_id, depth), LEXICAL_SEARCH_BUDGET_MS, lexical_default)
+    )
+    complete = vector_result is not vector_default and lexical_hits is not lexical_default
+    query_vector, vector_hits = vector_result
+    fused = reciprocal_rank_fusion([vector_hits, lexical_hits])
+    print(f"[DEBUG] Hybrid search: {len(vector_hits)} vector, {len(lexical_hits)} lexical, {len(fused)} fused", file=sys.stderr)
+    return query_vector, fused, dict(vector_hits), complete
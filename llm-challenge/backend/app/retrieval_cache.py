@@ -0,0 +1,123 @@
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import update
+
+# Add parent directory to path to import config
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import RETRIEVAL_CACHE_SIZE, RETRIEVAL_CACHE_MAX_MB
+from backend.app.db import SessionLocal
+from backend.app.models import User
+from backend.app.embedding_cache import normalize_text
+
+ENTRY_OVERHEAD_BYTES = 512  # rough per-result cost of the dicts around the chunk text
+
+Key = Tuple[int, str, int, int]
+
+
+def get_corpus_version(user_id: int) -> int:
+    """The user's current corpus version, read from the database."""
+    db = SessionLocal()
+    try:
+        version = db.query(User.corpus_version).filter(User.id == user_id).scalar()
+        return version or 0
+    finally:
+        db.close()
+
+
+def bump_corpus_version(db, user_id: int):
+    """Invalidate cached retrievals for a user after their searchable chunks change.
+
+    Call this once the change is visible to search (committed and applied to
+    the vector store), so nothing cached under the new version can predate it.
+    """
+    db.execute(
+        update(User).where(User.id == user_id).values(corpus_version=User.corpus_version + 1)
+    )
+    db.commit()
+    _retrieval_cache.invalidate_user(user_id)
+
+
+def _copy_results(results: List[Dict]) -> List[Dict]:
+    return [{**result, "metadata": dict(result["metadata"])} for result in results]
+
+
+class RetrievalCache:
+    """In-memory LRU cache of search_documents results.
+
+    Keys are (user_id, normalized query, corpus version, top_k), so a hit is
+    always computed against the user's current documents: any upload, delete
+    or finished ingestion bumps the version and old entries can no longer be
+    reached. Entries are bounded both in count and in the approximate bytes of
+    the chunk text they hold.
+    """
+
+    def __init__(self, max_entries: int = RETRIEVAL_CACHE_SIZE, max_bytes: int = int(RETRIEVAL_CACHE_MAX_MB * 1024 * 1024)):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Key, Tuple[int, List[Dict]]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.miss_seconds = 0.0
+
+    @staticmethod
+    def key(user_id: int, query: str, version: int, top_k: int) -> Key:
+        return (user_id, normalize_text(query), version, top_k)
+
+    def get(self, key: Key) -> Optional[List[Dict]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return _copy_results(entry[1])
+
+    def put(self, key: Key, results: List[Dict], seconds: float):
+        size = sum(len(result["content"]) + ENTRY_OVERHEAD_BYTES for result in results) + ENTRY_OVERHEAD_BYTES
+        with self._lock:
+            self.miss_seconds += seconds
+            if size > self.max_bytes:
+                return
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)[0]
+            self._entries[key] = (size, _copy_results(results))
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._bytes -= self._entries.popitem(last=False)[1][0]
+
+    def invalidate_user(self, user_id: int):
+        """Free a user's entries early; version keys already make them unreachable."""
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == user_id]:
+                self._bytes -= self._entries.pop(key)[0]
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            avg_miss_ms = self.miss_seconds / self.misses * 1000 if self.misses else 0.0
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "avg_miss_ms": round(avg_miss_ms, 2),
+                "saved_ms_per_request": round(avg_miss_ms * self.hits / lookups, 2) if lookups else 0.0,
+            }
+
+
+_retrieval_cache = RetrievalCache()
+
+
+def get_retrieval_cache() -> RetrievalCache:
+    return _retrieval_cache
@@ -1,22 +1,36 @@
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from typing import List, Optional
+import asyncio
+import json
 import sys
 import os
+import time
 
 # Add parent directory to path to import config
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from backend.app.db import get_db
+from backend.app.db import get_db, SessionLocal
 from backend.app.models import User, Conversation, Message, Document
 from backend.app.schemas import (
     ConversationCreate, ConversationResponse, MessageCreate, MessageResponse,
     ChatRequest, ChatResponse
 )
 from backend.app.auth import get_current_active_user
-from backend.app.rag import search_documents, generate_response
+from backend.app.rag import search_documents, generate_answer, stream_answer, AnswerUnavailable
+from backend.app.embedding_cache import get_embedding_cache, get_query_cache, embed_query_cached
+from backend.app.rerank import get_reranker, first_stage_top_k, rerank_documents
+from backend.app.retrieval_cache import get_retrieval_cache, get_corpus_version
+from backend.app.answer_cache import get_answer_cache
+from backend.app.context_packer import get_packing_stats
+from backend.app.llm_client import LatencyTracker
+from backend.app.llm_router import get_llm_router
+from backend.app.single_flight import get_single_flight
+from backend.app.completion_cache import get_completion_cache
 
 router = APIRouter()
+chat_first_token = LatencyTracker()  # request received to first token sent, /api/chat/stream
 
 @router.post("/conversations", response_model=ConversationResponse)
 def create_conversation(
@@ -84,17 +98,10 @@ def get_conversation_messages(
     
     return messages
 
-@router.post("/chat", response_model=ChatResponse)
-async def chat(
-    chat_request: ChatRequest,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
-):
-    """Send a message and get AI response with enhanced error handling."""
-    import sys
-    
+def _validate_chat_request(chat_request: ChatRequest, current_user: User, label: str):
+    """Log and validate an incoming chat message."""
     # Log request details
-    print(f"[DEBUG] === New Chat Request ===", file=sys.stderr)
+    print(f"[DEBUG] === New {label} Request ===", file=sys.stderr)
     print(f"[DEBUG] User: {current_user.email}", file=sys.stderr)
     print(f"[DEBUG] Message: {chat_request.message}", file=sys.stderr)
     print(f"[DEBUG] Conversation ID: {chat_request.conversation_id}", file=sys.stderr)
@@ -108,81 +115,226 @@ async def chat(
         
     if len(chat_request.message.strip()) == 0:
         raise HTTPException(status_code=400, detail="Message cannot be empty")
-    try:
-        # Validate message
-        if not chat_request.message or not isinstance(chat_request.message, str):
-            raise HTTPException(status_code=400, detail="Message must be a non-empty string")
 
-        # Validate conversation_id if provided
-        if chat_request.conversation_id is not None:
-            try:
-                conv_id = int(chat_request.conversation_id)
-                conversation = db.query(Conversation).filter(
-                    Conversation.id == conv_id,
-                    Conversation.user_id == current_user.id
-                ).first()
-                if not conversation:
-                    raise HTTPException(status_code=404, detail="Conversation not found")
-            except (ValueError, TypeError):
-                raise HTTPException(status_code=400, detail="conversation_id must be a valid integer or null")
-        else:
-            # Create new conversation
-            conversation = Conversation(
-                title="New Chat",
-                user_id=current_user.id
-            )
-            db.add(conversation)
-            db.commit()
-            db.refresh(conversation)
-        # Save user message
-        user_message = Message(
-            conversation_id=conversation.id,
-            role="user",
-            content=chat_request.message
+def _start_turn(chat_request: ChatRequest, current_user: User, db: Session):
+    """Find or create the conversation, save the user message and load history."""
+    # Validate conversation_id if provided
+    if chat_request.conversation_id is not None:
+        try:
+            conv_id = int(chat_request.conversation_id)
+            conversation = db.query(Conversation).filter(
+                Conversation.id == conv_id,
+                Conversation.user_id == current_user.id
+            ).first()
+            if not conversation:
+                raise HTTPException(status_code=404, detail="Conversation not found")
+        except (ValueError, TypeError):
+            raise HTTPException(status_code=400, detail="conversation_id must be a valid integer or null")
+    else:
+        # Create new conversation
+        conversation = Conversation(
+            title="New Chat",
+            user_id=current_user.id
         )
-        db.add(user_message)
+        db.add(conversation)
         db.commit()
-        # Search for relevant documents
-        context_docs = search_documents(chat_request.message, current_user.id)
-        # Get conversation history
-        conversation_history = []
-        messages = db.query(Message).filter(
-            Message.conversation_id == conversation.id
-        ).order_by(Message.created_at.desc()).limit(10).all()
-        conversation_history = [
-            {"role": msg.role, "content": msg.content}
-            for msg in reversed(messages)
-        ]
-        # Generate AI response
-        ai_response = generate_response(
-            chat_request.message, 
-            context_docs, 
-            conversation_history
-        )
-        # Calculate confidence score
-        confidence_score = max([doc["score"] for doc in context_docs]) if context_docs else 0.0
-        # Prepare sources
-        sources = [doc["metadata"].get("vector_id", "") for doc in context_docs]
-        # Save AI response
-        ai_message = Message(
-            conversation_id=conversation.id,
-            role="assistant",
-            content=ai_response,
-            sources=",".join(sources),
-            confidence_score=confidence_score
+        db.refresh(conversation)
+    # Save user message
+    user_message = Message(
+        conversation_id=conversation.id,
+        role="user",
+        content=chat_request.message
+    )
+    db.add(user_message)
+    db.commit()
+    # Get conversation history
+    messages = db.query(Message).filter(
+        Message.conversation_id == conversation.id
+    ).order_by(Message.created_at.desc()).limit(10).all()
+    conversation_history = [
+        {"role": msg.role, "content": msg.content}
+        for msg in reversed(messages)
+    ]
+    return conversation, conversation_history
+
+class _Turn:
+    """What a chat turn needs to answer: a cached answer or retrieved context."""
+
+    def __init__(self):
+        self.cached = None
+        self.standalone = False
+        self.corpus_version = None
+        self.query_vector = None
+        self.context_docs = []
+        self.sources = []
+        self.confidence_score = 0.0
+
+async def _prepare_answer(message: str, user_id: int, conversation_history) -> _Turn:
+    """Check the semantic answer cache, then retrieve and rerank context on a miss."""
+    turn = _Turn()
+    # A question with no earlier turns can be answered from the semantic cache
+    turn.standalone = len(conversation_history) == 1 and get_answer_cache().enabled
+    if turn.standalone:
+        turn.corpus_version = await asyncio.to_thread(get_corpus_version, user_id)
+        turn.query_vector = await embed_query_cached(message)
+        turn.cached = get_answer_cache().get(user_id, turn.corpus_version, turn.query_vector)
+    if turn.cached is not None:
+        print(f"[DEBUG] Answer cache hit for: {turn.cached.query}", file=sys.stderr)
+        turn.sources = list(turn.cached.sources)
+        turn.confidence_score = turn.cached.confidence_score
+        return turn
+    # Search for relevant documents
+    context_docs = await search_documents(message, user_id, first_stage_top_k())
+    turn.context_docs = await rerank_documents(message, context_docs)
+    # Calculate confidence score
+    turn.confidence_score = max([doc["score"] for doc in turn.context_docs]) if turn.context_docs else 0.0
+    # Prepare sources
+    turn.sources = [doc["metadata"].get("vector_id", "") for doc in turn.context_docs]
+    return turn
+
+def _finish_turn(db: Session, conversation_id: int, message: str, user_id: int, turn: _Turn, ai_response: str, answered: bool) -> Message:
+    """Cache a fresh standalone answer and save the assistant message."""
+    if turn.cached is None and turn.standalone and answered:
+        get_answer_cache().put(
+            user_id, turn.corpus_version, message, turn.query_vector,
+            ai_response, turn.sources, turn.confidence_score
         )
-        db.add(ai_message)
-        db.commit()
+    # Save AI response
+    ai_message = Message(
+        conversation_id=conversation_id,
+        role="assistant",
+        content=ai_response,
+        sources=",".join(turn.sources),
+        confidence_score=turn.confidence_score,
+        cache_hit=turn.cached is not None
+    )
+    db.add(ai_message)
+    db.commit()
+    return ai_message
+
+@router.post("/chat", response_model=ChatResponse)
+async def chat(
+    chat_request: ChatRequest,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Send a message and get AI response with enhanced error handling."""
+    _validate_chat_request(chat_request, current_user, "Chat")
+    try:
+        conversation, conversation_history = _start_turn(chat_request, current_user, db)
+        turn = await _prepare_answer(chat_request.message, current_user.id, conversation_history)
+        if turn.cached is not None:
+            ai_response, answered = turn.cached.answer, True
+        else:
+            # Generate AI response
+            ai_response, answered = await generate_answer(
+                chat_request.message, 
+                turn.context_docs, 
+                conversation_history,
+                user_id=current_user.id
+            )
+        _finish_turn(db, conversation.id, chat_request.message, current_user.id, turn, ai_response, answered)
         return ChatResponse(
             message=ai_response,
             conversation_id=conversation.id,
-            sources=sources,
-            confidence_score=confidence_score
+            sources=turn.sources,
+            confidence_score=turn.confidence_score,
+            cache_hit=turn.cached is not None
         )
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"[ERROR] /api/chat: {e}", file=sys.stderr)
         raise HTTPException(status_code=500, detail=f"Error processing chat: {str(e)}")
 
+def _sse(data: dict, event: Optional[str] = None) -> str:
+    """Format one server-sent event."""
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+async def _replay(text: str):
+    """A cached answer, sent as a single token."""
+    yield text
+
+@router.post("/chat/stream")
+async def chat_stream(
+    chat_request: ChatRequest,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Send a message and stream the AI response as server-sent events.
+
+    Events: "meta" with the conversation, sources and confidence; one
+    unnamed event per token ({"token": ...}); then "done" with the saved
+    message id and time to first token, or "error" with the fallback text
+    (message_id is null if the answer could not be saved).
+    """
+    started = time.perf_counter()
+    _validate_chat_request(chat_request, current_user, "Chat Stream")
+    try:
+        conversation, conversation_history = _start_turn(chat_request, current_user, db)
+        turn = await _prepare_answer(chat_request.message, current_user.id, conversation_history)
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"[ERROR] /api/chat/stream: {e}", file=sys.stderr)
+        raise HTTPException(status_code=500, detail=f"Error processing chat: {str(e)}")
+    conversation_id, message, user_id = conversation.id, chat_request.message, current_user.id
+
+    async def events():
+        yield _sse({
+            "conversation_id": conversation_id,
+            "sources": turn.sources,
+            "confidence_score": turn.confidence_score,
+            "cache_hit": turn.cached is not None
+        }, "meta")
+        pieces, answered, error, first_token_ms, message_id = [], False, None, None, None
+        if turn.cached is not None:
+            tokens = _replay(turn.cached.answer)
+        else:
+            tokens = stream_answer(message, turn.context_docs, conversation_history, user_id=user_id)
+        try:
+            async for token in tokens:
+                if first_token_ms is None:
+                    first_token_ms = (time.perf_counter() - started) * 1000
+                pieces.append(token)
+                yield _sse({"token": token})
+            answered = True
+        except AnswerUnavailable as e:
+            error = str(e)
+        except Exception as e:
+            print(f"[ERROR] /api/chat/stream: {e}", file=sys.stderr)
+            error = f"Error processing chat: {str(e)}"
+        finally:
+            # The stream's session is gone by now; save with a fresh one, even on disconnect
+            if first_token_ms is not None:
+                chat_first_token.record(first_token_ms / 1000)
+            text = "".join(pieces) if pieces else (error or "")
+            session = SessionLocal()
+            try:
+                ai_message = _finish_turn(session, conversation_id, message, user_id, turn, text, answered)
+                message_id = ai_message.id
+            except Exception as e:
+                session.rollback()
+                print(f"[ERROR] /api/chat/stream: could not save the answer: {e}", file=sys.stderr)
+                error = error or f"Error saving chat: {str(e)}"
+            finally:
+                session.close()
+        if error is not None:
+            yield _sse({"detail": error, "message_id": message_id}, "error")
+        else:
+            yield _sse({
+                "message_id": message_id,
+                "first_token_ms": round(first_token_ms or 0.0, 1),
+                "total_ms": round((time.perf_counter() - started) * 1000, 1)
+            }, "done")
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.delete("/conversations/{conversation_id}")
 def delete_conversation(
     conversation_id: int,
@@ -207,6 +359,25 @@ def delete_conversation(
     
     return {"message": "Conversation deleted successfully"}
 
+@router.get("/stats")
+def get_stats(current_user: User = Depends(get_current_active_user)):
+    """Cache statistics for the chat hot path."""
+    chunk_cache = get_embedding_cache()
+    completion_cache = get_completion_cache()
+    reranker = get_reranker()
+    return {
+        "retrieval_cache": get_retrieval_cache().stats(),
+        "answer_cache": get_answer_cache().stats(),
+        "prompt_packing": get_packing_stats().stats(),
+        "llm_router": get_llm_router().stats(),
+        "llm_single_flight": get_single_flight().stats(),
+        "completion_cache": completion_cache.stats() if completion_cache else None,
+        "chat_stream_first_token": chat_first_token.stats(),
+        "query_embedding_cache": get_query_cache().stats(),
+        "chunk_embedding_cache": chunk_cache.stats() if chunk_cache else None,
+        "reranker": reranker.stats() if reranker else None
+    }
+
 @router.get("/health")
 def health_check():
     """Health check endpoint."""
@@ -61,6 +61,7 @@ class MessageResponse(MessageBase):
     created_at: datetime
     sources: Optional[str] = None
     confidence_score: Optional[float] = None
+    cache_hit: Optional[bool] = None
 
     class Config:
         from_attributes = True
@@ -113,6 +114,7 @@ class ChatResponse(BaseModel):
     conversation_id: int
     sources: Optional[List[str]] = None
     confidence_score: Optional[float] = None
+    cache_hit: bool = False
 
 # RAG Schemas
 class RAGQuery(BaseModel):
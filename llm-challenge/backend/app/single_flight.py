@@ -0,0 +1,151 @@
+import asyncio
+import hashlib
+import json
+import os
+import sys
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+# Add parent directory to path to import config
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import LLM_SINGLE_FLIGHT
+from backend.app.llm_client import LLMError
+
+
+def fingerprint(model: str, messages: List[Dict], params: Dict) -> str:
+    """Key a chat request by model, full message list and sampling parameters."""
+    body = json.dumps({"model": model, "messages": messages, "params": params}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(body.encode("utf-8")).hexdigest()
+
+
+class _Flight:
+    """One upstream call and the requests waiting on it."""
+
+    def __init__(self):
+        self.task: Optional[asyncio.Future] = None
+        self.waiters = 0
+        # Streams only: tokens so far, and an event replaced on every change
+        self.tokens: List[str] = []
+        self.finished = False
+        self.error: Optional[BaseException] = None
+        self.changed = asyncio.Event()
+
+    def notify(self):
+        self.changed.set()
+        self.changed = asyncio.Event()
+
+    def leave(self):
+        """Drop a waiter; the upstream call is cancelled once nobody is left."""
+        self.waiters -= 1
+        if self.waiters == 0 and self.task is not None and not self.task.done():
+            self.task.cancel()
+
+
+class SingleFlight:
+    """Coalesces identical in-flight LLM calls into one upstream request.
+
+    The first request for a key starts the call; requests for the same key
+    that arrive while it runs wait on it instead of calling the provider
+    again, and every waiter gets the same answer or the same error. Streams
+    are shared too: a late joiner first replays the tokens already received.
+    The key is dropped once the call finishes, so nothing is cached beyond
+    the call's lifetime. A waiter that disconnects does not cancel the call
+    for the others; it is only cancelled when every waiter has gone.
+    """
+
+    def __init__(self, enabled: bool = LLM_SINGLE_FLIGHT):
+        self.enabled = enabled
+        self._flights: Dict[str, _Flight] = {}
+        self.upstream_calls = 0
+        self.coalesced = 0
+
+    def _join(self, key: str, start: Callable[[_Flight], Awaitable]) -> _Flight:
+        flight = self._flights.get(key)
+        if flight is not None and (flight.waiters == 0 or flight.task.cancelled()):
+            # Abandoned: its call was or is about to be cancelled, so never join it
+            flight = None
+        if flight is None:
+            flight = _Flight()
+            flight.task = asyncio.ensure_future(start(flight))
+            flight.task.add_done_callback(lambda _: self._flights.pop(key, None) if self._flights.get(key) is flight else None)
+            self._flights[key] = flight
+            self.upstream_calls += 1
+        else:
+            self.coalesced += 1
+            print(f"[DEBUG] Coalesced LLM call {key[:12]} with {flight.waiters} waiting", file=sys.stderr)
+        flight.waiters += 1
+        return flight
+
+    async def do(self, key: str, call: Callable[[], Awaitable]):
+        """Return call()'s result, sharing it with concurrent callers of the same key."""
+        if not self.enabled:
+            self.upstream_calls += 1
+            return await call()
+
+        async def start(flight):
+            return await call()
+
+        flight = self._join(key, start)
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.leave()
+
+    async def stream(self, key: str, call: Callable[[], AsyncIterator[str]]) -> AsyncIterator[str]:
+        """Yield call()'s tokens, sharing one upstream stream with concurrent callers of the same key."""
+        if not self.enabled:
+            self.upstream_calls += 1
+            async for token in call():
+                yield token
+            return
+
+        async def pump(flight):
+            tokens = call()
+            try:
+                async for token in tokens:
+                    flight.tokens.append(token)
+                    flight.notify()
+            except Exception as e:
+                flight.error = e
+            except asyncio.CancelledError:
+                # Anyone still reading must not take the partial answer as complete
+                flight.error = LLMError("Shared LLM call was cancelled")
+                raise
+            finally:
+                flight.finished = True
+                flight.notify()
+                await tokens.aclose()
+
+        flight = self._join("stream:" + key, pump)
+        try:
+            sent = 0
+            while True:
+                changed = flight.changed
+                if sent < len(flight.tokens):
+                    sent += 1
+                    yield flight.tokens[sent - 1]
+                elif flight.finished:
+                    if flight.error is not None:
+                        raise flight.error
+                    return
+                else:
+                    await changed.wait()
+        finally:
+            flight.leave()
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "upstream_calls": self.upstream_calls,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._flights)
+        }
+
+
+_single_flight: Optional[SingleFlight] = None
+
+
+def get_single_flight() -> SingleFlight:
+    global _single_flight
+    if _single_flight is None:
+        _single_flight = SingleFlight()
+    return _single_flight
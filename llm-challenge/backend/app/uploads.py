@@ -0,0 +1,85 @@
+import hashlib
+import os
+import sys
+import uuid
+from typing import Optional
+
+import aiofiles
+from fastapi import HTTPException, UploadFile
+
+# Add parent directory to path to import config
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import UPLOAD_DIR, MAX_FILE_SIZE, ALLOWED_EXTENSIONS, UPLOAD_CHUNK_SIZE
+
+
+def get_file_extension(filename: str) -> str:
+    """Return the lower-cased extension of a filename without the dot."""
+    return os.path.splitext(filename or "")[1].lstrip(".").lower()
+
+
+def content_path(content_hash: str, file_type: str, upload_dir: Optional[str] = None) -> str:
+    """Return the content-addressed path for a file's bytes."""
+    return os.path.join(upload_dir or UPLOAD_DIR, "objects", content_hash[:2], f"{content_hash}.{file_type}")
+
+
+async def save_upload(file: UploadFile, upload_dir: Optional[str] = None) -> dict:
+    """Stream an upload to disk in fixed-size chunks.
+
+    The extension is checked against ALLOWED_EXTENSIONS before anything is
+    written, and MAX_FILE_SIZE is enforced while streaming so an oversized
+    upload is rejected without ever being held in memory. The SHA-256 content
+    hash and byte count are computed in the same pass, and the file is stored
+    under its hash so re-uploads of the same bytes reuse the existing copy.
+    """
+    upload_dir = upload_dir or UPLOAD_DIR
+    filename = os.path.basename(file.filename or "")
+    file_type = get_file_extension(filename)
+    allowed = [ext.strip().lower() for ext in ALLOWED_EXTENSIONS]
+    if not filename or file_type not in allowed:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported file type '{file_type}'. Allowed: {', '.join(allowed)}"
+        )
+    if file.size is not None and file.size > MAX_FILE_SIZE:
+        raise HTTPException(status_code=413, detail=f"File exceeds {MAX_FILE_SIZE} bytes")
+
+    os.makedirs(upload_dir, exist_ok=True)
+    partial_path = os.path.join(upload_dir, f"{uuid.uuid4()}.part")
+    sha256 = hashlib.sha256()
+    file_size = 0
+    try:
+        async with aiofiles.open(partial_path, "wb") as buffer:
+            while True:
+                chunk = await file.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                file_size += len(chunk)
+                if file_size > MAX_FILE_SIZE:
+                    raise HTTPException(status_code=413, detail=f"File exceeds {MAX_FILE_SIZE} bytes")
+                sha256.update(chunk)
+                await buffer.write(chunk)
+
+        # Store content-addressed: identical bytes share one file on disk
+        content_hash = sha256.hexdigest()
+        file_path = content_path(content_hash, file_type, upload_dir)
+        deduplicated = os.path.exists(file_path)
+        if deduplicated:
+            os.remove(partial_path)
+        else:
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            os.replace(partial_path, file_path)
+    except BaseException:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        raise
+    finally:
+        await file.close()
+
+    return {
+        "filename": filename,
+        "file_path": file_path,
+        "file_type": file_type,
+        "file_size": file_size,
+        "content_hash": content_hash,
+        "deduplicated": deduplicated,
+    }
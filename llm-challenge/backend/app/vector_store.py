@@ -0,0 +1,714 @@
+import os
+import sys
+import threading
+from abc import ABC, abstractmethod
+import uuid
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+from sqlalchemy import select
+
+# Add parent directory to path to import config
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import (
+    VECTOR_STORE, VECTOR_INDEX_DIR, VECTOR_INDEX_MAX_OPEN,
+    EXACT_SEARCH_DTYPE, EMBEDDING_QUANTIZATION, ANN_PROMOTE_THRESHOLD, ANN_NLIST, ANN_NPROBE,
+    QDRANT_URL, QDRANT_API_KEY, QDRANT_COLLECTION_NAME, QDRANT_UPSERT_BATCH
+)
+from backend.app.db import SessionLocal
+from backend.app.embeddings import bytes_to_vector
+from backend.app.models import Document, DocumentChunk
+from backend.app.quantization import QuantizedIndex
+
+
+def user_content_hashes(user_id: int):
+    """Subquery of the content hashes a user's documents point at.
+
+    Chunks are shared between documents with identical bytes, so a user's
+    chunks are found through their documents' content_hash.
+    """
+    return select(Document.content_hash).where(
+        Document.user_id == user_id,
+        Document.content_hash.isnot(None)
+    ).scalar_subquery()
+
+
+def load_user_vectors(user_id: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Read a user's chunk ids and embeddings from the database."""
+    db = SessionLocal()
+    try:
+        rows = db.query(DocumentChunk.id, DocumentChunk.embedding).filter(
+            DocumentChunk.content_hash.in_(user_content_hashes(user_id)),
+            DocumentChunk.embedding.isnot(None)
+        ).all()
+    finally:
+        db.close()
+    if not rows:
+        return np.zeros(0, dtype=np.int64), np.zeros((0, 0), dtype=np.float32)
+    ids = np.array([row[0] for row in rows], dtype=np.int64)
+    matrix = np.vstack([bytes_to_vector(row[1]) for row in rows]).astype(np.float32)
+    print(f"[DEBUG] Loaded {len(ids)} vectors for user {user_id}", file=sys.stderr)
+    return ids, matrix
+
+
+class VectorStore(ABC):
+    """Interface shared by the vector store backends.
+
+    Vectors are L2-normalized chunk embeddings keyed by DocumentChunk.id and
+    partitioned by user, so inner product is cosine similarity and searches
+    never cross tenants. Callers only go through get_vector_store().
+    """
+
+    name = "base"
+
+    @abstractmethod
+    def add(self, user_id: int, chunk_ids: Sequence[int], vectors: np.ndarray):
+        """Index committed chunk vectors for a user."""
+
+    @abstractmethod
+    def remove(self, user_id: int, chunk_ids: Sequence[int]):
+        """Drop chunk vectors from a user's index."""
+
+    @abstractmethod
+    def search(self, user_id: int, query_vector: np.ndarray, top_k: int) -> List[Tuple[int, float]]:
+        """Return up to top_k (chunk_id, cosine similarity) pairs, best first."""
+
+
+class ExactIndex:
+    """One tenant's vectors in a contiguous matrix with precomputed norms.
+
+    Rows live in a preallocated buffer that doubles when full, so appends
+    are amortized O(1) and never move rows a concurrent search is reading.
+    Search is a single matrix-vector product followed by argpartition. With
+    dtype float16 the matrix takes half the memory and is upcast to float32
+    block by block at query time. The size and arrays are published together
+    as one (size, ids, matrix, norms) tuple, so a search never pairs a new
+    array with an old size.
+    """
+
+    BLOCK_ROWS = 8192
+
+    def __init__(self, dimension: int, dtype: str = EXACT_SEARCH_DTYPE, capacity: int = 1024):
+        self.dimension = dimension
+        self.dtype = np.dtype(dtype)
+        self._state = (
+            0,
+            np.zeros(capacity, dtype=np.int64),
+            np.zeros((capacity, dimension), dtype=self.dtype),
+            np.zeros(capacity, dtype=np.float32)
+        )
+
+    @classmethod
+    def from_vectors(cls, ids: np.ndarray, matrix: np.ndarray, dtype: str = EXACT_SEARCH_DTYPE) -> "ExactIndex":
+        index = cls(matrix.shape[1], dtype, capacity=max(1024, len(ids)))
+        index.add(ids, matrix)
+        return index
+
+    def __len__(self) -> int:
+        return self._state[0]
+
+    @property
+    def size(self) -> int:
+        return self._state[0]
+
+    @property
+    def ids(self) -> np.ndarray:
+        size, ids, _, _ = self._state
+        return ids[:size]
+
+    @property
+    def nbytes(self) -> int:
+        size, ids, matrix, norms = self._state
+        return matrix[:size].nbytes + ids[:size].nbytes + norms[:size].nbytes
+
+    def vectors(self) -> np.ndarray:
+        """The stored vectors as float32, e.g. to build an ANN index from."""
+        size, _, matrix, _ = self._state
+        return matrix[:size].astype(np.float32)
+
+    def close(self):
+        pass
+
+    def add(self, ids: np.ndarray, vectors: np.ndarray):
+        """Append rows whose ids are not already present."""
+        size, all_ids, matrix, all_norms = self._state
+        fresh = ~np.isin(ids, all_ids[:size])
+        ids, vectors = ids[fresh], vectors[fresh]
+        count = len(ids)
+        if not count:
+            return
+        if size + count > len(all_ids):
+            capacity = max(len(all_ids) * 2, size + count)
+            grown_ids = np.zeros(capacity, dtype=np.int64)
+            grown_matrix = np.zeros((capacity, self.dimension), dtype=self.dtype)
+            grown_norms = np.zeros(capacity, dtype=np.float32)
+            grown_ids[:size] = all_ids[:size]
+            grown_matrix[:size] = matrix[:size]
+            grown_norms[:size] = all_norms[:size]
+            all_ids, matrix, all_norms = grown_ids, grown_matrix, grown_norms
+        # Rows past the published size are invisible to searches until the swap below
+        end = size + count
+        all_ids[size:end] = ids
+        matrix[size:end] = vectors
+        norms = np.linalg.norm(matrix[size:end].astype(np.float32), axis=1)
+        all_norms[size:end] = np.where(norms > 0, norms, 1.0)
+        self._state = (end, all_ids, matrix, all_norms)
+
+    def remove(self, ids: np.ndarray):
+        """Compact the buffer without the given ids (into new arrays)."""
+        size, all_ids, matrix, norms = self._state
+        keep = np.flatnonzero(~np.isin(all_ids[:size], ids))
+        if len(keep) == size:
+            return
+        self._state = (len(keep), all_ids[keep].copy(), np.ascontiguousarray(matrix[keep]), norms[keep].copy())
+
+    def search(self, query_vector: np.ndarray, top_k: int) -> List[Tuple[int, float]]:
+        size, ids, matrix, norms = self._state
+        if not size:
+            return []
+        query = np.asarray(query_vector, dtype=np.float32)
+        query = query / (np.linalg.norm(query) or 1.0)
+        if self.dtype == np.float32:
+            scores = matrix[:size] @ query
+        else:
+            scores = np.empty(size, dtype=np.float32)
+            for start in range(0, size, self.BLOCK_ROWS):
+                stop = min(start + self.BLOCK_ROWS, size)
+                scores[start:stop] = matrix[start:stop].astype(np.float32) @ query
+        scores /= norms[:size]
+        k = min(top_k, size)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(ids[i]), float(scores[i])) for i in top]
+
+
+MatrixIndex = Union[ExactIndex, QuantizedIndex]
+
+
+class NumpyVectorStore(VectorStore):
+    """Per-user ExactIndex of chunk embeddings, searched with a single dot product.
+
+    A user's matrix is loaded from DocumentChunk.embedding on first use and
+    kept current through add() and remove(). With EMBEDDING_QUANTIZATION set
+    to int8 or binary, users get a QuantizedIndex instead, which keeps only
+    codes in memory and rescores against float32 vectors in VECTOR_INDEX_DIR.
+    Every change rewrites the user's stamp file in VECTOR_INDEX_DIR with a
+    fresh token; a worker whose matrix was loaded under another token reloads
+    it from the database, so writes made by other workers are picked up.
+    """
+
+    name = "numpy"
+
+    def __init__(self, dtype: str = EXACT_SEARCH_DTYPE, quantization: str = EMBEDDING_QUANTIZATION, index_dir: str = VECTOR_INDEX_DIR):
+        self.dtype = dtype
+        self.quantization = quantization
+        self.index_dir = index_dir
+        self._indexes: Dict[int, Optional[MatrixIndex]] = {}
+        self._stamps: Dict[int, str] = {}
+        self._lock = threading.Lock()
+        os.makedirs(index_dir, exist_ok=True)
+
+    def _new_index(self, user_id: int, ids: np.ndarray, matrix: np.ndarray):
+        if self.quantization == "none":
+            return ExactIndex.from_vectors(ids, matrix, self.dtype)
+        # The pid keeps workers sharing VECTOR_INDEX_DIR out of each other's files,
+        # the suffix keeps a reload from truncating the file a search is reading
+        path = os.path.join(self.index_dir, f"user_{user_id}.{os.getpid()}.{uuid.uuid4().hex[:8]}.f32")
+        return QuantizedIndex.from_vectors(ids, matrix, self.quantization, path)
+
+    def _stamp_path(self, user_id: int) -> str:
+        return os.path.join(self.index_dir, f"user_{user_id}.stamp")
+
+    def stamp(self, user_id: int) -> str:
+        """The token of the last change to a user's vectors by any worker."""
+        try:
+            with open(self._stamp_path(user_id)) as f:
+                return f.read()
+        except FileNotFoundError:
+            return ""
+
+    def _restamp(self, user_id: int) -> str:
+        """Record a change to a user's vectors for the other workers."""
+        stamp = uuid.uuid4().hex
+        partial_path = f"{self._stamp_path(user_id)}.{stamp}.tmp"
+        with open(partial_path, "w") as f:
+            f.write(stamp)
+        os.replace(partial_path, self._stamp_path(user_id))
+        return stamp
+
+    def _install(self, user_id: int, ids: np.ndarray, matrix: np.ndarray, stamp: str):
+        old = self._indexes.get(user_id)
+        self._indexes[user_id] = self._new_index(user_id, ids, matrix) if len(ids) else None
+        self._stamps[user_id] = stamp
+        if old is not None:
+            old.close()
+
+    def _current(self, user_id: int, stamp: str) -> bool:
+        return user_id in self._indexes and self._stamps.get(user_id) == stamp
+
+    def loaded(self, user_id: int) -> bool:
+        """Whether a user's matrix is loaded and no worker has changed it since."""
+        return self._current(user_id, self.stamp(user_id))
+
+    def load(self, user_id: int, ids: np.ndarray, matrix: np.ndarray, stamp: str):
+        """Install a user's vectors read from the database after stamp() returned stamp."""
+        with self._lock:
+            self._install(user_id, ids, matrix, stamp)
+
+    def drop(self, user_id: int) -> Optional[MatrixIndex]:
+        """Forget a user's matrix and return it; the caller closes it."""
+        with self._lock:
+            self._stamps.pop(user_id, None)
+            return self._indexes.pop(user_id, None)
+
+    def peek(self, user_id: int) -> Optional[MatrixIndex]:
+        """Return a user's matrix without loading it."""
+        return self._indexes.get(user_id)
+
+    def count(self, user_id: int) -> int:
+        index = self._indexes.get(user_id)
+        return len(index) if index is not None else 0
+
+    def _get(self, user_id: int) -> Optional[MatrixIndex]:
+        with self._lock:
+            # Read before the rows, so a change committed in between is not missed
+            stamp = self.stamp(user_id)
+            if not self._current(user_id, stamp):
+                ids, matrix = load_user_vectors(user_id)
+                self._install(user_id, ids, matrix, stamp)
+            return self._indexes[user_id]
+
+    def add(self, user_id: int, chunk_ids: Sequence[int], vectors: np.ndarray):
+        """Append committed chunk vectors to a user's index.
+
+        Users whose index is not loaded yet, or is out of date, are skipped;
+        their next search reads the new rows from the database.
+        """
+        if len(chunk_ids) == 0:
+            return
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(len(chunk_ids), -1)
+        new_ids = np.asarray(chunk_ids, dtype=np.int64)
+        with self._lock:
+            if self._current(user_id, self.stamp(user_id)):
+                # A concurrent lazy load may already have read these rows, which add() skips
+                if self._indexes[user_id] is None:
+                    self._indexes[user_id] = self._new_index(user_id, new_ids, vectors)
+                else:
+                    self._indexes[user_id].add(new_ids, vectors)
+                self._stamps[user_id] = self._restamp(user_id)
+            else:
+                self._restamp(user_id)
+
+    def remove(self, user_id: int, chunk_ids: Sequence[int]):
+        """Drop chunk vectors from a user's index."""
+        with self._lock:
+            current = self._current(user_id, self.stamp(user_id))
+            index = self._indexes.get(user_id)
+            if current and index is not None:
+                index.remove(np.asarray(chunk_ids, dtype=np.int64))
+            stamp = self._restamp(user_id)
+            if current:
+                self._stamps[user_id] = stamp
+
+    def search(self, user_id: int, query_vector: np.ndarray, top_k: int) -> List[Tuple[int, float]]:
+        """Return up to top_k (chunk_id, cosine similarity) pairs, best first."""
+        index = self._get(user_id)
+        return index.search(query_vector, top_k) if index is not None else []
+
+
+class FaissVectorStore(VectorStore):
+    """One persisted FAISS index per user, kept in a bounded set of open indexes.
+
+    Each user's chunk vectors live in VECTOR_INDEX_DIR/user_<id>.<kind>.faiss
+    as an IndexIVFFlat keyed by DocumentChunk.id, so a restart reads the file
+    instead of the database. kind="flat" uses a single inverted list, which
+    makes search exact; kind="ivf" is approximate, with ANN_NLIST lists probed
+    ANN_NPROBE at a time. Indexes are opened with IO_FLAG_MMAP, which maps the
+    inverted lists instead of reading them, and only VECTOR_INDEX_MAX_OPEN stay
+    open per worker. add() and remove() modify a private copy loaded from the
+    file, so concurrent searches never see an index mid-resize, then rewrite
+    the file atomically; another worker's writes are picked up by comparing
+    the file's inode, size and mtime.
+    """
+
+    name = "faiss"
+
+    def __init__(self, index_dir: str = VECTOR_INDEX_DIR, max_open: int = VECTOR_INDEX_MAX_OPEN, kind: str = "flat"):
+        import faiss
+        if kind not in ("flat", "ivf"):
+            raise ValueError(f"Unknown FAISS index kind '{kind}'")
+        self.faiss = faiss
+        self.kind = kind
+        self.index_dir = index_dir
+        self.max_open = max_open
+        self._open: "OrderedDict[int, Tuple[object, Tuple[int, int, int]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._user_locks: Dict[int, threading.Lock] = {}
+        os.makedirs(index_dir, exist_ok=True)
+
+    def index_path(self, user_id: int) -> str:
+        return os.path.join(self.index_dir, f"user_{user_id}.{self.kind}.faiss")
+
+    def has_index(self, user_id: int) -> bool:
+        return os.path.exists(self.index_path(user_id))
+
+    def _user_lock(self, user_id: int) -> threading.Lock:
+        with self._lock:
+            return self._user_locks.setdefault(user_id, threading.Lock())
+
+    @staticmethod
+    def _file_version(path: str) -> Optional[Tuple[int, int, int]]:
+        """Identify one write of an index file.
+
+        Every write replaces the file, so the inode changes even when two
+        writes land within one mtime tick; an open mapping keeps the old
+        inode from being reused.
+        """
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+    def _cached(self, user_id: int):
+        """Return the open index if it matches the file on disk."""
+        path = self.index_path(user_id)
+        with self._lock:
+            entry = self._open.get(user_id)
+            if entry is None:
+                return None
+            if self._file_version(path) != entry[1]:
+                del self._open[user_id]
+                return None
+            self._open.move_to_end(user_id)
+            return entry[0]
+
+    def _remember(self, user_id: int, index):
+        with self._lock:
+            self._open[user_id] = (index, self._file_version(self.index_path(user_id)))
+            self._open.move_to_end(user_id)
+            while len(self._open) > self.max_open:
+                self._open.popitem(last=False)
+
+    def _read(self, user_id: int):
+        """Open a user's index from disk, or None when it has not been built."""
+        index = self._cached(user_id)
+        if index is not None:
+            return index
+        path = self.index_path(user_id)
+        if not os.path.exists(path):
+            return None
+        index = self.faiss.read_index(path, self.faiss.IO_FLAG_MMAP)
+        if self.kind == "ivf":
+            index.nprobe = ANN_NPROBE
+        self._remember(user_id, index)
+        return index
+
+    def _read_writable(self, user_id: int):
+        """Load a private in-memory copy of a user's index to modify."""
+        index = self.faiss.read_index(self.index_path(user_id))
+        if self.kind == "ivf":
+            index.nprobe = ANN_NPROBE
+        return index
+
+    def _write(self, user_id: int, index):
+        path = self.index_path(user_id)
+        partial_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        self.faiss.write_index(index, partial_path)
+        os.replace(partial_path, path)
+        # The next search maps the new file rather than keeping this in-memory copy open
+        with self._lock:
+            self._open.pop(user_id, None)
+
+    def new_index(self, matrix: np.ndarray):
+        """Return an empty index of this store's kind, trained on matrix for IVF."""
+        dimension = matrix.shape[1]
+        if self.kind == "flat":
+            # One list holding every vector: exact search, and no training needed
+            quantizer = self.faiss.IndexFlatIP(dimension)
+            quantizer.add(np.zeros((1, dimension), dtype=np.float32))
+            return self.faiss.IndexIVFFlat(quantizer, dimension, 1, self.faiss.METRIC_INNER_PRODUCT)
+        # ~4 * sqrt(n) lists, with at least 39 training points per list
+        nlist = ANN_NLIST or max(1, min(int(4 * np.sqrt(len(matrix))), len(matrix) // 39))
+        index = self.faiss.IndexIVFFlat(
+            self.faiss.IndexFlatIP(dimension), dimension, nlist, self.faiss.METRIC_INNER_PRODUCT
+        )
+        index.train(matrix)
+        index.nprobe = ANN_NPROBE
+        return index
+
+    def create(self, user_id: int, ids: np.ndarray, matrix: np.ndarray):
+        """Write a user's index file from vectors already in memory."""
+        matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+        index = self.new_index(matrix)
+        index.add_with_ids(matrix, np.asarray(ids, dtype=np.int64))
+        self._write(user_id, index)
+        print(f"[DEBUG] Built {self.kind} FAISS index for user {user_id} ({index.ntotal} vectors)", file=sys.stderr)
+        return index
+
+    def _build(self, user_id: int):
+        """Create a user's index file from DocumentChunk.embedding."""
+        ids, matrix = load_user_vectors(user_id)
+        if not len(ids):
+            return None
+        return self.create(user_id, ids, matrix)
+
+    def _get(self, user_id: int):
+        index = self._read(user_id)
+        if index is None:
+            with self._user_lock(user_id):
+                index = self._read(user_id) or self._build(user_id)
+        return index
+
+    def add(self, user_id: int, chunk_ids: Sequence[int], vectors: np.ndarray):
+        """Add committed chunk vectors to a user's index file.
+
+        Users without an index file are skipped; their first search builds
+        the index from the database, which already holds the new rows.
+        """
+        if len(chunk_ids) == 0:
+            return
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32).reshape(len(chunk_ids), -1)
+        new_ids = np.asarray(chunk_ids, dtype=np.int64)
+        with self._user_lock(user_id):
+            if not self.has_index(user_id):
+                return
+            index = self._read_writable(user_id)
+            # A concurrent build may already have read these rows
+            index.remove_ids(new_ids)
+            index.add_with_ids(vectors, new_ids)
+            self._write(user_id, index)
+
+    def remove(self, user_id: int, chunk_ids: Sequence[int]):
+        """Drop chunk vectors from a user's index file."""
+        if len(chunk_ids) == 0:
+            return
+        with self._user_lock(user_id):
+            if not self.has_index(user_id):
+                return
+            index = self._read_writable(user_id)
+            if index.remove_ids(np.asarray(chunk_ids, dtype=np.int64)):
+                self._write(user_id, index)
+
+    def search(self, user_id: int, query_vector: np.ndarray, top_k: int) -> List[Tuple[int, float]]:
+        """Return up to top_k (chunk_id, cosine similarity) pairs, best first."""
+        index = self._get(user_id)
+        if index is None or index.ntotal == 0:
+            return []
+        query = np.asarray(query_vector, dtype=np.float32).reshape(1, -1)
+        scores, ids = index.search(query, min(top_k, index.ntotal))
+        return [(int(i), float(score)) for i, score in zip(ids[0], scores[0]) if i != -1]
+
+
+class QdrantVectorStore(VectorStore):
+    """All users' vectors in one Qdrant collection, separated by a user_id payload.
+
+    Chunks are shared between users with identical documents, so the point id
+    is derived from (user_id, chunk_id). Upserts are sent in batches of
+    QDRANT_UPSERT_BATCH and every search filters on user_id, which has a
+    payload index. The collection is created on first write with the
+    dimension of the vectors. A user's points are backfilled from the
+    database on their first search in this process, so switching an existing
+    deployment to Qdrant needs no migration. Pass ":memory:" as the URL to run
+    without a server.
+    """
+
+    name = "qdrant"
+
+    def __init__(
+        self,
+        url: str = QDRANT_URL,
+        api_key: str = QDRANT_API_KEY,
+        collection: str = QDRANT_COLLECTION_NAME,
+        batch_size: int = QDRANT_UPSERT_BATCH
+    ):
+        from qdrant_client import QdrantClient, models
+        self.models = models
+        if url == ":memory:":
+            self.client = QdrantClient(location=":memory:")
+        else:
+            self.client = QdrantClient(url=url, api_key=api_key or None)
+        self.collection = collection
+        self.batch_size = batch_size
+        self._ready = False
+        self._synced = set()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def point_id(user_id: int, chunk_id: int) -> str:
+        return str(uuid.uuid5(uuid.NAMESPACE_OID, f"{user_id}:{chunk_id}"))
+
+    def _user_filter(self, user_id: int):
+        models = self.models
+        return models.Filter(must=[
+            models.FieldCondition(key="user_id", match=models.MatchValue(value=user_id))
+        ])
+
+    def _ensure_collection(self, dimension: int) -> bool:
+        """Create the collection if needed; returns False if it does not exist yet."""
+        if self._ready:
+            return True
+        with self._lock:
+            if self._ready:
+                return True
+            if not self.client.collection_exists(self.collection):
+                if not dimension:
+                    return False
+                self.client.create_collection(
+                    self.collection,
+                    vectors_config=self.models.VectorParams(size=dimension, distance=self.models.Distance.DOT)
+                )
+                self.client.create_payload_index(
+                    self.collection, "user_id", field_schema=self.models.PayloadSchemaType.INTEGER
+                )
+            self._ready = True
+            return True
+
+    def _upsert(self, user_id: int, chunk_ids: np.ndarray, vectors: np.ndarray):
+        for start in range(0, len(chunk_ids), self.batch_size):
+            ids = chunk_ids[start:start + self.batch_size]
+            self.client.upsert(
+                self.collection,
+                points=self.models.Batch(
+                    ids=[self.point_id(user_id, int(chunk_id)) for chunk_id in ids],
+                    vectors=vectors[start:start + self.batch_size].tolist(),
+                    payloads=[{"user_id": user_id, "chunk_id": int(chunk_id)} for chunk_id in ids]
+                ),
+                wait=True
+            )
+
+    def _sync(self, user_id: int):
+        """Backfill a user's points from the database once per process."""
+        if user_id in self._synced:
+            return
+        ids, matrix = load_user_vectors(user_id)
+        if len(ids) and self._ensure_collection(matrix.shape[1]):
+            self._upsert(user_id, ids, matrix)
+        self._synced.add(user_id)
+
+    def add(self, user_id: int, chunk_ids: Sequence[int], vectors: np.ndarray):
+        """Upsert chunk vectors; re-adding an existing chunk is a no-op."""
+        if len(chunk_ids) == 0:
+            return
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(len(chunk_ids), -1)
+        self._ensure_collection(vectors.shape[1])
+        self._upsert(user_id, np.asarray(chunk_ids, dtype=np.int64), vectors)
+
+    def remove(self, user_id: int, chunk_ids: Sequence[int]):
+        """Delete a user's points for the given chunks."""
+        if len(chunk_ids) == 0 or not self._ensure_collection(0):
+            return
+        self.client.delete(
+            self.collection,
+            points_selector=self.models.PointIdsList(
+                points=[self.point_id(user_id, int(chunk_id)) for chunk_id in chunk_ids]
+            ),
+            wait=True
+        )
+
+    def search(self, user_id: int, query_vector: np.ndarray, top_k: int) -> List[Tuple[int, float]]:
+        """Return up to top_k (chunk_id, cosine similarity) pairs, best first."""
+        self._sync(user_id)
+        if not self._ensure_collection(0):
+            return []
+        points = self.client.search(
+            self.collection,
+            query_vector=np.asarray(query_vector, dtype=np.float32).tolist(),
+            query_filter=self._user_filter(user_id),
+            limit=top_k
+        )
+        return [(int(point.payload["chunk_id"]), float(point.score)) for point in points]
+
+
+class TieredVectorStore(VectorStore):
+    """Exact search for small tenants, IVF for large ones.
+
+    Tenants below ANN_PROMOTE_THRESHOLD chunks are served from an in-memory
+    ExactIndex, where one matrix-vector product beats an ANN index's overhead.
+    Once a tenant reaches the threshold, either when loaded or through add(),
+    their matrix is turned into a persisted IVF index and dropped from memory.
+    Tenants are not demoted when they shrink again. bench_vector_search.py
+    shows where the crossover lies on a given machine.
+    """
+
+    name = "tiered"
+
+    def __init__(self, threshold: int = ANN_PROMOTE_THRESHOLD):
+        self.threshold = threshold
+        self.exact = NumpyVectorStore()
+        self.ann = FaissVectorStore(kind="ivf")
+
+    def _ensure_loaded(self, user_id: int):
+        if self.ann.has_index(user_id):
+            # Another worker may have promoted the tenant since we loaded it
+            stale = self.exact.drop(user_id)
+            if stale is not None:
+                stale.close()
+            return
+        if self.exact.loaded(user_id):
+            return
+        with self.ann._user_lock(user_id):
+            if self.ann.has_index(user_id) or self.exact.loaded(user_id):
+                return
+            stamp = self.exact.stamp(user_id)
+            ids, matrix = load_user_vectors(user_id)
+            if len(ids) >= self.threshold:
+                self.ann.create(user_id, ids, matrix)
+            else:
+                self.exact.load(user_id, ids, matrix, stamp)
+
+    def _promote(self, user_id: int):
+        with self.ann._user_lock(user_id):
+            index = self.exact.peek(user_id)
+            if index is None or len(index) < self.threshold or self.ann.has_index(user_id):
+                return
+            self.ann.create(user_id, index.ids.copy(), index.vectors())
+            self.exact.drop(user_id)
+            index.close()
+        print(f"[DEBUG] Promoted user {user_id} to an ANN index at {len(index)} chunks", file=sys.stderr)
+
+    def add(self, user_id: int, chunk_ids: Sequence[int], vectors: np.ndarray):
+        if self.ann.has_index(user_id):
+            self.ann.add(user_id, chunk_ids, vectors)
+            return
+        self.exact.add(user_id, chunk_ids, vectors)
+        if self.exact.count(user_id) >= self.threshold:
+            self._promote(user_id)
+
+    def remove(self, user_id: int, chunk_ids: Sequence[int]):
+        self.exact.remove(user_id, chunk_ids)
+        self.ann.remove(user_id, chunk_ids)
+
+    def search(self, user_id: int, query_vector: np.ndarray, top_k: int) -> List[Tuple[int, float]]:
+        self._ensure_loaded(user_id)
+        index = self.exact.peek(user_id)
+        if index is not None:
+            return index.search(query_vector, top_k)
+        if self.ann.has_index(user_id):
+            return self.ann.search(user_id, query_vector, top_k)
+        return []
+
+
+VECTOR_STORES = {
+    NumpyVectorStore.name: NumpyVectorStore,
+    FaissVectorStore.name: FaissVectorStore,
+    QdrantVectorStore.name: QdrantVectorStore,
+    TieredVectorStore.name: TieredVectorStore,
+}
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_vector_store() -> VectorStore:
+    """Return the process-wide vector store selected by VECTOR_STORE."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                if VECTOR_STORE not in VECTOR_STORES:
+                    raise ValueError(f"Unknown VECTOR_STORE '{VECTOR_STORE}'. Choose from: {', '.join(VECTOR_STORES)}")
+                _store = VECTOR_STORES[VECTOR_STORE]()
+                print(f"[DEBUG] Using {_store.name} vector store", file=sys.stderr)
+    return _store
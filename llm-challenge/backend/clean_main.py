@@ -27,6 +27,7 @@ from datetime import datetime
 from config import GEMINI_API_KEY, SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES
 
 from config import DATABASE_URL, DEBUG, FRONTEND_URL 
+from backend.app.uploads import save_upload
 
 # Initialize OpenAI
 
@@ -423,14 +424,11 @@ async def upload_document(request: Request, file: UploadFile = File(...), db: Se
     user = get_user_by_email(db, email)
     if not user:
         raise HTTPException(status_code=401, detail="Invalid user")
-    file_path = f"uploads/{uuid.uuid4()}_{file.filename}"
-    with open(file_path, "wb") as buffer:
-        content = await file.read()
-        buffer.write(content)
+    saved = await save_upload(file, upload_dir="uploads")
     document = Document(
-        title=file.filename,
-        content=f"Content of {file.filename}",
-        file_type=file.filename.split('.')[-1],
+        title=saved["filename"],
+        content=f"Content of {saved['filename']}",
+        file_type=saved["file_type"],
         user_id=user.id
     )
     db.add(document)
@@ -440,7 +438,7 @@ async def upload_document(request: Request, file: UploadFile = File(...), db: Se
         "id": document.id,
         "title": document.title,
         "file_type": document.file_type,
-        "file_size": len(content),
+        "file_size": saved["file_size"],
         "is_processed": True,
         "chunk_count": 1,
         "created_at": document.created_at.isoformat(),
@@ -0,0 +1,63 @@
+"""Add content hashing, stored embeddings, corpus versions and answer cache hits
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17
+
+Databases created by Base.metadata.create_all() before these columns existed
+are upgraded in place; on a database that already has them this is a no-op.
+Documents uploaded before content hashing keep a NULL content_hash and no
+stored embeddings, so they are not searchable until they are uploaded again.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+# (table, column, index it) added by this revision
+COLUMNS = [
+    ("users", sa.Column("corpus_version", sa.Integer(), nullable=False, server_default="0"), False),
+    ("messages", sa.Column("cache_hit", sa.Boolean(), server_default=sa.false()), False),
+    ("documents", sa.Column("content_hash", sa.String(64)), True),
+    ("document_chunks", sa.Column("content_hash", sa.String(64)), True),
+    ("document_chunks", sa.Column("embedding", sa.LargeBinary()), False),
+]
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    for table, column, indexed in COLUMNS:
+        if column.name in {c["name"] for c in inspector.get_columns(table)}:
+            continue
+        op.add_column(table, column)
+        if indexed:
+            op.create_index(op.f(f"ix_{table}_{column.name}"), table, [column.name])
+    if "ix_document_chunks_document_id" not in {i["name"] for i in inspector.get_indexes("document_chunks")}:
+        op.create_index(op.f("ix_document_chunks_document_id"), "document_chunks", ["document_id"])
+    if not inspector.has_table("ingestion_jobs"):
+        op.create_table(
+            "ingestion_jobs",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("document_id", sa.Integer(), sa.ForeignKey("documents.id"), nullable=False),
+            sa.Column("status", sa.String(), nullable=False),
+            sa.Column("attempts", sa.Integer(), nullable=False),
+            sa.Column("last_error", sa.Text()),
+            sa.Column("next_attempt_at", sa.DateTime()),
+            sa.Column("created_at", sa.DateTime()),
+            sa.Column("updated_at", sa.DateTime()),
+        )
+        for column in ("id", "document_id", "status"):
+            op.create_index(op.f(f"ix_ingestion_jobs_{column}"), "ingestion_jobs", [column])
+
+
+def downgrade():
+    op.drop_table("ingestion_jobs")
+    op.drop_index(op.f("ix_document_chunks_document_id"), table_name="document_chunks")
+    for table, column, indexed in reversed(COLUMNS):
+        if indexed:
+            op.drop_index(op.f(f"ix_{table}_{column.name}"), table_name=table)
+        with op.batch_alter_table(table) as batch:
+            batch.drop_column(column.name)
@@ -23,6 +23,7 @@ import openai
 from datetime import datetime
 
 from config import DATABASE_URL, DEBUG, FRONTEND_URL, OPENAI_API_KEY
+from backend.app.uploads import save_upload
 
 # Initialize OpenAI
 openai.api_key = OPENAI_API_KEY
@@ -316,17 +317,14 @@ async def upload_document(file: UploadFile = File(...), token: str = None, db: S
     
     user = active_users[token]
     
-    # Save file
-    file_path = f"uploads/{uuid.uuid4()}_{file.filename}"
-    with open(file_path, "wb") as buffer:
-        content = await file.read()
-        buffer.write(content)
+    # Stream file to disk, enforcing size and type limits
+    saved = await save_upload(file, upload_dir="uploads")
     
     # Create document record
     document = Document(
-        title=file.filename,
-        content=f"Content of {file.filename}",
-        file_type=file.filename.split('.')[-1],
+        title=saved["filename"],
+        content=f"Content of {saved['filename']}",
+        file_type=saved["file_type"],
         user_id=user.id
     )
     db.add(document)
@@ -337,7 +335,7 @@ async def upload_document(file: UploadFile = File(...), token: str = None, db: S
         "id": document.id,
         "title": document.title,
         "file_type": document.file_type,
-        "file_size": len(content),
+        "file_size": saved["file_size"],
         "is_processed": True,
         "chunk_count": 1,
         "created_at": document.created_at.isoformat(),
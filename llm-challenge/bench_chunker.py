@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the token-aware chunker (rag/chunking.py)
+
+Streams synthetic pages through iter_chunks and reports chunks per second,
+words per second and the peak Python memory of a streaming pass.
+
+Usage: python bench_chunker.py [pages] [words_per_page]
+"""
+
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+# Add the project root to Python path
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from config import CHUNK_SIZE, CHUNK_OVERLAP, CHUNK_TOKENIZER
+from rag.chunking import iter_chunks, get_tokenizer, RegexTokenizer
+
+WORDS = (
+    "policy leave employee manager approval request annual sick casual holiday "
+    "working hours overtime remote office security password reset support ticket "
+    "SKU-4411 ERR_503 section 4.2 compliance training handbook benefits payroll"
+).split()
+
+
+def generate_pages(pages, words_per_page, seed=42):
+    """Yield synthetic pages lazily, like the extractor does."""
+    rng = random.Random(seed)
+    for _ in range(pages):
+        words = [rng.choice(WORDS) for _ in range(words_per_page)]
+        yield " ".join(words) + "."
+
+
+def run(tokenizer, pages, words_per_page):
+    """Chunk pre-generated pages and return (chunks, words, seconds)."""
+    page_list = list(generate_pages(pages, words_per_page))
+    start = time.perf_counter()
+    chunks = 0
+    words = 0
+    for chunk in iter_chunks(page_list, CHUNK_SIZE, CHUNK_OVERLAP, tokenizer):
+        chunks += 1
+        words += chunk.count(" ") + 1
+    return chunks, words, time.perf_counter() - start
+
+
+def peak_memory(tokenizer, pages, words_per_page):
+    """Return peak traced bytes for a separate, untimed pass (tracemalloc is slow)."""
+    tracemalloc.start()
+    for _ in iter_chunks(generate_pages(pages, words_per_page), CHUNK_SIZE, CHUNK_OVERLAP, tokenizer):
+        pass
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def main():
+    """Run the benchmark for the configured and the fallback tokenizer."""
+    pages = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    words_per_page = int(sys.argv[2]) if len(sys.argv) > 2 else 600
+
+    print("📏 Chunker benchmark")
+    print("=" * 50)
+    print(f"Pages: {pages}, words/page: {words_per_page}, CHUNK_SIZE={CHUNK_SIZE}, CHUNK_OVERLAP={CHUNK_OVERLAP}")
+
+    tokenizers = [get_tokenizer(CHUNK_TOKENIZER)]
+    if not isinstance(tokenizers[0], RegexTokenizer):
+        tokenizers.append(RegexTokenizer())
+
+    for tokenizer in tokenizers:
+        chunks, words, elapsed = run(tokenizer, pages, words_per_page)
+        peak = peak_memory(tokenizer, pages, words_per_page)
+        print(f"\nTokenizer: {tokenizer.name}")
+        print(f"  chunks:       {chunks}")
+        print(f"  chunks/sec:   {chunks / elapsed:,.0f}")
+        print(f"  words/sec:    {words / elapsed:,.0f} (overlap counted twice)")
+        print(f"  elapsed:      {elapsed:.2f}s")
+        print(f"  peak memory:  {peak / 1024 / 1024:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the micro-batching embedding service (backend/app/embeddings.py)
+
+Fires N concurrent single-query embed requests and compares one model call per
+request against the EmbeddingService, which folds concurrent requests into
+micro-batches. Reports throughput and per-request latency on this machine.
+
+Usage: python bench_embeddings.py [requests] [concurrency]
+"""
+
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Add the project root to Python path
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from config import EMBEDDING_MODEL, EMBEDDING_MAX_BATCH_SIZE, EMBEDDING_MAX_WAIT_MS
+from backend.app.embeddings import EmbeddingService, encode_texts, get_embedding_model
+
+QUERIES = [
+    "How many days of annual leave do employees get?",
+    "What is the process for resetting my password?",
+    "Who approves remote work requests?",
+    "Explain error ERR_503 in the support handbook",
+    "What does section 4.2 of the compliance policy say?",
+    "When is payroll processed each month?",
+    "How do I submit an overtime claim?",
+    "Which benefits are available after probation?",
+]
+
+
+def query(n):
+    return f"{QUERIES[n % len(QUERIES)]} (#{n})"
+
+
+def report(label, latencies, elapsed):
+    latencies = sorted(latencies)
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(f"\n{label}")
+    print(f"  requests/sec: {len(latencies) / elapsed:,.1f}")
+    print(f"  latency p50:  {statistics.median(latencies) * 1000:.1f} ms")
+    print(f"  latency p95:  {p95 * 1000:.1f} ms")
+    print(f"  elapsed:      {elapsed:.2f}s")
+
+
+async def run_unbatched(requests, concurrency):
+    """One model call per request, serialized on a single thread like a lone worker."""
+    loop = asyncio.get_running_loop()
+    lock = asyncio.Lock()
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(n):
+        async with semaphore:
+            start = time.perf_counter()
+            async with lock:
+                await loop.run_in_executor(None, encode_texts, [query(n)])
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(n) for n in range(requests)))
+    return latencies, time.perf_counter() - start
+
+
+async def run_batched(requests, concurrency):
+    """The same requests through EmbeddingService."""
+    service = EmbeddingService()
+    await service.start()
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(n):
+        async with semaphore:
+            start = time.perf_counter()
+            await service.embed_one(query(n))
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(n) for n in range(requests)))
+    elapsed = time.perf_counter() - start
+    await service.stop()
+    return latencies, elapsed, service.batches
+
+
+def main():
+    """Run both modes and print the comparison."""
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 512
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 64
+
+    print("🧮 Embedding service benchmark")
+    print("=" * 50)
+    print(f"Model: {EMBEDDING_MODEL}, requests: {requests}, concurrency: {concurrency}")
+    print(f"EMBEDDING_MAX_BATCH_SIZE={EMBEDDING_MAX_BATCH_SIZE}, EMBEDDING_MAX_WAIT_MS={EMBEDDING_MAX_WAIT_MS}")
+
+    get_embedding_model()
+    encode_texts(QUERIES)  # warm-up
+
+    latencies, elapsed = asyncio.run(run_unbatched(requests, concurrency))
+    report("One model call per request", latencies, elapsed)
+    baseline = requests / elapsed
+
+    latencies, elapsed, batches = asyncio.run(run_batched(requests, concurrency))
+    report("Micro-batched (EmbeddingService)", latencies, elapsed)
+    print(f"  batches:      {batches} (avg {requests / batches:.1f} texts)")
+    print(f"\n🚀 Speedup: {requests / elapsed / baseline:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
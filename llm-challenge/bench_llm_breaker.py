@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the LLM circuit breaker (backend/app/circuit_breaker.py)
+
+Starts two mock OpenAI-compatible providers: a degraded "groq" that hangs
+for a while and then answers 503, and a healthy "openai". Chats are sent
+with and without circuit breakers, first with Groq as the only provider
+and then with OpenAI as a fallback behind the router. Every client retries
+5xx responses as in production. Reports chat latency, failures and how
+many requests reached the degraded provider.
+
+Usage: python bench_llm_breaker.py [chats] [concurrency] [degraded_ms]
+"""
+
+import asyncio
+import socket
+import statistics
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+# Add the project root to Python path
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from backend.app.llm_client import LLMClient, LLMError
+from backend.app.llm_router import LLMRouter
+from backend.app.rate_limiter import ProviderLimiter
+from backend.app.circuit_breaker import CircuitBreaker
+
+MESSAGES = [{"role": "user", "content": "Is the VPN down?"}]
+upstream = Counter()
+
+
+def start_mock_provider(name, latency, status=200):
+    """Serve /chat/completions on a background thread."""
+    import uvicorn
+    from fastapi import FastAPI
+    from fastapi.responses import JSONResponse
+
+    mock = FastAPI()
+
+    @mock.post("/chat/completions")
+    async def chat_completions(payload: dict):
+        upstream[name] += 1
+        await asyncio.sleep(latency)
+        if status != 200:
+            return JSONResponse({"error": f"{name} is degraded"}, status_code=status)
+        return {"choices": [{"message": {"role": "assistant", "content": f"answer from {name}"}}]}
+
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(mock, host="127.0.0.1", port=port, log_level="warning", backlog=2048))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return f"http://127.0.0.1:{port}", server
+
+
+async def run(label, router, chats, concurrency):
+    """Send chats with bounded concurrency and print one result row."""
+    upstream.clear()
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, failures = [], 0
+
+    async def one():
+        nonlocal failures
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                await router.complete(MESSAGES, max_tokens=50)
+            except LLMError:
+                failures += 1
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(chats)))
+    elapsed = time.perf_counter() - start
+    circuit = router.circuits().get("groq", "none")
+    print(f"{label:<28} {statistics.mean(latencies) * 1000:>8.0f}ms {max(latencies) * 1000:>8.0f}ms "
+          f"{failures:>5} {upstream['groq']:>10} {elapsed:>7.2f}s   {circuit}")
+    await router.close()
+
+
+def main():
+    """Start the mock providers and compare clients with and without breakers."""
+    chats = int(sys.argv[1]) if len(sys.argv) > 1 else 80
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    degraded = (float(sys.argv[3]) if len(sys.argv) > 3 else 1000) / 1000.0
+
+    groq_url, groq_server = start_mock_provider("groq", degraded, status=503)
+    openai_url, openai_server = start_mock_provider("openai", 0.25)
+
+    print("🔌 LLM circuit breaker benchmark")
+    print("=" * 78)
+    print(f"chats={chats}, concurrency={concurrency}, groq answers 503 after {degraded * 1000:.0f}ms, openai 250ms")
+
+    def client(name, url, breaker):
+        return LLMClient(
+            url, "mock-key", "mock", name=name,
+            limiter=ProviderLimiter(name, max_retries=2),
+            breaker=CircuitBreaker(name, cooldown=5) if breaker else None
+        )
+
+    def router(names, breaker):
+        urls = {"groq": groq_url, "openai": openai_url}
+        return LLMRouter([client(name, urls[name], breaker) for name in names], hedge_delay_ms=0, explore_rate=0)
+
+    print(f"\n{'setup':<28} {'mean':>10} {'max':>10} {'fail':>5} {'groq calls':>10} {'wall':>8}   groq circuit")
+    asyncio.run(run("groq only, no breaker", router(["groq"], False), chats, concurrency))
+    asyncio.run(run("groq only, breaker", router(["groq"], True), chats, concurrency))
+    asyncio.run(run("groq + openai, no breaker", router(["groq", "openai"], False), chats, concurrency))
+    asyncio.run(run("groq + openai, breaker", router(["groq", "openai"], True), chats, concurrency))
+
+    groq_server.should_exit = True
+    openai_server.should_exit = True
+
+
+if __name__ == "__main__":
+    main()
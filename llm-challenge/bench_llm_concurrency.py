@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Load test for the async LLM client (backend/app/llm_client.py)
+
+Starts a local mock of an OpenAI-compatible chat completions endpoint that
+answers after a fixed delay, then fires N concurrent chats through
+generate_answer twice: once with the old blocking requests.post call made
+from the event loop, and once with the pooled httpx client. A ticker task
+measures how long the event loop was frozen, which is what every other
+request in the worker waits on. Finally the same chats are streamed, to
+compare time to first token with full-response latency, and a burst of
+identical questions shows how many upstream calls single-flight saves.
+Last, an evaluation-style replay of the same chats shows the completion
+cache answering the second pass without calling the provider.
+
+Usage: python bench_llm_concurrency.py [chats] [delay_ms]
+"""
+
+import asyncio
+import json
+import os
+import socket
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+MOCK_TOKENS = 20
+upstream_calls = 0
+
+# Add the project root to Python path
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_mock_llm(port, delay):
+    """Serve /chat/completions on a background thread, replying after delay seconds."""
+    import uvicorn
+    from fastapi import FastAPI
+
+    from fastapi.responses import StreamingResponse
+
+    mock = FastAPI()
+    words = [f"word{i} " for i in range(MOCK_TOKENS)]
+
+    @mock.post("/chat/completions")
+    async def chat_completions(payload: dict):
+        global upstream_calls
+        upstream_calls += 1
+        if payload.get("stream"):
+            async def tokens():
+                # The same total latency, spread over the tokens
+                for word in words:
+                    await asyncio.sleep(delay / len(words))
+                    yield f"data: {json.dumps({'choices': [{'delta': {'content': word}}]})}\n\n"
+                yield "data: [DONE]\n\n"
+            return StreamingResponse(tokens(), media_type="text/event-stream")
+        await asyncio.sleep(delay)
+        return {"choices": [{"message": {"role": "assistant", "content": "".join(words)}}]}
+
+    server = uvicorn.Server(uvicorn.Config(mock, host="127.0.0.1", port=port, log_level="warning", backlog=2048))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return server
+
+
+async def watch_loop(stop, stalls):
+    """Record the longest gap between ticks that should be 5 ms apart."""
+    last = time.perf_counter()
+    while not stop.is_set():
+        await asyncio.sleep(0.005)
+        now = time.perf_counter()
+        stalls.append(now - last - 0.005)
+        last = now
+
+
+async def run(label, answer, chats):
+    stop, stalls = asyncio.Event(), []
+    watcher = asyncio.create_task(watch_loop(stop, stalls))
+    await asyncio.sleep(0.02)
+    start = time.perf_counter()
+    results = await asyncio.gather(*(answer(f"question {n}") for n in range(chats)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await watcher
+    ok = sum(1 for _, answered in results if answered)
+    print(f"{label:<22} {elapsed:>9.2f}s {chats / elapsed:>10.1f}/s {max(stalls) * 1000:>14.0f}ms {ok:>4}/{chats}")
+
+
+async def main_async(chats, delay):
+    import requests
+    import backend.app.main  # noqa: F401  (imports rag the way the server does)
+    from backend.app.rag import generate_answer, stream_answer
+    from backend.app.llm_router import get_llm_router, close_llm_router
+    from backend.app.single_flight import get_single_flight
+    from backend.app.completion_cache import get_completion_cache
+    from config import GROQ_API_URL
+
+    async def blocking_answer(prompt):
+        # What generate_response did before: a synchronous call on the event loop
+        response = requests.post(f"{GROQ_API_URL}/chat/completions", json={"messages": [{"role": "user", "content": prompt}]})
+        return response.json()["choices"][0]["message"]["content"], response.status_code == 200
+
+    async def pooled_answer(prompt):
+        return await generate_answer(prompt, [], [])
+
+    print(f"\n{'client':<22} {'wall time':>10} {'throughput':>11} {'max loop stall':>15} {'ok':>9}")
+    await run("requests.post (old)", blocking_answer, chats)
+    await run("httpx pooled (new)", pooled_answer, chats)
+    print(f"\nIdeal with full concurrency: {delay:.2f}s wall time; serialized: {chats * delay:.2f}s")
+
+    # Streaming: what the user waits for is the first token, not the whole answer
+    first_token, full = [], []
+
+    async def streamed(n):
+        start = time.perf_counter()
+        first = None
+        async for _ in stream_answer(f"question {n}", [], []):
+            first = first or time.perf_counter() - start
+        first_token.append(first)
+        full.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(streamed(n) for n in range(chats)))
+    print(f"Streamed ({MOCK_TOKENS} tokens): first token {statistics.mean(first_token) * 1000:.0f}ms mean, "
+          f"full answer {statistics.mean(full) * 1000:.0f}ms mean")
+
+    # A burst of the same question: concurrent identical chats share one call
+    for label, stream in (("complete", False), ("stream", True)):
+        before = upstream_calls
+
+        async def same_question():
+            if not stream:
+                return await generate_answer("When is the office closed?", [], [])
+            return "".join([token async for token in stream_answer("When is the office closed?", [], [])])
+
+        start = time.perf_counter()
+        answers = await asyncio.gather(*(same_question() for _ in range(chats)))
+        print(f"Burst of {chats} identical chats ({label}): {upstream_calls - before} upstream call(s), "
+              f"{len(set(map(str, answers)))} distinct answer(s), {time.perf_counter() - start:.2f}s")
+    print(f"Single-flight stats: {get_single_flight().stats()}")
+
+    # Evaluation replay: the same prompts twice, opted in to the completion cache
+    for attempt in ("first pass", "replay"):
+        before = upstream_calls
+        start = time.perf_counter()
+        await asyncio.gather(*(generate_answer(f"eval question {n}", [], [], cache_completion=True) for n in range(chats)))
+        print(f"Eval {attempt:<10} ({chats} chats): {upstream_calls - before} upstream call(s), {time.perf_counter() - start:.2f}s")
+    print(f"Completion cache stats: {get_completion_cache().stats()}")
+    print(f"Client stats: {get_llm_router().stats()['providers']}")
+    await close_llm_router()
+
+
+def main():
+    """Start the mock server, point the client at it and compare both paths."""
+    chats = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    delay = (float(sys.argv[2]) if len(sys.argv) > 2 else 200) / 1000.0
+    port = free_port()
+    os.environ["GROQ_API_URL"] = f"http://127.0.0.1:{port}"
+    os.environ["GROQ_API_KEY"] = os.environ.get("GROQ_API_KEY") or "mock-key"
+    os.environ["LLM_PROVIDERS"] = "groq"
+    os.environ.setdefault("PROMPT_TOKENIZER", "regex")
+    workdir = tempfile.mkdtemp()
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{workdir}/bench.db")
+    os.environ.setdefault("COMPLETION_CACHE_PATH", f"{workdir}/completion_cache.db")
+
+    print("🚦 LLM concurrency benchmark")
+    print("=" * 78)
+    print(f"chats={chats}, mock LLM latency={delay * 1000:.0f}ms, endpoint={os.environ['GROQ_API_URL']}")
+
+    server = start_mock_llm(port, delay)
+    try:
+        asyncio.run(main_async(chats, delay))
+    finally:
+        server.should_exit = True
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Burst-load benchmark for the LLM rate limiter (backend/app/rate_limiter.py)
+
+Starts a mock OpenAI-compatible provider that allows a fixed number of
+requests per second and answers anything over it with 429 and a
+Retry-After header, like Groq does. Then one heavy user fires a burst of
+chats while a few light users send a handful each, and the same load is
+run four ways:
+- no limiter and no retries (every 429 is a failed chat)
+- retries only (429s are retried after Retry-After)
+- limiter with retries, all chats in one queue (FIFO)
+- limiter with retries, queued fairly per user
+
+Reports failed chats, 429s seen by the provider and latency per user class.
+
+Usage: python bench_llm_rate_limit.py [heavy_chats] [light_users] [provider_rps]
+"""
+
+import asyncio
+import math
+import statistics
+import sys
+import threading
+import time
+from pathlib import Path
+
+# Add the project root to Python path
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from backend.app.llm_client import LLMClient, LLMError
+from backend.app.rate_limiter import ProviderLimiter, llm_user
+
+LIGHT_CHATS = 5
+MESSAGES = [{"role": "user", "content": "Summarize the announcement."}]
+throttled = 0
+
+
+def start_mock_provider(port, rps, latency=0.1):
+    """Serve /chat/completions, rejecting requests over rps per second with 429."""
+    import uvicorn
+    from fastapi import FastAPI
+    from fastapi.responses import JSONResponse
+
+    mock = FastAPI()
+    bucket = {"level": float(rps), "updated": time.monotonic()}
+
+    @mock.post("/chat/completions")
+    async def chat_completions(payload: dict):
+        global throttled
+        now = time.monotonic()
+        bucket["level"] = min(rps, bucket["level"] + (now - bucket["updated"]) * rps)
+        bucket["updated"] = now
+        if bucket["level"] < 1:
+            throttled += 1
+            retry_after = math.ceil((1 - bucket["level"]) / rps)
+            return JSONResponse({"error": "rate limit exceeded"}, status_code=429, headers={"Retry-After": str(retry_after)})
+        bucket["level"] -= 1
+        await asyncio.sleep(latency)
+        return {"choices": [{"message": {"role": "assistant", "content": "ok"}}]}
+
+    server = uvicorn.Server(uvicorn.Config(mock, host="127.0.0.1", port=port, log_level="warning", backlog=2048))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return server
+
+
+async def run(label, client, heavy_chats, light_users, fair=True):
+    """Send the burst and print one result row."""
+    global throttled
+    throttled = 0
+    latencies = {"heavy": [], "light": []}
+    failures = 0
+
+    async def chat(user, kind, delay):
+        nonlocal failures
+        await asyncio.sleep(delay)
+        llm_user.set(user if fair else "everyone")
+        start = time.perf_counter()
+        try:
+            await client.complete(MESSAGES, max_tokens=50)
+        except LLMError:
+            failures += 1
+            return
+        latencies[kind].append(time.perf_counter() - start)
+
+    # The heavy burst lands first; the light users ask shortly after
+    chats = [chat("heavy", "heavy", 0) for _ in range(heavy_chats)]
+    for n in range(light_users):
+        chats += [chat(f"light-{n}", "light", 0.2) for _ in range(LIGHT_CHATS)]
+    start = time.perf_counter()
+    await asyncio.gather(*chats)
+    elapsed = time.perf_counter() - start
+
+    def mean_ms(samples):
+        return f"{statistics.mean(samples) * 1000:>8.0f}ms" if samples else f"{'-':>10}"
+    every = latencies["heavy"] + latencies["light"]
+    worst = f"{max(every) * 1000:>8.0f}ms" if every else f"{'-':>10}"
+    print(f"{label:<28} {failures:>5} {throttled:>6} {mean_ms(latencies['heavy'])} {mean_ms(latencies['light'])} {worst} {elapsed:>7.2f}s")
+    await client.close()
+
+
+def main():
+    """Start the mock provider and compare the four setups."""
+    heavy_chats = int(sys.argv[1]) if len(sys.argv) > 1 else 120
+    light_users = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    rps = float(sys.argv[3]) if len(sys.argv) > 3 else 20
+
+    import socket
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    server = start_mock_provider(port, rps)
+    url = f"http://127.0.0.1:{port}"
+
+    print("🪣 LLM rate limiter benchmark")
+    print("=" * 78)
+    print(f"heavy user: {heavy_chats} chats, light users: {light_users} x {LIGHT_CHATS} chats, provider limit: {rps:.0f} req/s")
+
+    def client(requests_per_minute=0, max_retries=3):
+        limiter = ProviderLimiter("mock", requests_per_minute, 0, max_wait=60, max_retries=max_retries, burst_seconds=1)
+        return LLMClient(url, "mock-key", "mock", name="mock", limiter=limiter)
+
+    print(f"\n{'setup':<28} {'fail':>5} {'429s':>6} {'heavy mean':>10} {'light mean':>10} {'max':>10} {'wall':>8}")
+    asyncio.run(run("no limiter, no retries", LLMClient(url, "mock-key", "mock", name="mock"), heavy_chats, light_users))
+    time.sleep(1.5)
+    asyncio.run(run("retries only", client(max_retries=10), heavy_chats, light_users))
+    time.sleep(1.5)
+    asyncio.run(run("limiter + retries, FIFO", client(rps * 60), heavy_chats, light_users, fair=False))
+    time.sleep(1.5)
+    asyncio.run(run("limiter + retries, fair", client(rps * 60), heavy_chats, light_users))
+    server.should_exit = True
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the LLM provider router (backend/app/llm_router.py)
+
+Starts local mock providers and sends the same chats through them:
+- "groq": OpenAI-style, usually fast (~80 ms) with a slow tail (10% take ~1.5 s)
+- "openai": OpenAI-style, steady ~250 ms
+- "anthropic": Messages-API style, steady ~300 ms
+- "gemini": always answers 503
+
+Compares Groq alone, the router without hedging (failover and EWMA ranking
+only) and the router with a hedged second request, and reports latency
+percentiles, failures and which provider served each chat.
+
+Usage: python bench_llm_router.py [chats] [concurrency] [hedge_delay_ms]
+"""
+
+import asyncio
+import random
+import socket
+import statistics
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+# Add the project root to Python path
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from backend.app.llm_client import LLMClient, AnthropicClient, LLMError
+from backend.app.llm_router import LLMRouter
+
+MESSAGES = [{"role": "system", "content": "You are helpful."}, {"role": "user", "content": "What is ERR_503?"}]
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_mock_provider(name, latency, style="openai", status=200, seed=0):
+    """Serve a chat endpoint on a background thread; latency() gives seconds per request."""
+    import uvicorn
+    from fastapi import FastAPI
+    from fastapi.responses import JSONResponse
+
+    mock = FastAPI()
+    rng = random.Random(seed)
+    path = "/messages" if style == "anthropic" else "/chat/completions"
+
+    @mock.post(path)
+    async def chat(payload: dict):
+        await asyncio.sleep(latency(rng))
+        if status != 200:
+            return JSONResponse({"error": f"{name} unavailable"}, status_code=status)
+        text = f"answer from {name}"
+        if style == "anthropic":
+            return {"content": [{"type": "text", "text": text}]}
+        return {"choices": [{"message": {"role": "assistant", "content": text}}]}
+
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(mock, host="127.0.0.1", port=port, log_level="warning", backlog=2048))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return f"http://127.0.0.1:{port}", server
+
+
+def percentile(samples, p):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+
+
+async def run(label, router, chats, concurrency):
+    """Send chats with bounded concurrency and print one result row."""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, served, failures = [], Counter(), 0
+
+    async def one():
+        nonlocal failures
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                answer = await router.complete(MESSAGES, max_tokens=100)
+            except LLMError:
+                failures += 1
+                return
+            latencies.append(time.perf_counter() - start)
+            served[answer.rsplit(" ", 1)[-1]] += 1
+
+    await asyncio.gather(*(one() for _ in range(chats)))
+    share = ", ".join(f"{name} {count}" for name, count in served.most_common())
+    print(f"{label:<22} {percentile(latencies, 0.5) * 1000:>7.0f}ms {percentile(latencies, 0.95) * 1000:>7.0f}ms "
+          f"{percentile(latencies, 0.99) * 1000:>7.0f}ms {statistics.mean(latencies) * 1000:>7.0f}ms {failures:>5}   {share}")
+    await router.close()
+
+
+def main():
+    """Start the mock providers and compare routing strategies."""
+    chats = int(sys.argv[1]) if len(sys.argv) > 1 else 400
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    hedge_delay_ms = float(sys.argv[3]) if len(sys.argv) > 3 else 300
+
+    print("🧭 LLM router benchmark")
+    print("=" * 78)
+    print(f"chats={chats}, concurrency={concurrency}, hedge delay={hedge_delay_ms:.0f}ms")
+
+    providers = {
+        "groq": start_mock_provider("groq", lambda r: 1.5 if r.random() < 0.1 else r.uniform(0.06, 0.1), seed=1),
+        "openai": start_mock_provider("openai", lambda r: r.uniform(0.23, 0.27), seed=2),
+        "anthropic": start_mock_provider("anthropic", lambda r: r.uniform(0.28, 0.32), style="anthropic", seed=3),
+        "gemini": start_mock_provider("gemini", lambda r: 0.02, status=503, seed=4),
+    }
+
+    def clients(names):
+        built = []
+        for name in names:
+            url = providers[name][0]
+            if name == "anthropic":
+                built.append(AnthropicClient(base_url=url, api_key="mock-key", model="mock"))
+            else:
+                built.append(LLMClient(url, "mock-key", "mock", name=name))
+        return built
+
+    print(f"\n{'strategy':<22} {'p50':>9} {'p95':>9} {'p99':>9} {'mean':>9} {'fail':>5}   served by")
+    asyncio.run(run("groq only", LLMRouter(clients(["groq"]), hedge_delay_ms=0), chats, concurrency))
+    asyncio.run(run("router, no hedging", LLMRouter(clients(["gemini", "groq", "openai", "anthropic"]), hedge_delay_ms=0), chats, concurrency))
+    asyncio.run(run("router, hedged", LLMRouter(clients(["gemini", "groq", "openai", "anthropic"]), hedge_delay_ms=hedge_delay_ms), chats, concurrency))
+
+    for _, server in providers.values():
+        server.should_exit = True
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Benchmark for quantized embedding storage (backend/app/quantization.py)
+
+Indexes synthetic clustered embeddings as float32, float16, int8 and binary
+codes and reports recall@k against unquantized float32 search, query latency
+and resident memory per million chunks. int8 and binary are measured with
+full-precision rescoring at QUANTIZED_RESCORE_FACTOR and five times that,
+and, for comparison, from the codes alone (rescore factor 1).
+
+Usage: python bench_quantization.py [chunks] [dimension] [queries]
+"""
+
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Add the project root to Python path
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from config import QUANTIZED_RESCORE_FACTOR
+from backend.app.vector_store import ExactIndex
+from backend.app.quantization import QuantizedIndex
+
+TOP_K = 10
+
+
+def clustered_vectors(count, dimension, rng, clusters=200):
+    """Normalized vectors around random topics, closer to real embeddings than pure noise."""
+    centers = rng.normal(size=(clusters, dimension)).astype(np.float32)
+    vectors = centers[rng.integers(0, clusters, count)] + 0.6 * rng.normal(size=(count, dimension)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def evaluate(index, queries, truth):
+    """Return (recall@k, mean ms per query)."""
+    index.search(queries[0], TOP_K)  # warm-up
+    start = time.perf_counter()
+    results = [index.search(query, TOP_K) for query in queries]
+    elapsed = (time.perf_counter() - start) / len(queries) * 1000
+    hits = sum(len({i for i, _ in r} & t) for r, t in zip(results, truth))
+    return hits / (len(truth) * TOP_K), elapsed
+
+
+def main():
+    """Build every variant over the same vectors and print one row each."""
+    chunks = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    dimension = int(sys.argv[2]) if len(sys.argv) > 2 else 384
+    queries_count = int(sys.argv[3]) if len(sys.argv) > 3 else 200
+    rng = np.random.default_rng(42)
+    matrix = clustered_vectors(chunks, dimension, rng)
+    ids = np.arange(chunks, dtype=np.int64)
+    queries = clustered_vectors(queries_count, dimension, rng)
+
+    print("🗜️  Quantization benchmark")
+    print("=" * 78)
+    print(f"chunks={chunks:,}, dimension={dimension}, queries={queries_count}, top_k={TOP_K}")
+
+    baseline = ExactIndex.from_vectors(ids, matrix, "float32")
+    truth = [{i for i, _ in baseline.search(query, TOP_K)} for query in queries]
+    float32_per_million = baseline.nbytes / chunks * 1_000_000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        variants = [
+            ("float32", baseline),
+            ("float16", ExactIndex.from_vectors(ids, matrix, "float16")),
+        ]
+        for kind in ("int8", "binary"):
+            for factor in (5 * QUANTIZED_RESCORE_FACTOR, QUANTIZED_RESCORE_FACTOR, 1):
+                index = QuantizedIndex.from_vectors(ids, matrix, kind, os.path.join(tmp, f"{kind}_{factor}.f32"))
+                index.rescore_factor = factor
+                label = f"{kind} rescored x{factor}" if factor > 1 else f"{kind} codes only"
+                variants.append((label, index))
+
+        print(f"\n{'variant':<20} {'recall@10':>10} {'ms/query':>10} {'MB / 1M chunks':>15} {'saved':>8}")
+        for label, index in variants:
+            recall, ms = evaluate(index, queries, truth)
+            per_million = index.nbytes / chunks * 1_000_000
+            saved = 1 - per_million / float32_per_million
+            print(f"{label:<20} {recall:>10.1%} {ms:>10.3f} {per_million / 1e6:>15,.0f} {saved:>8.0%}")
+
+    print("\nResident memory counts vectors/codes and ids; rescoring reads float32 rows")
+    print(f"from the memory-mapped file ({dimension * 4 / 1e6 * 1_000_000:,.0f} MB per million chunks on disk).")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Benchmark for exact vs ANN vector search (backend/app/vector_store.py)
+
+For a range of tenant sizes, times single-query top-k search with the exact
+NumPy matrix (float32 and float16), a flat FAISS index and the IVF index that
+tenants are promoted to, and reports IVF recall against exact search. IVF
+trades recall and a training step for speed, so the crossover is the first
+size where exact float32 search no longer fits the per-query budget;
+ANN_PROMOTE_THRESHOLD should sit near it.
+
+Usage: python bench_vector_search.py [dimension] [queries] [budget_ms]
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Add the project root to Python path
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from config import ANN_NPROBE, ANN_PROMOTE_THRESHOLD
+from backend.app.vector_store import ExactIndex, FaissVectorStore
+
+SIZES = [1_000, 5_000, 10_000, 20_000, 30_000, 50_000, 100_000]
+TOP_K = 10
+
+
+def clustered_vectors(count, dimension, rng, clusters=200):
+    """Normalized vectors around random topics, closer to real embeddings than pure noise."""
+    centers = rng.normal(size=(clusters, dimension)).astype(np.float32)
+    vectors = centers[rng.integers(0, clusters, count)] + 0.6 * rng.normal(size=(count, dimension)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def time_queries(search, queries):
+    """Return mean milliseconds per query and the results."""
+    search(queries[0])  # warm-up
+    start = time.perf_counter()
+    results = [search(query) for query in queries]
+    return (time.perf_counter() - start) / len(queries) * 1000, results
+
+
+def recall(approximate, exact):
+    hits = sum(len({i for i, _ in a} & {i for i, _ in e}) for a, e in zip(approximate, exact))
+    return hits / sum(len(e) for e in exact)
+
+
+def main():
+    """Run the size sweep and print one row per tenant size."""
+    dimension = int(sys.argv[1]) if len(sys.argv) > 1 else 384
+    queries_count = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    budget_ms = float(sys.argv[3]) if len(sys.argv) > 3 else 5.0
+    rng = np.random.default_rng(42)
+    faiss_store = FaissVectorStore(kind="ivf")
+    faiss = faiss_store.faiss
+    faiss.omp_set_num_threads(1)  # one query per request thread, as in the server
+
+    print("🔎 Vector search benchmark")
+    print("=" * 78)
+    print(f"dimension={dimension}, queries={queries_count}, top_k={TOP_K}, "
+          f"ANN_NPROBE={ANN_NPROBE}, ANN_PROMOTE_THRESHOLD={ANN_PROMOTE_THRESHOLD}, budget={budget_ms}ms")
+    print(f"\n{'chunks':>8} {'exact f32':>10} {'exact f16':>10} {'faiss flat':>11} "
+          f"{'ivf':>8} {'ivf recall':>11} {'ivf build':>10}")
+
+    crossover = None
+    for size in SIZES:
+        matrix = clustered_vectors(size, dimension, rng)
+        ids = np.arange(size, dtype=np.int64)
+        queries = clustered_vectors(queries_count, dimension, rng)
+
+        exact32 = ExactIndex.from_vectors(ids, matrix, "float32")
+        exact16 = ExactIndex.from_vectors(ids, matrix, "float16")
+        flat = faiss.IndexIDMap2(faiss.IndexFlatIP(dimension))
+        flat.add_with_ids(matrix, ids)
+        start = time.perf_counter()
+        ivf = faiss_store.new_index(matrix)
+        ivf.add_with_ids(matrix, ids)
+        build = time.perf_counter() - start
+
+        def faiss_search(index):
+            def search(query):
+                scores, found = index.search(query.reshape(1, -1), TOP_K)
+                return [(int(i), float(s)) for i, s in zip(found[0], scores[0]) if i != -1]
+            return search
+
+        exact32_ms, truth = time_queries(lambda q: exact32.search(q, TOP_K), queries)
+        exact16_ms, _ = time_queries(lambda q: exact16.search(q, TOP_K), queries)
+        flat_ms, _ = time_queries(faiss_search(flat), queries)
+        ivf_ms, approximate = time_queries(faiss_search(ivf), queries)
+        if crossover is None and exact32_ms > budget_ms:
+            crossover = size
+
+        print(f"{size:>8,} {exact32_ms:>8.3f}ms {exact16_ms:>8.3f}ms {flat_ms:>9.3f}ms "
+              f"{ivf_ms:>6.3f}ms {recall(approximate, truth):>10.1%} {build:>9.2f}s")
+
+    if crossover:
+        print(f"\n📈 Crossover: exact search exceeds {budget_ms}ms from ~{crossover:,} chunks; set ANN_PROMOTE_THRESHOLD at or below it")
+    else:
+        print(f"\n📈 Crossover: exact search stayed within {budget_ms}ms at every size")
+
+
+if __name__ == "__main__":
+    main()
@@ -17,15 +17,19 @@ OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
 OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4")
 OPENAI_TEMPERATURE = float(os.getenv("OPENAI_TEMPERATURE", "0.7"))
 OPENAI_MAX_TOKENS = int(os.getenv("OPENAI_MAX_TOKENS", "2000"))
+OPENAI_API_URL = os.getenv("OPENAI_API_URL", "https://api.openai.com/v1")
 
 # Anthropic Configuration (Optional)
 ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY", "")
 ANTHROPIC_MODEL = os.getenv("ANTHROPIC_MODEL", "claude-3-sonnet-20240229")
+ANTHROPIC_API_URL = os.getenv("ANTHROPIC_API_URL", "https://api.anthropic.com/v1")
+ANTHROPIC_VERSION = os.getenv("ANTHROPIC_VERSION", "2023-06-01")
 
 # Qdrant Configuration
 QDRANT_URL = os.getenv("QDRANT_URL", "http://localhost:6333")
 QDRANT_COLLECTION_NAME = os.getenv("QDRANT_COLLECTION_NAME", "documents")
 QDRANT_API_KEY = os.getenv("QDRANT_API_KEY", "")
+QDRANT_UPSERT_BATCH = int(os.getenv("QDRANT_UPSERT_BATCH", "256"))  # points per upsert request
 
 # Email Configuration
 MAIL_USERNAME = os.getenv("MAIL_USERNAME", "")
@@ -46,24 +50,111 @@ LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
 UPLOAD_DIR = os.getenv("UPLOAD_DIR", "./uploads")
 MAX_FILE_SIZE = int(os.getenv("MAX_FILE_SIZE", "10485760"))  # 10MB in bytes
 ALLOWED_EXTENSIONS = os.getenv("ALLOWED_EXTENSIONS", "txt,pdf,docx,pptx,html,md").split(",")
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", "1048576"))  # 1MB read/write chunks
 
 
 
 
 
 # RAG Configuration
+# Chunk sizes are measured in CHUNK_TOKENIZER tokens ("regex" counts words and punctuation)
 CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", "1000"))
 CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", "200"))
+CHUNK_TOKENIZER = os.getenv("CHUNK_TOKENIZER", "sentence-transformers/all-MiniLM-L6-v2")
 TOP_K_RESULTS = int(os.getenv("TOP_K_RESULTS", "5"))
 SIMILARITY_THRESHOLD = float(os.getenv("SIMILARITY_THRESHOLD", "0.7"))
+PROMPT_TOKENIZER = os.getenv("PROMPT_TOKENIZER", CHUNK_TOKENIZER)  # counts prompt tokens; "regex" works offline
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "3000"))  # retrieved chunk tokens per prompt
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "1000"))  # earlier turns, oldest dropped first
+HISTORY_MAX_MESSAGES = int(os.getenv("HISTORY_MAX_MESSAGES", "5"))
+VECTOR_STORE = os.getenv("VECTOR_STORE", "tiered")  # tiered, faiss, qdrant or numpy
+EXACT_SEARCH_DTYPE = os.getenv("EXACT_SEARCH_DTYPE", "float32")  # float16 halves memory but queries are slower
+EMBEDDING_QUANTIZATION = os.getenv("EMBEDDING_QUANTIZATION", "none")  # none, int8 or binary (exact tier)
+QUANTIZED_RESCORE_FACTOR = int(os.getenv("QUANTIZED_RESCORE_FACTOR", "10"))  # candidates rescored per result
+ANN_PROMOTE_THRESHOLD = int(os.getenv("ANN_PROMOTE_THRESHOLD", "20000"))  # chunks before a tenant moves to IVF
+ANN_NLIST = int(os.getenv("ANN_NLIST", "0"))  # IVF lists, 0 = about 4 * sqrt(chunks)
+ANN_NPROBE = int(os.getenv("ANN_NPROBE", "32"))  # IVF lists scanned per query
+VECTOR_INDEX_DIR = os.getenv("VECTOR_INDEX_DIR", "./vector_indexes")  # one FAISS file per user
+VECTOR_INDEX_MAX_OPEN = int(os.getenv("VECTOR_INDEX_MAX_OPEN", "64"))  # user indexes kept open per worker
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "20"))  # hits taken from each retrieval leg
+RRF_K = int(os.getenv("RRF_K", "60"))  # reciprocal-rank fusion constant
+VECTOR_SEARCH_BUDGET_MS = float(os.getenv("VECTOR_SEARCH_BUDGET_MS", "1000"))  # query embedding + ANN search
+LEXICAL_SEARCH_BUDGET_MS = float(os.getenv("LEXICAL_SEARCH_BUDGET_MS", "250"))  # FTS5 BM25 search
+RETRIEVAL_CACHE_SIZE = int(os.getenv("RETRIEVAL_CACHE_SIZE", "1024"))  # cached search results per worker
+RETRIEVAL_CACHE_MAX_MB = float(os.getenv("RETRIEVAL_CACHE_MAX_MB", "64"))  # chunk text held by the cache
+ANSWER_CACHE_MAX_DISTANCE = float(os.getenv("ANSWER_CACHE_MAX_DISTANCE", "0.05"))  # cosine distance for a cached answer, negative disables
+ANSWER_CACHE_PER_USER = int(os.getenv("ANSWER_CACHE_PER_USER", "256"))  # cached answers kept per user
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", "86400"))  # seconds
+RERANK_ENABLED = os.getenv("RERANK_ENABLED", "False").lower() == "true"
+RERANK_MODEL = os.getenv("RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", "20"))  # hard cap on chunks scored per query
+RERANK_TOP_K = int(os.getenv("RERANK_TOP_K", "3"))  # chunks sent to the LLM after reranking
+RERANK_MAX_LENGTH = int(os.getenv("RERANK_MAX_LENGTH", "256"))  # tokens per (query, chunk) pair
+RERANK_BUDGET_MS = float(os.getenv("RERANK_BUDGET_MS", "300"))  # over budget keeps first-stage order
+RERANK_WORKERS = int(os.getenv("RERANK_WORKERS", "2"))  # scoring threads; when all are busy, requests skip reranking
+
+# Ingestion Queue
+EXTRACTION_WORKERS = int(os.getenv("EXTRACTION_WORKERS", "2"))  # parser processes
+EXTRACTION_PAGE_BATCH = int(os.getenv("EXTRACTION_PAGE_BATCH", "8"))  # pdf pages / slides per task
+INGESTION_WORKERS = int(os.getenv("INGESTION_WORKERS", "2"))
+INGESTION_MAX_ATTEMPTS = int(os.getenv("INGESTION_MAX_ATTEMPTS", "3"))
+INGESTION_RETRY_DELAY = float(os.getenv("INGESTION_RETRY_DELAY", "30"))  # seconds, doubled per attempt
+INGESTION_POLL_INTERVAL = float(os.getenv("INGESTION_POLL_INTERVAL", "5"))  # seconds
+INGESTION_BATCH_SIZE = int(os.getenv("INGESTION_BATCH_SIZE", "64"))  # chunks embedded and inserted per batch
 
 
 # Groq Configuration
 GROQ_API_KEY = os.getenv("GROQ_API_KEY", "")
 GROQ_MODEL = os.getenv("GROQ_MODEL", "mixtral-8x7b-32768")
+GROQ_API_URL = os.getenv("GROQ_API_URL", "https://api.groq.com/openai/v1")  # any OpenAI-compatible endpoint
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "5"))  # seconds
+LLM_READ_TIMEOUT = float(os.getenv("LLM_READ_TIMEOUT", "60"))  # seconds between bytes of the response
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "100"))  # pooled connections per worker
+LLM_MAX_KEEPALIVE = int(os.getenv("LLM_MAX_KEEPALIVE", "20"))  # idle connections kept open
+LLM_KEEPALIVE_EXPIRY = float(os.getenv("LLM_KEEPALIVE_EXPIRY", "30"))  # seconds an idle connection is kept
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "")
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-1.5-flash")
+GEMINI_API_URL = os.getenv("GEMINI_API_URL", "https://generativelanguage.googleapis.com/v1beta/openai")  # OpenAI-compatible
+OLLAMA_URL = os.getenv("OLLAMA_URL", "")  # e.g. http://localhost:11434/v1; empty disables Ollama
+OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "llama3")
+
+# LLM provider routing
+LLM_PROVIDERS = [p.strip() for p in os.getenv("LLM_PROVIDERS", "groq,openai,anthropic,gemini,ollama").split(",") if p.strip()]  # preference order; unconfigured ones are skipped
+LLM_EWMA_ALPHA = float(os.getenv("LLM_EWMA_ALPHA", "0.2"))  # weight of the newest latency / error sample
+LLM_ERROR_HALF_LIFE = float(os.getenv("LLM_ERROR_HALF_LIFE", "60"))  # seconds for a provider's error rate to halve
+LLM_MAX_ERROR_RATE = float(os.getenv("LLM_MAX_ERROR_RATE", "0.5"))  # above this a provider is unhealthy
+LLM_HEDGE_DELAY_MS = float(os.getenv("LLM_HEDGE_DELAY_MS", "0"))  # hedge to the next provider after this long, 0 disables
+LLM_EXPLORE_RATE = float(os.getenv("LLM_EXPLORE_RATE", "0.05"))  # share of requests sent to the runner-up to re-measure it
+LLM_SINGLE_FLIGHT = os.getenv("LLM_SINGLE_FLIGHT", "True").lower() == "true"  # share one upstream call between identical in-flight chats
+LLM_RATE_LIMITS = {
+    name: (float(os.getenv(f"{name.upper()}_RPM", "0")), float(os.getenv(f"{name.upper()}_TPM", "0")))
+    for name in ("groq", "openai", "anthropic", "gemini", "ollama")
+}  # requests/min and tokens/min per provider, e.g. GROQ_RPM=30 GROQ_TPM=6000; 0 = unlimited
+LLM_RATE_BURST_SECONDS = float(os.getenv("LLM_RATE_BURST_SECONDS", "10"))  # seconds of budget a limiter may spend at once
+LLM_MAX_QUEUE_WAIT = float(os.getenv("LLM_MAX_QUEUE_WAIT", "30"))  # seconds a call may wait for its rate limit
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))  # retries of 429 / 5xx responses
+LLM_RETRY_BASE_DELAY = float(os.getenv("LLM_RETRY_BASE_DELAY", "0.5"))  # seconds, doubled per retry with jitter
+LLM_RETRY_MAX_DELAY = float(os.getenv("LLM_RETRY_MAX_DELAY", "20"))  # longer backoffs or Retry-After fail instead
+LLM_BREAKER_FAILURE_RATE = float(os.getenv("LLM_BREAKER_FAILURE_RATE", "0.5"))  # failure share of recent calls that opens a provider's circuit
+LLM_BREAKER_WINDOW = int(os.getenv("LLM_BREAKER_WINDOW", "20"))  # recent calls the failure share is taken over
+LLM_BREAKER_MIN_CALLS = int(os.getenv("LLM_BREAKER_MIN_CALLS", "5"))  # calls needed before the circuit can open
+LLM_BREAKER_COOLDOWN = float(os.getenv("LLM_BREAKER_COOLDOWN", "30"))  # seconds open before trial calls
+LLM_BREAKER_HALF_OPEN_CALLS = int(os.getenv("LLM_BREAKER_HALF_OPEN_CALLS", "1"))  # trial calls let through when half-open
+LLM_TEMPERATURE = float(os.getenv("LLM_TEMPERATURE", "0.7"))  # 0 makes answers deterministic and cacheable
+
+# LLM completion cache (exact request -> completion)
+COMPLETION_CACHE_PATH = os.getenv("COMPLETION_CACHE_PATH", "./completion_cache.db")  # empty disables the cache
+COMPLETION_CACHE_TTL = float(os.getenv("COMPLETION_CACHE_TTL", "604800"))  # seconds
+COMPLETION_CACHE_MAX_MB = float(os.getenv("COMPLETION_CACHE_MAX_MB", "256"))  # completion text kept on disk
+COMPLETION_CACHE_SAMPLED = os.getenv("COMPLETION_CACHE_SAMPLED", "False").lower() == "true"  # also cache temperature > 0, e.g. for replaying eval runs
 
 
 HF_MODEL = os.getenv("HF_MODEL", None)  # e.g., "gpt2" or "/path/to/local/model"
 EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+EMBEDDING_MAX_BATCH_SIZE = int(os.getenv("EMBEDDING_MAX_BATCH_SIZE", "64"))  # texts per model call
+EMBEDDING_MAX_WAIT_MS = float(os.getenv("EMBEDDING_MAX_WAIT_MS", "5"))  # how long a batch waits to fill
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "./embedding_cache.db")  # empty disables the cache
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "500000"))
+QUERY_EMBEDDING_CACHE_SIZE = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "2048"))  # in-memory query vectors
+QUERY_EMBEDDING_CACHE_TTL = float(os.getenv("QUERY_EMBEDDING_CACHE_TTL", "3600"))  # seconds
 
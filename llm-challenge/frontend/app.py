@@ -208,6 +208,30 @@ def make_api_request(endpoint, method="GET", data=None, files=None, headers=None
         st.error(f"API request failed: {str(e)}")
         return None
 
+def stream_chat(data, token):
+    """POST to /api/chat/stream and yield (event, payload) for each server-sent event."""
+    headers = {
+        "Authorization": f"Bearer {token}",
+        "Content-Type": "application/json",
+        "Accept": "text/event-stream"
+    }
+    with requests.post(f"{API_URL}/api/chat/stream", json=data, headers=headers, stream=True, timeout=(5, 120)) as response:
+        if response.status_code != 200:
+            try:
+                detail = response.json().get("detail", response.text)
+            except Exception:
+                detail = response.text
+            yield "error", {"detail": detail}
+            return
+        event = "message"
+        for line in response.iter_lines(decode_unicode=True):
+            if not line:
+                event = "message"
+            elif line.startswith("event:"):
+                event = line[len("event:"):].strip()
+            elif line.startswith("data:"):
+                yield event, json.loads(line[len("data:"):].strip())
+
 def load_conversations():
     """Load user conversations."""
     response = make_api_request("/api/conversations")
@@ -506,37 +530,40 @@ def chat_interface():
                     st.error("Please log in again")
                     return
 
+                # Render tokens as they arrive instead of waiting for the whole answer
+                placeholder = st.empty()
+                answer = ""
+                error_message = None
                 with st.spinner("🤖 AI is thinking..."):
-                    headers = {
-                        "Authorization": f"Bearer {token}",
-                        "Content-Type": "application/json"
-                    }
-                    # Make the API request
-                    response = make_api_request(
-                        endpoint="/api/chat",
-                        method="POST",
-                        data=data,
-                        headers=headers
-                    )
+                    events = stream_chat(data, token)
+                    for event, payload in events:
+                        if event == "meta":
+                            # Update conversation ID if new conversation was created
+                            if not st.session_state.conversation_id:
+                                st.session_state.conversation_id = payload["conversation_id"]
+                        elif event == "message":
+                            answer += payload["token"]
+                            placeholder.markdown(answer + "▌")
+                            break
+                        elif event == "error":
+                            error_message = payload.get("detail", "Unknown error")
+                            break
+                for event, payload in events:
+                    if event == "message":
+                        answer += payload["token"]
+                        placeholder.markdown(answer + "▌")
+                    elif event == "error":
+                        error_message = payload.get("detail", "Unknown error")
+                placeholder.markdown(answer)
 
-                if response and response.status_code == 200:
-                    chat_response = response.json()
-                    # Update conversation ID if new conversation was created
-                    if not st.session_state.conversation_id:
-                        st.session_state.conversation_id = chat_response["conversation_id"]
+                if error_message:
+                    st.error(f"Chat error: {error_message}")
+                if st.session_state.conversation_id:
                     # Reload messages
                     load_messages(st.session_state.conversation_id)
                     load_conversations()
-                    st.rerun()
-                else:
-                    error_message = "Unknown error"
-                    if response:
-                        try:
-                            error_data = response.json()
-                            error_message = error_data.get('detail', str(response.text))
-                        except Exception:
-                            error_message = str(response.text)
-                    st.error(f"Chat error: {error_message}")
+                    if not error_message:
+                        st.rerun()
             except Exception as e:
                 st.error(f"An error occurred: {str(e)}")
                 st.error("Please try again or contact support if the problem persists")
@@ -561,7 +588,7 @@ def documents_interface():
                 response = make_api_request("/rag/upload", method="POST", files=files)
             
             if response and response.status_code == 200:
-                st.success("Document uploaded and processed successfully!")
+                st.success("Document uploaded! It will be searchable once processing finishes.")
                 load_documents()
                 st.rerun()
             else:
@@ -0,0 +1,123 @@
+"""
+Token-aware chunking for RAG ingestion.
+
+iter_chunks consumes the page iterator from rag.ingest and yields overlapping
+chunks of CHUNK_SIZE tokens that share CHUNK_OVERLAP tokens with the previous
+chunk. Only the current window and one page are buffered, so memory stays
+bounded however long the document is.
+"""
+
+import os
+import re
+import sys
+from functools import lru_cache
+from itertools import islice
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+# Add parent directory to path to import config
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import CHUNK_SIZE, CHUNK_OVERLAP, CHUNK_TOKENIZER
+
+Span = Tuple[int, int]
+
+
+class RegexTokenizer:
+    """Offline fallback: every word and punctuation mark counts as one token."""
+
+    name = "regex"
+    pattern = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+
+    def offsets(self, text: str) -> List[Span]:
+        return [match.span() for match in self.pattern.finditer(text)]
+
+    def count(self, text: str) -> int:
+        return sum(1 for _ in self.pattern.finditer(text))
+
+
+class HFTokenizer:
+    """Wraps a Hugging Face fast tokenizer, which reports character offsets."""
+
+    def __init__(self, name: str, tokenizer):
+        self.name = name
+        self.tokenizer = tokenizer
+
+    def offsets(self, text: str) -> List[Span]:
+        encoding = self.tokenizer(
+            text, add_special_tokens=False, return_offsets_mapping=True, verbose=False
+        )
+        return [tuple(span) for span in encoding["offset_mapping"]]
+
+    def count(self, text: str) -> int:
+        return len(self.tokenizer(text, add_special_tokens=False, verbose=False)["input_ids"])
+
+
+@lru_cache(maxsize=8)
+def get_tokenizer(name: Optional[str] = None):
+    """Load a tokenizer once per process, falling back to RegexTokenizer."""
+    name = name or CHUNK_TOKENIZER
+    if name == RegexTokenizer.name:
+        return RegexTokenizer()
+    try:
+        from transformers import AutoTokenizer
+        tokenizer = AutoTokenizer.from_pretrained(name, use_fast=True)
+        if not tokenizer.is_fast:
+            raise ValueError("offset mapping needs a fast tokenizer")
+        return HFTokenizer(name, tokenizer)
+    except Exception as e:
+        print(f"[WARNING] Tokenizer {name} unavailable ({str(e)}); using regex tokens", file=sys.stderr)
+        return RegexTokenizer()
+
+
+def iter_chunks(
+    pages: Iterable[str],
+    chunk_size: int = CHUNK_SIZE,
+    chunk_overlap: int = CHUNK_OVERLAP,
+    tokenizer=None
+) -> Iterator[str]:
+    """Yield chunks of chunk_size tokens, each overlapping the last by chunk_overlap.
+
+    Chunks are sliced from the original text using token character offsets,
+    so whitespace and punctuation are preserved. Pages are joined with a
+    newline and chunks may span page boundaries.
+    """
+    tokenizer = tokenizer or get_tokenizer()
+    chunk_overlap = min(chunk_overlap, chunk_size - 1)
+    step = chunk_size - chunk_overlap
+    text = ""
+    spans: List[Span] = []
+    covered = 0  # leading spans already included in an emitted chunk
+
+    for page in pages:
+        if not page or not page.strip():
+            continue
+        if text:
+            text += "\n"
+        base = len(text)
+        text += page
+        spans.extend((base + start, base + end) for start, end in tokenizer.offsets(page))
+
+        pos = 0
+        while len(spans) - pos >= chunk_size:
+            yield text[spans[pos][0]:spans[pos + chunk_size - 1][1]]
+            pos += step
+            covered = chunk_overlap
+
+        # Drop the consumed prefix so the buffer never outgrows one window plus a page
+        if pos:
+            spans = spans[pos:]
+            cut = spans[0][0] if spans else len(text)
+            text = text[cut:]
+            spans = [(start - cut, end - cut) for start, end in spans]
+
+    if len(spans) > covered:
+        yield text[spans[0][0]:spans[-1][1]]
+
+
+def batched(iterable: Iterable, size: int) -> Iterator[list]:
+    """Yield lists of up to size items from an iterable."""
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
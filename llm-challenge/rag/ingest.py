@@ -0,0 +1,304 @@
+"""
+Text extraction for RAG ingestion.
+
+Supports txt, pdf, docx, pptx, html and md. Every extractor is a generator that
+yields one page, slide or section at a time, so large documents are never held
+as a single string. ExtractionEngine runs the CPU-heavy parsers in a process
+pool, keeping the FastAPI event loop and the server's GIL free.
+"""
+
+import multiprocessing
+import os
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Dict, Iterator, List, Optional
+
+# Add parent directory to path to import config
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import EXTRACTION_WORKERS, EXTRACTION_PAGE_BATCH
+
+TEXT_BLOCK_SIZE = 64 * 1024  # characters per block for plain text files
+DOCX_PARAGRAPHS_PER_PAGE = 50  # fallback page size when a .docx has no page breaks
+SECTION_MAX_CHARS = 20000  # split long html/md sections into pages of this size
+
+
+def _split_long(text: str, max_chars: int = SECTION_MAX_CHARS) -> Iterator[str]:
+    """Yield text in pieces of at most max_chars, preferring line breaks."""
+    while len(text) > max_chars:
+        cut = text.rfind("\n", 0, max_chars)
+        if cut <= 0:
+            cut = max_chars
+        yield text[:cut]
+        text = text[cut:]
+    if text.strip():
+        yield text
+
+
+def extract_txt(path: str, start: int = 0, stop: Optional[int] = None) -> Iterator[str]:
+    """Yield a plain text file in blocks that end on a line break."""
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        carry = ""
+        while True:
+            block = f.read(TEXT_BLOCK_SIZE)
+            if not block:
+                break
+            block = carry + block
+            cut = block.rfind("\n")
+            if cut == -1:
+                carry = ""
+            else:
+                block, carry = block[:cut + 1], block[cut + 1:]
+            if block.strip():
+                yield block
+        if carry.strip():
+            yield carry
+
+
+def extract_pdf(path: str, start: int = 0, stop: Optional[int] = None) -> Iterator[str]:
+    """Yield the text of PDF pages start..stop, one page at a time."""
+    from PyPDF2 import PdfReader
+
+    reader = PdfReader(path)
+    total = len(reader.pages)
+    stop = total if stop is None else min(stop, total)
+    for index in range(start, stop):
+        yield reader.pages[index].extract_text() or ""
+
+
+def extract_pptx(path: str, start: int = 0, stop: Optional[int] = None) -> Iterator[str]:
+    """Yield the text of slides start..stop, including tables and speaker notes."""
+    from pptx import Presentation
+
+    presentation = Presentation(path)
+    for index, slide in enumerate(presentation.slides):
+        if index < start:
+            continue
+        if stop is not None and index >= stop:
+            break
+        parts = []
+        for shape in slide.shapes:
+            if shape.has_text_frame:
+                parts.append(shape.text_frame.text)
+            elif getattr(shape, "has_table", False) and shape.has_table:
+                for row in shape.table.rows:
+                    parts.append(" | ".join(cell.text for cell in row.cells))
+        if slide.has_notes_slide:
+            parts.append(slide.notes_slide.notes_text_frame.text)
+        yield "\n".join(part for part in parts if part.strip())
+
+
+def extract_docx(path: str, start: int = 0, stop: Optional[int] = None) -> Iterator[str]:
+    """Yield a Word document page by page, splitting on explicit page breaks."""
+    from docx import Document
+
+    document = Document(path)
+    page: List[str] = []
+    for paragraph in document.paragraphs:
+        if paragraph.text.strip():
+            page.append(paragraph.text)
+        xml = paragraph._p.xml
+        breaks = 'w:type="page"' in xml or "lastRenderedPageBreak" in xml
+        if page and (breaks or len(page) >= DOCX_PARAGRAPHS_PER_PAGE):
+            yield "\n".join(page)
+            page = []
+    if page:
+        yield "\n".join(page)
+    for table in document.tables:
+        rows = [" | ".join(cell.text for cell in row.cells) for row in table.rows]
+        if rows:
+            yield "\n".join(rows)
+
+
+def extract_html(path: str, start: int = 0, stop: Optional[int] = None) -> Iterator[str]:
+    """Yield the visible text of an HTML file, split into sections at headings."""
+    from bs4 import BeautifulSoup
+
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        soup = BeautifulSoup(f, "html.parser")
+    for tag in soup(["script", "style", "noscript", "head"]):
+        tag.decompose()
+    section: List[str] = []
+    for element in soup.find_all(["h1", "h2", "h3", "p", "li", "pre", "td", "th", "blockquote"]):
+        if element.find(["p", "li", "pre", "td", "th", "blockquote"]):
+            continue  # text is picked up from the nested block
+        text = element.get_text(" ", strip=True)
+        if not text:
+            continue
+        if element.name in ("h1", "h2", "h3") and section:
+            yield from _split_long("\n".join(section))
+            section = []
+        section.append(text)
+    if section:
+        yield from _split_long("\n".join(section))
+    else:
+        yield from _split_long(soup.get_text("\n", strip=True))
+
+
+def extract_md(path: str, start: int = 0, stop: Optional[int] = None) -> Iterator[str]:
+    """Yield a Markdown file section by section, rendered to plain text."""
+    import markdown
+    from bs4 import BeautifulSoup
+
+    def render(lines: List[str]) -> str:
+        html = markdown.markdown("".join(lines), extensions=["fenced_code", "tables"])
+        return BeautifulSoup(html, "html.parser").get_text().strip()
+
+    section: List[str] = []
+    in_code = False
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        for line in f:
+            if line.lstrip().startswith("```"):
+                in_code = not in_code
+            if not in_code and line.startswith("#") and section:
+                yield from _split_long(render(section))
+                section = []
+            section.append(line)
+    if section:
+        yield from _split_long(render(section))
+
+
+EXTRACTORS: Dict[str, Callable[..., Iterator[str]]] = {
+    "txt": extract_txt,
+    "pdf": extract_pdf,
+    "pptx": extract_pptx,
+    "docx": extract_docx,
+    "html": extract_html,
+    "htm": extract_html,
+    "md": extract_md,
+    "markdown": extract_md,
+}
+
+# Formats that can be parsed in independent page ranges
+PAGED_FORMATS = ("pdf", "pptx")
+
+
+def get_file_type(path: str, file_type: Optional[str] = None) -> str:
+    """Normalize an explicit file type or derive it from the path."""
+    file_type = (file_type or os.path.splitext(path)[1]).lstrip(".").lower()
+    if file_type not in EXTRACTORS:
+        raise ValueError(f"Unsupported file type: {file_type}")
+    return file_type
+
+
+def extract_pages(path: str, file_type: Optional[str] = None) -> Iterator[str]:
+    """Yield pages in the current process, without the pool."""
+    yield from EXTRACTORS[get_file_type(path, file_type)](path)
+
+
+def count_pages(path: str, file_type: str) -> int:
+    """Return the number of pages or slides in a paged document."""
+    if file_type == "pdf":
+        from PyPDF2 import PdfReader
+        return len(PdfReader(path).pages)
+    from pptx import Presentation
+    return len(Presentation(path).slides)
+
+
+def _extract_range(path: str, file_type: str, start: int, stop: int) -> List[str]:
+    return list(EXTRACTORS[file_type](path, start, stop))
+
+
+def _extract_all(path: str, file_type: str) -> List[str]:
+    return list(EXTRACTORS[file_type](path))
+
+
+class ExtractionEngine:
+    """Runs extraction in a process pool and streams pages back in order.
+
+    PDFs and presentations are split into ranges of EXTRACTION_PAGE_BATCH
+    pages; the next range is parsed while the caller consumes the current one,
+    so at most two batches are in memory. Formats without random access
+    (docx, html, md) are parsed by a single pool task. Plain text needs no
+    parsing and is streamed from disk in the calling thread.
+    """
+
+    def __init__(self, max_workers: int = EXTRACTION_WORKERS, page_batch: int = EXTRACTION_PAGE_BATCH):
+        self.max_workers = max_workers
+        self.page_batch = page_batch
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    # spawn, not fork: the server process holds threads and torch state
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.max_workers,
+                        mp_context=multiprocessing.get_context("spawn")
+                    )
+        return self._executor
+
+    def iter_pages(self, path: str, file_type: Optional[str] = None) -> Iterator[str]:
+        """Yield pages in document order; blocks only the calling thread."""
+        file_type = get_file_type(path, file_type)
+        if file_type == "txt":
+            yield from extract_txt(path)
+            return
+        try:
+            yield from self._iter_pool_pages(path, file_type)
+        except BrokenProcessPool:
+            # A parser crashed (e.g. a malformed file); start a fresh pool for the retry
+            self.shutdown()
+            raise
+
+    def _iter_pool_pages(self, path: str, file_type: str) -> Iterator[str]:
+        if file_type not in PAGED_FORMATS:
+            yield from self.executor.submit(_extract_all, path, file_type).result()
+            return
+
+        total = self.executor.submit(count_pages, path, file_type).result()
+        ranges = [(start, min(start + self.page_batch, total)) for start in range(0, total, self.page_batch)]
+        pending = None
+        for index, (start, stop) in enumerate(ranges):
+            current = pending or self.executor.submit(_extract_range, path, file_type, start, stop)
+            pending = None
+            if index + 1 < len(ranges):
+                next_start, next_stop = ranges[index + 1]
+                pending = self.executor.submit(_extract_range, path, file_type, next_start, next_stop)
+            yield from current.result()
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+
+_engine: Optional[ExtractionEngine] = None
+
+
+def get_extraction_engine() -> ExtractionEngine:
+    """Return the process-wide extraction engine."""
+    global _engine
+    if _engine is None:
+        _engine = ExtractionEngine()
+    return _engine
+
+
+def shutdown_extraction_engine():
+    """Stop the extraction process pool."""
+    global _engine
+    if _engine is not None:
+        _engine.shutdown()
+        _engine = None
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python rag/ingest.py <file> [file ...]")
+        sys.exit(1)
+    engine = get_extraction_engine()
+    try:
+        for file_path in sys.argv[1:]:
+            pages = 0
+            chars = 0
+            for page in engine.iter_pages(file_path):
+                pages += 1
+                chars += len(page)
+            print(f"{file_path}: {pages} pages, {chars} characters")
+    finally:
+        shutdown_extraction_engine()
@@ -0,0 +1,16 @@
+import os
+import sys
+import tempfile
+
+# Keep databases, caches and index files of the tests out of the working tree;
+# config.py reads these when the first backend module is imported
+_scratch = tempfile.mkdtemp(prefix="docuchat-tests-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_scratch, 'chat_app.db')}")
+os.environ.setdefault("UPLOAD_DIR", os.path.join(_scratch, "uploads"))
+os.environ.setdefault("VECTOR_INDEX_DIR", os.path.join(_scratch, "vector_indexes"))
+os.environ.setdefault("COMPLETION_CACHE_PATH", "")
+os.environ.setdefault("EMBEDDING_CACHE_PATH", "")
+os.environ.setdefault("CHUNK_TOKENIZER", "regex")
+
+# Add the project root to Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
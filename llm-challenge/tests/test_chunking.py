@@ -0,0 +1,64 @@
+from rag.chunking import RegexTokenizer, iter_chunks
+
+TOKENIZER = RegexTokenizer()
+SIZE, OVERLAP = 10, 3
+
+
+def words(start: int, count: int) -> str:
+    return " ".join(f"w{i}" for i in range(start, start + count))
+
+
+def tokens(text: str):
+    return [text[start:end] for start, end in TOKENIZER.offsets(text)]
+
+
+def chunk(pages):
+    return list(iter_chunks(pages, SIZE, OVERLAP, TOKENIZER))
+
+
+def rejoin(chunks):
+    """The token stream the chunks cover, with each overlap counted once."""
+    stream = tokens(chunks[0])
+    for text in chunks[1:]:
+        stream += tokens(text)[OVERLAP:]
+    return stream
+
+
+def test_chunks_crossing_pages_overlap_by_chunk_overlap_tokens():
+    pages = [words(0, 7), words(7, 7), words(14, 7), words(21, 7)]
+    chunks = chunk(pages)
+    assert len(chunks) == 4
+    assert "\n" in chunks[0]  # spans the first page boundary
+    for previous, current in zip(chunks, chunks[1:]):
+        assert tokens(previous)[-OVERLAP:] == tokens(current)[:OVERLAP]
+    assert all(len(tokens(text)) == SIZE for text in chunks[:-1])
+    assert rejoin(chunks) == tokens(" ".join(pages))
+
+
+def test_tail_is_flushed_once_without_loss_or_duplication():
+    # 24 tokens: full chunks at 0-9 and 7-16, then a 10 token tail from 14
+    chunks = chunk([words(0, 12), words(12, 12)])
+    assert [tokens(text)[0] for text in chunks] == ["w0", "w7", "w14"]
+    assert tokens(chunks[-1])[-1] == "w23"
+    assert rejoin(chunks) == tokens(words(0, 24))
+
+
+def test_no_tail_when_the_last_window_is_already_emitted():
+    # 17 tokens fill exactly two overlapping windows
+    chunks = chunk([words(0, 17)])
+    assert len(chunks) == 2
+    assert rejoin(chunks) == tokens(words(0, 17))
+
+
+def test_page_shorter_than_the_overlap():
+    # The two token page lands inside the overlap of the first two chunks
+    pages = [words(0, 8), "x y", "", "   ", words(8, 8)]
+    chunks = chunk(pages)
+    assert chunks[1].startswith("w7\nx y\nw8")
+    assert tokens(chunks[0])[-OVERLAP:] == tokens(chunks[1])[:OVERLAP]
+    assert rejoin(chunks) == tokens(" ".join(page for page in pages if page.strip()))
+
+
+def test_document_shorter_than_the_overlap_is_one_chunk():
+    assert chunk(["x y"]) == ["x y"]
+    assert chunk(["", "  "]) == []
@@ -0,0 +1,139 @@
+import asyncio
+import types
+
+import pytest
+
+from backend.app import circuit_breaker
+from backend.app.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+from backend.app.llm_client import LLMClient, LLMError
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """A fake time.monotonic for the breaker, advanced by hand."""
+    fake = types.SimpleNamespace(now=1000.0)
+    fake.monotonic = lambda: fake.now
+    monkeypatch.setattr(circuit_breaker, "time", fake)
+    return fake
+
+
+def tripped(**kwargs) -> CircuitBreaker:
+    breaker = CircuitBreaker("test", failure_rate=0.5, window=4, min_calls=4, cooldown=10, **kwargs)
+    for failed in (True, False, True, True):
+        breaker.before_call()
+        if failed:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+    return breaker
+
+
+def test_failures_open_the_circuit_and_calls_are_rejected(clock):
+    breaker = tripped()
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    assert breaker.rejected == 1
+    assert breaker.opened == 1
+
+
+def test_circuit_stays_closed_below_min_calls(clock):
+    breaker = CircuitBreaker("test", failure_rate=0.5, window=4, min_calls=4, cooldown=10)
+    for _ in range(3):
+        breaker.before_call()
+        breaker.record_failure()
+    assert breaker.state == CLOSED
+
+
+def test_reading_state_has_no_side_effects(clock):
+    breaker = tripped()
+    clock.now += 10
+    assert breaker.state == HALF_OPEN
+    assert breaker.stats()["state"] == HALF_OPEN
+    assert breaker._state == OPEN
+    assert breaker.allow()
+    assert breaker._state == HALF_OPEN
+
+
+def test_trial_success_closes_the_circuit(clock):
+    breaker = tripped(half_open_calls=1)
+    clock.now += 10
+    assert breaker.allow()
+    assert not breaker.allow()  # only one trial call at a time
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    assert breaker.allow()
+
+
+def test_trial_failure_reopens_the_circuit(clock):
+    breaker = tripped(half_open_calls=1)
+    clock.now += 10
+    breaker.before_call()
+    breaker.record_error(LLMError("503 - unavailable", 503))
+    assert breaker.state == OPEN
+    assert breaker.opened == 2
+    clock.now += 9
+    assert not breaker.allow()
+
+
+def test_request_errors_only_free_the_trial_slot(clock):
+    breaker = tripped(half_open_calls=1)
+    clock.now += 10
+    breaker.before_call()
+    breaker.record_error(LLMError("400 - bad request", 400))
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow()
+
+
+class RecordingBreaker(CircuitBreaker):
+    def __init__(self):
+        super().__init__("test")
+        self.outcomes = []
+
+    def record_success(self):
+        self.outcomes.append("success")
+        super().record_success()
+
+    def record_error(self, error):
+        self.outcomes.append("error")
+        super().record_error(error)
+
+    def record_cancelled(self):
+        self.outcomes.append("cancelled")
+        super().record_cancelled()
+
+
+class ScriptedClient(LLMClient):
+    """Streams two tokens, failing between them when fail_midway is set."""
+
+    fail_midway = False
+
+    async def _stream_once(self, payload):
+        yield "a"
+        if self.fail_midway:
+            raise LLMError("502 - upstream reset", 502)
+        yield "b"
+
+
+def stream_outcomes(fail_midway=False, stop_early=False):
+    async def scenario():
+        client = ScriptedClient("http://provider.invalid", "key", "model", breaker=RecordingBreaker())
+        client.fail_midway = fail_midway
+        tokens = client.stream([{"role": "user", "content": "hi"}])
+        try:
+            async for _ in tokens:
+                if stop_early:
+                    break
+        except LLMError:
+            pass
+        await tokens.aclose()
+        await client.close()
+        return client.breaker.outcomes
+
+    return asyncio.run(scenario())
+
+
+def test_stream_records_one_outcome_when_it_ends():
+    assert stream_outcomes() == ["success"]
+    assert stream_outcomes(fail_midway=True) == ["error"]
+    assert stream_outcomes(stop_early=True) == ["cancelled"]
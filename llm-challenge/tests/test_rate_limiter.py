@@ -0,0 +1,61 @@
+import asyncio
+import time
+
+import pytest
+
+from backend.app.llm_client import LLMError
+from backend.app.rate_limiter import ProviderLimiter
+
+
+def test_queued_calls_are_released_round_robin_across_users():
+    # 100 requests/s with room for one at a time: every release waits ~10 ms
+    limiter = ProviderLimiter("test", requests_per_minute=6000, burst_seconds=0.01)
+    released = []
+
+    async def chat(user):
+        await limiter.acquire(0, user=user)
+        released.append(user)
+
+    async def scenario():
+        await asyncio.gather(*[chat("heavy") for _ in range(4)], chat("light"), chat("other"))
+
+    asyncio.run(scenario())
+    assert released == ["heavy", "light", "other", "heavy", "heavy", "heavy"]
+
+
+def test_call_queued_past_max_wait_fails_with_429():
+    limiter = ProviderLimiter("test", requests_per_minute=60, max_wait=0.05, burst_seconds=1)
+
+    async def scenario():
+        await limiter.acquire(0, user="a")  # takes the only request in the bucket
+        await limiter.acquire(0, user="a")  # the next is a second away
+
+    with pytest.raises(LLMError) as error:
+        asyncio.run(scenario())
+    assert error.value.status_code == 429
+    assert limiter.rejected == 1
+
+
+def test_retry_after_pauses_the_whole_provider():
+    limiter = ProviderLimiter("test", max_retries=1)
+    attempts = []
+
+    async def attempt():
+        attempts.append(time.monotonic())
+        if len(attempts) == 1:
+            raise LLMError("429 - slow down", 429, 0.2)
+        return "ok"
+
+    async def scenario():
+        first = asyncio.ensure_future(limiter.call(0, attempt))
+        await asyncio.sleep(0.02)  # the first attempt has been rejected by now
+        start = time.monotonic()
+        await limiter.acquire(0, user="someone-else")
+        waited = time.monotonic() - start
+        return waited, await first
+
+    waited, result = asyncio.run(scenario())
+    assert result == "ok"
+    assert waited >= 0.15
+    assert attempts[1] - attempts[0] >= 0.2
+    assert limiter.retries == 1
@@ -0,0 +1,91 @@
+import asyncio
+
+import pytest
+
+from backend.app.llm_client import LLMError
+from backend.app.single_flight import SingleFlight
+
+
+def test_concurrent_identical_calls_share_one_upstream_call():
+    flight = SingleFlight(enabled=True)
+    calls = 0
+
+    async def call():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return "answer"
+
+    async def scenario():
+        return await asyncio.gather(*[flight.do("key", call) for _ in range(5)])
+
+    assert asyncio.run(scenario()) == ["answer"] * 5
+    assert calls == 1
+    assert flight.upstream_calls == 1
+    assert flight.coalesced == 4
+
+
+def test_error_reaches_every_waiter():
+    flight = SingleFlight(enabled=True)
+
+    async def call():
+        await asyncio.sleep(0.05)
+        raise LLMError("503 - unavailable", 503)
+
+    async def scenario():
+        return await asyncio.gather(*[flight.do("key", call) for _ in range(3)], return_exceptions=True)
+
+    results = asyncio.run(scenario())
+    assert len(results) == 3
+    assert all(isinstance(result, LLMError) and result.status_code == 503 for result in results)
+    assert flight.upstream_calls == 1
+
+
+def test_key_is_released_after_a_failure():
+    flight = SingleFlight(enabled=True)
+    outcomes = [LLMError("timed out"), "answer"]
+
+    async def call():
+        await asyncio.sleep(0.01)
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    async def scenario():
+        with pytest.raises(LLMError):
+            await flight.do("key", call)
+        await asyncio.sleep(0)  # let the done callback drop the key
+        assert flight.stats()["in_flight"] == 0
+        return await flight.do("key", call)
+
+    assert asyncio.run(scenario()) == "answer"
+    assert flight.upstream_calls == 2
+
+
+def test_streams_are_shared_and_errors_reach_every_reader():
+    flight = SingleFlight(enabled=True)
+    calls = 0
+
+    async def tokens():
+        nonlocal calls
+        calls += 1
+        for token in ["a", "b"]:
+            await asyncio.sleep(0.01)
+            yield token
+        raise LLMError("stream cut", 502)
+
+    async def read():
+        received = []
+        try:
+            async for token in flight.stream("key", tokens):
+                received.append(token)
+        except LLMError as e:
+            return received, e.status_code
+        return received, None
+
+    async def scenario():
+        return await asyncio.gather(read(), read())
+
+    assert asyncio.run(scenario()) == [(["a", "b"], 502), (["a", "b"], 502)]
+    assert calls == 1
@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from backend.app.db import engine
+from backend.app.models import Base
+from backend.app.vector_store import QdrantVectorStore, VectorStore
+
+
+@pytest.fixture(scope="module", autouse=True)
+def tables():
+    # Qdrant backfills a user's points from the database on their first search
+    Base.metadata.create_all(bind=engine)
+
+
+def unit_vectors(count: int, dimension: int = 8, seed: int = 0) -> np.ndarray:
+    vectors = np.random.default_rng(seed).normal(size=(count, dimension)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def test_incomplete_backend_fails_when_constructed():
+    class SearchOnly(VectorStore):
+        def search(self, user_id, query_vector, top_k):
+            return []
+
+    with pytest.raises(TypeError):
+        SearchOnly()
+
+
+def test_qdrant_add_search_remove_in_memory():
+    store = QdrantVectorStore(url=":memory:", collection="test_chunks", batch_size=2)
+    vectors = unit_vectors(5)
+    store.add(1, [10, 11, 12, 13, 14], vectors)
+    # Another user sharing a chunk id must not show up in user 1's results
+    store.add(2, [10, 99], unit_vectors(2, seed=1))
+
+    hits = store.search(1, vectors[2], top_k=3)
+    assert hits[0][0] == 12
+    assert hits[0][1] == pytest.approx(1.0, abs=1e-5)
+    assert len(hits) == 3
+    assert {chunk_id for chunk_id, _ in store.search(1, vectors[0], top_k=10)} == {10, 11, 12, 13, 14}
+    assert {chunk_id for chunk_id, _ in store.search(2, vectors[0], top_k=10)} == {10, 99}
+
+    # Re-adding a chunk is a no-op
+    store.add(1, [12], vectors[2:3])
+    assert len(store.search(1, vectors[0], top_k=10)) == 5
+
+    store.remove(1, [12, 13])
+    assert {chunk_id for chunk_id, _ in store.search(1, vectors[2], top_k=10)} == {10, 11, 14}
+    assert {chunk_id for chunk_id, _ in store.search(2, vectors[0], top_k=10)} == {10, 99}